@@ -1,15 +1,20 @@
 from crewai import Agent
 from langchain.tools import Tool
 from config.crew_config import CrewConfig
+from utils.llm_scheduler import RequestCancelled
 from utils.logger import app_logger
+from utils.tracing import tracer
 from utils.text_cleaner import TextCleaner
+from utils.structured_output import AgentFailure, ATSEvaluation, generate_structured
+from typing import Union
 import os
 
 class CVEvaluatorAgent:
     """Agent responsible for evaluating CV for ATS compatibility and scoring"""
     
     def __init__(self):
-        self.llm = CrewConfig.get_llm()
+        self.llm = CrewConfig.get_llm('evaluator')
+        self.structured_llm = CrewConfig.get_llm('evaluator', output_schema=ATSEvaluation.SCHEMA)
         self.agent = None
         self._load_prompt()
         self._create_agent()
@@ -38,12 +43,13 @@ class CVEvaluatorAgent:
             of experience in talent acquisition. You understand exactly what makes a CV pass through 
             ATS filters and catch recruiter attention. You have deep knowledge of industry standards, 
             keyword optimization, and formatting best practices.""",
-            verbose=True,
+            verbose=CrewConfig.AGENT_VERBOSE,
             allow_delegation=False,
             llm=self.llm,
             tools=[]
         )
     
+    @tracer.traced('agent.evaluate_cv', agent='CV Evaluator')
     def evaluate_cv(self, cv_text: str) -> str:
         """
         Evaluate CV for ATS compatibility
@@ -58,34 +64,55 @@ class CVEvaluatorAgent:
             app_logger.log_agent_start("CV Evaluator", "ATS Evaluation")
             
             # Format the prompt with CV text
-            formatted_prompt = self.system_prompt.format(cv_text=cv_text)
+            with tracer.span('prompt.format'):
+                formatted_prompt = self.system_prompt.format(cv_text=cv_text)
             
             # Execute the evaluation using the LLM directly
-            try:
-                # Try different methods based on LLM version
-                if hasattr(self.llm, 'invoke'):
-                    result = self.llm.invoke(formatted_prompt)
-                elif hasattr(self.llm, '__call__'):
-                    result = self.llm(formatted_prompt)
-                elif hasattr(self.llm, 'generate'):
-                    result = self.llm.generate([formatted_prompt]).generations[0][0].text
-                else:
-                    # Fallback to string conversion
-                    result = str(self.llm.invoke(formatted_prompt))
-            except Exception as llm_error:
-                # Fallback method
-                result = f"LLM invocation failed: {llm_error}. Using fallback analysis."
+            # Try different methods based on LLM version
+            if hasattr(self.llm, 'invoke'):
+                result = self.llm.invoke(formatted_prompt)
+            elif hasattr(self.llm, '__call__'):
+                result = self.llm(formatted_prompt)
+            elif hasattr(self.llm, 'generate'):
+                result = self.llm.generate([formatted_prompt]).generations[0][0].text
+            else:
+                # Fallback to string conversion
+                result = str(self.llm.invoke(formatted_prompt))
             
             # Clean the agent output using regex to remove think tags
             cleaned_result = TextCleaner.clean_agent_output(result)
             
-            app_logger.log_agent_complete("CV Evaluator", "ATS Evaluation", 0)
+            app_logger.log_agent_complete("CV Evaluator", "ATS Evaluation", tracer.current().elapsed())
             return cleaned_result
             
+        except RequestCancelled:
+            raise
         except Exception as e:
             error_msg = f"CV evaluation failed: {str(e)}"
             app_logger.log_agent_error("CV Evaluator", "ATS Evaluation", error_msg)
-            return f"Error in CV evaluation: {error_msg}"
+            return AgentFailure(f"Error in CV evaluation: {error_msg}")
+    
+    @tracer.traced('agent.evaluate_cv_structured', agent='CV Evaluator')
+    def evaluate_cv_structured(self, cv_text: str) -> Union[ATSEvaluation, str]:
+        """
+        Evaluate CV for ATS compatibility as a typed result
+        
+        Args:
+            cv_text: The CV text to evaluate
+            
+        Returns:
+            ATSEvaluation, or the free-form evaluation if the model output can't be parsed
+        """
+        app_logger.log_agent_start("CV Evaluator", "ATS Evaluation (structured)")
+        with tracer.span('prompt.format'):
+            formatted_prompt = self.system_prompt.format(cv_text=cv_text)
+        evaluation = generate_structured(self.structured_llm, formatted_prompt, ATSEvaluation)
+        if evaluation is None:
+            app_logger.warning("Structured ATS evaluation could not be parsed, using free-form output")
+            return self.evaluate_cv(cv_text)
+        
+        app_logger.log_agent_complete("CV Evaluator", "ATS Evaluation (structured)", tracer.current().elapsed())
+        return evaluation
     
     def get_agent(self):
         """Return the CrewAI agent instance"""
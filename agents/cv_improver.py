@@ -1,14 +1,19 @@
 from crewai import Agent
 from config.crew_config import CrewConfig
+from utils.llm_scheduler import RequestCancelled
 from utils.logger import app_logger
+from utils.tracing import tracer
 from utils.text_cleaner import TextCleaner
+from utils.structured_output import AgentFailure, CVImprovement, generate_structured
+from typing import List, Optional, Union
 import os
 
 class CVImproverAgent:
     """Agent responsible for improving CV based on job description"""
     
     def __init__(self):
-        self.llm = CrewConfig.get_llm()
+        self.llm = CrewConfig.get_llm('improver')
+        self.structured_llm = CrewConfig.get_llm('improver', output_schema=CVImprovement.SCHEMA)
         self.agent = None
         self._load_prompt()
         self._create_agent()
@@ -43,12 +48,13 @@ class CVImproverAgent:
             CVs for specific job opportunities. You have helped thousands of candidates land their dream jobs 
             by optimizing their CVs for maximum impact. You understand how to highlight relevant experience, 
             integrate keywords naturally, and present achievements in the most compelling way.""",
-            verbose=True,
+            verbose=CrewConfig.AGENT_VERBOSE,
             allow_delegation=False,
             llm=self.llm,
             tools=[]
         )
     
+    @tracer.traced('agent.improve_cv', agent='CV Improver')
     def improve_cv(self, cv_text: str, job_description: str) -> str:
         """
         Provide CV improvement suggestions based on job description
@@ -64,37 +70,68 @@ class CVImproverAgent:
             app_logger.log_agent_start("CV Improver", "CV Optimization")
             
             # Format the prompt with both CV and JD
-            formatted_prompt = self.system_prompt.format(
-                cv_text=cv_text,
-                job_description=job_description
-            )
+            with tracer.span('prompt.format'):
+                formatted_prompt = self.system_prompt.format(
+                    cv_text=cv_text,
+                    job_description=job_description
+                )
             
             # Execute the improvement analysis using the LLM directly
-            try:
-                # Try different methods based on LLM version
-                if hasattr(self.llm, 'invoke'):
-                    result = self.llm.invoke(formatted_prompt)
-                elif hasattr(self.llm, '__call__'):
-                    result = self.llm(formatted_prompt)
-                elif hasattr(self.llm, 'generate'):
-                    result = self.llm.generate([formatted_prompt]).generations[0][0].text
-                else:
-                    # Fallback to string conversion
-                    result = str(self.llm.invoke(formatted_prompt))
-            except Exception as llm_error:
-                # Fallback method
-                result = f"LLM invocation failed: {llm_error}. Using fallback analysis."
+            # Try different methods based on LLM version
+            if hasattr(self.llm, 'invoke'):
+                result = self.llm.invoke(formatted_prompt)
+            elif hasattr(self.llm, '__call__'):
+                result = self.llm(formatted_prompt)
+            elif hasattr(self.llm, 'generate'):
+                result = self.llm.generate([formatted_prompt]).generations[0][0].text
+            else:
+                # Fallback to string conversion
+                result = str(self.llm.invoke(formatted_prompt))
             
             # Clean the agent output using regex to remove think tags
             cleaned_result = TextCleaner.clean_agent_output(result)
             
-            app_logger.log_agent_complete("CV Improver", "CV Optimization", 0)
+            app_logger.log_agent_complete("CV Improver", "CV Optimization", tracer.current().elapsed())
             return cleaned_result
             
+        except RequestCancelled:
+            raise
         except Exception as e:
             error_msg = f"CV improvement analysis failed: {str(e)}"
             app_logger.log_agent_error("CV Improver", "CV Optimization", error_msg)
-            return f"Error in CV improvement analysis: {error_msg}"
+            return AgentFailure(f"Error in CV improvement analysis: {error_msg}")
+    
+    @tracer.traced('agent.improve_cv_structured', agent='CV Improver')
+    def improve_cv_structured(self, cv_text: str, job_description: str,
+                              focus_sections: Optional[List[str]] = None) -> Union[CVImprovement, str]:
+        """
+        Suggest CV improvements as a typed result
+        
+        Args:
+            cv_text: The CV text to improve
+            job_description: The target job description
+            focus_sections: Only suggest rewrites for these sections (the
+                others already have suggestions); None for all
+            
+        Returns:
+            CVImprovement, or the free-form recommendations if the model output can't be parsed
+        """
+        app_logger.log_agent_start("CV Improver", "CV Optimization (structured)")
+        with tracer.span('prompt.format', focus_sections=len(focus_sections or [])):
+            formatted_prompt = self.system_prompt.format(cv_text=cv_text, job_description=job_description)
+            if focus_sections:
+                formatted_prompt += (
+                    "\n\nOnly suggest rewrites for these CV sections, which were just edited: "
+                    f"{', '.join(focus_sections)}. Set each rewrite's section to one of these names. "
+                    "Still assess the whole CV for the match score, summary, gaps and keywords."
+                )
+        improvement = generate_structured(self.structured_llm, formatted_prompt, CVImprovement)
+        if improvement is None:
+            app_logger.warning("Structured CV improvement could not be parsed, using free-form output")
+            return self.improve_cv(cv_text, job_description)
+        
+        app_logger.log_agent_complete("CV Improver", "CV Optimization (structured)", tracer.current().elapsed())
+        return improvement
     
     def get_agent(self):
         """Return the CrewAI agent instance"""
@@ -1,15 +1,26 @@
 from crewai import Agent
 from config.crew_config import CrewConfig
 from tools.search_tool import create_search_tools
+from tools.query_planner import query_planner
+from tools.job_store import job_store
+from tools.job_matcher import job_matcher
+from utils.llm_scheduler import RequestCancelled
 from utils.logger import app_logger
+from utils.tracing import tracer
 from utils.text_cleaner import TextCleaner
+from utils.structured_output import AgentFailure, JobMatches, generate_structured
+from typing import Union
 import os
 
 class JobFinderAgent:
     """Agent responsible for finding relevant job opportunities"""
     
+    # Live search only tops up queries with fewer local postings than this
+    MIN_LOCAL_RESULTS = 5
+    
     def __init__(self):
-        self.llm = CrewConfig.get_llm()
+        self.llm = CrewConfig.get_llm('job_finder')
+        self.structured_llm = CrewConfig.get_llm('job_finder', output_schema=JobMatches.SCHEMA)
         self.search_tools = create_search_tools()
         self.agent = None
         self._load_prompt()
@@ -49,12 +60,13 @@ class JobFinderAgent:
             candidates with appropriate opportunities and understand the nuances of different job boards, 
             company cultures, and hiring practices. You excel at finding hidden opportunities and providing 
             strategic advice for job applications.""",
-            verbose=True,
+            verbose=CrewConfig.AGENT_VERBOSE,
             allow_delegation=False,
             llm=self.llm,
             tools=[]  # Empty tools list to avoid compatibility issues
         )
     
+    @tracer.traced('agent.find_jobs', agent='Job Finder')
     def find_jobs(self, cv_text: str, job_description: str) -> str:
         """
         Find relevant job opportunities
@@ -69,46 +81,25 @@ class JobFinderAgent:
         try:
             app_logger.log_agent_start("Job Finder", "Job Search")
             
-            # Format the prompt with both CV and target JD
-            formatted_prompt = self.system_prompt.format(
-                cv_text=cv_text,
-                job_description=job_description
-            )
+            formatted_prompt = self._build_prompt(cv_text, job_description)
             
             # Execute the job search analysis using the LLM directly
-            try:
-                # Try different methods based on LLM version
-                if hasattr(self.llm, 'invoke'):
-                    result = self.llm.invoke(formatted_prompt)
-                elif hasattr(self.llm, '__call__'):
-                    result = self.llm(formatted_prompt)
-                elif hasattr(self.llm, 'generate'):
-                    result = self.llm.generate([formatted_prompt]).generations[0][0].text
-                else:
-                    # Fallback to string conversion
-                    result = str(self.llm.invoke(formatted_prompt))
-            except Exception as llm_error:
-                # Fallback method
-                result = f"LLM invocation failed: {llm_error}. Using fallback analysis."
+            # Try different methods based on LLM version
+            if hasattr(self.llm, 'invoke'):
+                result = self.llm.invoke(formatted_prompt)
+            elif hasattr(self.llm, '__call__'):
+                result = self.llm(formatted_prompt)
+            elif hasattr(self.llm, 'generate'):
+                result = self.llm.generate([formatted_prompt]).generations[0][0].text
+            else:
+                # Fallback to string conversion
+                result = str(self.llm.invoke(formatted_prompt))
             
             # Enhance with actual job search results
             try:
                 # Extract job title from job description for search
                 enhanced_result = result + "\n\n## 🔍 Live Job Search Results:\n"
-                
-                # Search for actual jobs
-                job_tool = next((tool for tool in self.search_tools if tool.name == 'job_search'), None)
-                if job_tool:
-                    # Extract a likely job title for search (simplified approach)
-                    search_queries = ["software engineer", "developer", "full stack engineer"]
-                    for query in search_queries[:1]:  # Limit to 1 to avoid too many requests
-                        try:
-                            search_results = job_tool.func(query)
-                            enhanced_result += f"\n### Current {query.title()} Opportunities:\n{search_results[:800]}...\n"
-                        except:
-                            continue
-                
-                result = enhanced_result
+                result = enhanced_result + self._opportunity_sections(cv_text, job_description)
             except Exception as e:
                 # If search enhancement fails, continue with basic result
                 app_logger.warning(f"Job search enhancement failed: {e}")
@@ -116,13 +107,112 @@ class JobFinderAgent:
             # Clean the agent output using regex to remove think tags
             cleaned_result = TextCleaner.clean_agent_output(result)
             
-            app_logger.log_agent_complete("Job Finder", "Job Search", 0)
+            app_logger.log_agent_complete("Job Finder", "Job Search", tracer.current().elapsed())
             return cleaned_result
             
+        except RequestCancelled:
+            raise
         except Exception as e:
             error_msg = f"Job search failed: {str(e)}"
             app_logger.log_agent_error("Job Finder", "Job Search", error_msg)
-            return f"Error in job search: {error_msg}"
+            return AgentFailure(f"Error in job search: {error_msg}")
+    
+    @tracer.traced('prompt.format')
+    def _build_prompt(self, cv_text: str, job_description: str) -> str:
+        """Format the prompt with the CV, target JD and the best-ranked stored postings"""
+        formatted_prompt = self.system_prompt.format(
+            cv_text=cv_text,
+            job_description=job_description
+        )
+        
+        # Rank stored postings by embedding similarity before generating
+        ranked_postings = self._rank_postings(cv_text, job_description)
+        if ranked_postings:
+            formatted_prompt += "\n\nStored postings ranked by similarity to the CV and target role:\n"
+            formatted_prompt += self._format_postings(ranked_postings)
+        return formatted_prompt
+    
+    def _opportunity_sections(self, cv_text: str, job_description: str) -> str:
+        """Current postings for the planned titles, from the local store topped up by live search"""
+        sections = ""
+        
+        # Search only for the titles derived from the JD and CV
+        search_plan = query_planner.plan(cv_text, job_description)
+        job_tool = next((tool for tool in self.search_tools if tool.name == 'job_search'), None)
+        for query in search_plan.job_queries:
+            # Answer from the local job store first
+            local_postings = self._search_local(query)
+            if local_postings:
+                sections += f"\n### Current {query.title()} Opportunities:\n"
+                sections += self._format_postings(local_postings)
+            
+            # Top up with a live search only when the store has too few postings
+            if job_tool and len(local_postings) < self.MIN_LOCAL_RESULTS:
+                try:
+                    search_results = query_planner.execute(job_tool.name, query, job_tool.func)
+                    if not local_postings:
+                        sections += f"\n### Current {query.title()} Opportunities:\n"
+                    sections += f"{search_results[:800]}...\n"
+                except:
+                    continue
+        return sections
+    
+    @tracer.traced('agent.find_jobs_structured', agent='Job Finder')
+    def find_jobs_structured(self, cv_text: str, job_description: str) -> Union[JobMatches, str]:
+        """
+        Find relevant job opportunities as a typed result
+        
+        Args:
+            cv_text: The candidate's CV text
+            job_description: The target job description for reference
+            
+        Returns:
+            JobMatches, or the free-form job search if the model output can't be parsed
+        """
+        app_logger.log_agent_start("Job Finder", "Job Search (structured)")
+        formatted_prompt = self._build_prompt(cv_text, job_description)
+        matches = generate_structured(self.structured_llm, formatted_prompt, JobMatches)
+        if matches is None:
+            app_logger.warning("Structured job search could not be parsed, using free-form output")
+            return self.find_jobs(cv_text, job_description)
+        
+        try:
+            matches.supplement = self._opportunity_sections(cv_text, job_description).strip()
+        except Exception as e:
+            app_logger.warning(f"Job search enhancement failed: {e}")
+        
+        app_logger.log_agent_complete("Job Finder", "Job Search (structured)", tracer.current().elapsed())
+        return matches
+    
+    def _search_local(self, query: str):
+        """Look up postings in the local job store"""
+        try:
+            return job_store.search(query, limit=self.MIN_LOCAL_RESULTS)
+        except Exception as e:
+            app_logger.warning(f"Local job store lookup failed: {e}")
+            return []
+    
+    def _rank_postings(self, cv_text: str, job_description: str):
+        """Nearest stored postings to the CV and target JD"""
+        try:
+            return [posting for posting, _ in job_matcher.rank(cv_text, job_description, k=self.MIN_LOCAL_RESULTS)]
+        except Exception as e:
+            app_logger.warning(f"Job ranking failed: {e}")
+            return []
+    
+    @staticmethod
+    def _format_postings(postings) -> str:
+        """Format stored postings for the report"""
+        lines = []
+        for posting in postings:
+            title = posting['title'] + (f" - {posting['company']}" if posting.get('company') else "")
+            details = ", ".join(value for value in (posting.get('location'), posting.get('salary')) if value)
+            lines.append(f"- **{title}**" + (f" ({details})" if details else ""))
+            if posting.get('description'):
+                lines.append(f"  {posting['description'][:200]}")
+            if posting.get('link'):
+                lines.append(f"  Link: {posting['link']}")
+        return "\n".join(lines) + "\n"
     
     def search_jobs_by_title(self, job_title: str, location: str = "") -> str:
         """
@@ -137,14 +227,11 @@ class JobFinderAgent:
         """
         try:
             search_query = f"{job_title} {location}".strip()
-            app_logger.log_search_query("job_search", search_query)
             
-            # Use the job search tool
+            # Use the job search tool (shared with the other agents' queries)
             job_tool = next((tool for tool in self.search_tools if tool.name == 'job_search'), None)
             if job_tool:
-                results = job_tool.func(search_query)
-                app_logger.log_search_results("job_search", search_query, len(results.split('\n')))
-                return results
+                return query_planner.execute(job_tool.name, search_query, job_tool.func)
             else:
                 return "Job search tool not available"
                 
@@ -0,0 +1,244 @@
+import glob
+import hashlib
+import json
+import threading
+from dataclasses import asdict
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from agents.cv_evaluator import CVEvaluatorAgent
+from agents.cv_improver import CVImproverAgent
+from agents.skill_recommender import SkillRecommenderAgent
+from agents.job_finder import JobFinderAgent
+from config.crew_config import CrewConfig
+from config.ollama_config import OllamaConfig
+from utils.cv_parser import parse_cv
+from utils.cv_sections import CVSection, cv_fingerprint, match_section
+from utils.llm_client import track_usage
+from utils.result_store import AnalysisResultStore, text_hash
+from utils.structured_output import (RESULT_TYPES, AgentFailure, CVImprovement, Rewrite, result_from_record,
+                                     result_to_record)
+from utils.tracing import tracer
+
+
+class PipelineStep(NamedTuple):
+    """One agent stage of the full analysis"""
+    name: str
+    agent: str
+    label: str
+    uses_jd: bool = True
+
+
+# Stages of a full analysis, in run order
+STEPS: List[PipelineStep] = [
+    PipelineStep('evaluation', 'evaluator', "🔍 Evaluating CV for ATS compatibility...", uses_jd=False),
+    PipelineStep('improvement', 'improver', "🎯 Analyzing CV improvements..."),
+    PipelineStep('skills', 'skill_recommender', "📚 Identifying skill gaps and learning resources..."),
+    PipelineStep('jobs', 'job_finder', "💼 Finding relevant job opportunities..."),
+]
+
+
+def model_key() -> str:
+    """The model setup results depend on"""
+    if not OllamaConfig.MODEL_ROUTING:
+        return OllamaConfig.MODEL
+    models = {model for preferred in OllamaConfig.AGENT_MODELS.values() for model in preferred}
+    return "routed:" + ",".join(sorted(models | {OllamaConfig.MODEL}))
+
+
+def prompt_version(structured: bool) -> str:
+    """Fingerprint of the prompt templates and output schemas"""
+    digest = hashlib.sha256(b"structured" if structured else b"free-form")
+    for path in sorted(glob.glob('prompts/*.txt')):
+        with open(path, 'rb') as f:
+            digest.update(path.encode('utf-8') + f.read())
+    if structured:
+        schemas = {name: result_type.SCHEMA for name, result_type in RESULT_TYPES.items()}
+        digest.update(json.dumps(schemas, sort_keys=True).encode('utf-8'))
+    return digest.hexdigest()[:12]
+
+
+class AnalysisPipeline:
+    """The four agents of a full analysis, created once and shared by all callers"""
+
+    steps = STEPS
+
+    def __init__(self, structured: bool = CrewConfig.STRUCTURED_OUTPUT):
+        self.structured = structured
+        # Results are only reusable under the same models and prompts
+        self.model_key = model_key()
+        self.prompt_version = prompt_version(structured)
+        self.agents = {
+            'evaluator': CVEvaluatorAgent(),
+            'improver': CVImproverAgent(),
+            'skill_recommender': SkillRecommenderAgent(),
+            'job_finder': JobFinderAgent()
+        }
+
+    def run_step(self, step: str, cv_text: str, job_description: str) -> Any:
+        """
+        Run one stage of the analysis
+
+        Args:
+            step: Step name from STEPS
+            cv_text: The candidate's CV text
+            job_description: The target job description
+
+        Returns:
+            The agent's typed result in structured mode, otherwise its text
+        """
+        structured = self.structured
+        if step == 'evaluation':
+            evaluator = self.agents['evaluator']
+            return evaluator.evaluate_cv_structured(cv_text) if structured else evaluator.evaluate_cv(cv_text)
+        if step == 'improvement':
+            improver = self.agents['improver']
+            return (improver.improve_cv_structured(cv_text, job_description) if structured
+                    else improver.improve_cv(cv_text, job_description))
+        if step == 'skills':
+            recommender = self.agents['skill_recommender']
+            return (recommender.recommend_skills_structured(cv_text, job_description) if structured
+                    else recommender.recommend_skills(cv_text, job_description))
+        if step == 'jobs':
+            job_finder = self.agents['job_finder']
+            return (job_finder.find_jobs_structured(cv_text, job_description) if structured
+                    else job_finder.find_jobs(cv_text, job_description))
+        raise ValueError(f"Unknown analysis step '{step}', expected one of {[s.name for s in STEPS]}")
+
+    def _cache_key(self, kind: str, *inputs: str) -> str:
+        """Cache key from exactly the inputs a piece of work depends on"""
+        parts = [kind, *inputs, self.model_key, self.prompt_version]
+        return hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()[:32]
+
+    def _step_keys(self, sections: List[CVSection], job_description: str) -> Dict[str, str]:
+        """Cache key of each stage: the CV's section hashes, plus the job description if the stage reads it"""
+        fingerprint = cv_fingerprint(sections)
+        jd_hash = text_hash(job_description)
+        return {step.name: self._cache_key(step.name, fingerprint, jd_hash if step.uses_jd else '') for step in STEPS}
+
+    def cached_results(self, cv_text: str, job_description: str, cache: AnalysisResultStore,
+                       cv_raw: Optional[str] = None) -> Dict[str, Tuple[Any, Dict[str, Any]]]:
+        """Stages the cache already answers, as (result, recorded metrics) by step name"""
+        keys = self._step_keys(parse_cv(cv_raw or cv_text).sections, job_description)
+        found = {}
+        for name, key in keys.items():
+            payload = cache.get_cached(key)
+            if payload is not None:
+                found[name] = (result_from_record(payload['result']), dict(payload.get('metrics') or {}, cached=True))
+        return found
+
+    def _improve(self, cv_text: str, job_description: str, sections: List[CVSection], jd_hash: str,
+                 cache: Optional[AnalysisResultStore]) -> Any:
+        """
+        Improvement step with rewrites cached per CV section
+
+        Rewrites are suggested only for sections whose text (or the job
+        description) changed; the cached rewrites of unchanged sections are
+        merged back in CV order. The score, summary, gaps and keywords still
+        come from a pass over the whole CV.
+        """
+        if not self.structured or cache is None or len(sections) < 2:
+            return self.run_step('improvement', cv_text, job_description)
+
+        keys = {section.name: self._cache_key('improvement.section', section.hash, jd_hash) for section in sections}
+        cached = {name: cache.get_cached(key) for name, key in keys.items()}
+        changed = [section for section in sections if cached[section.name] is None]
+        focus = [section.heading or section.name for section in changed] if len(changed) < len(sections) else None
+
+        improvement = self.agents['improver'].improve_cv_structured(cv_text, job_description, focus_sections=focus)
+        if not isinstance(improvement, CVImprovement):
+            return improvement
+
+        new_rewrites: Dict[str, List[Rewrite]] = {section.name: [] for section in changed}
+        for rewrite in improvement.rewrites:
+            section = match_section(rewrite.section, rewrite.original, sections)
+            # Rewrites for unchanged sections are already cached
+            if section is not None and section.name in new_rewrites:
+                new_rewrites[section.name].append(rewrite)
+        for section in changed:
+            cache.put_cached(keys[section.name], 'improvement.section',
+                             {'rewrites': [asdict(rewrite) for rewrite in new_rewrites[section.name]]})
+
+        improvement.rewrites = [
+            rewrite
+            for section in sections
+            for rewrite in (new_rewrites[section.name] if section.name in new_rewrites
+                            else [Rewrite(**item) for item in cached[section.name]['rewrites']])
+        ]
+        return improvement
+
+    def run(self, cv_text: str, job_description: str, done: Optional[Dict[str, Any]] = None,
+            on_step: Optional[Callable[[PipelineStep], None]] = None,
+            on_result: Optional[Callable[[str, Any, Dict[str, Any]], None]] = None,
+            cv_raw: Optional[str] = None, cache: Optional[AnalysisResultStore] = None) -> Dict[str, Any]:
+        """
+        Run every stage not already in done
+
+        With a cache, each stage is keyed by the CV's section hashes plus the
+        job description only if the stage reads it, so after an edit only
+        the stages whose inputs changed run again (the evaluator ignores the
+        job description). Any CV edit still reruns the skills and jobs stages
+        in full, and the improver still reads the whole CV (only its rewrites
+        are limited to the changed sections).
+
+        Args:
+            cv_text: The candidate's CV text
+            job_description: The target job description
+            done: Results of stages that already ran
+            on_step: Called before each stage runs
+            on_result: Called with each stage's name, result and metrics
+                (seconds, LLM calls, prompt/output tokens, models, error, cached)
+            cv_raw: The CV as entered, with line breaks, for splitting into sections
+            cache: Store for stage results
+
+        Returns:
+            Results by step name
+        """
+        with tracer.span('pipeline.run', structured=self.structured):
+            results = dict(done or {})
+            sections = parse_cv(cv_raw or cv_text).sections
+            jd_hash = text_hash(job_description)
+            keys = self._step_keys(sections, job_description)
+
+            for step in STEPS:
+                if step.name in results:
+                    continue
+                with tracer.span('pipeline.step', step=step.name) as span:
+                    key = keys[step.name]
+                    payload = cache.get_cached(key) if cache is not None else None
+                    span.set(cached=payload is not None)
+                    if payload is not None:
+                        results[step.name] = result_from_record(payload['result'])
+                        if on_result:
+                            metrics = dict(payload.get('metrics') or {}, cached=True)
+                            on_result(step.name, results[step.name], metrics)
+                        continue
+
+                    if on_step:
+                        on_step(step)
+                    with track_usage() as usage:
+                        if step.name == 'improvement':
+                            result = self._improve(cv_text, job_description, sections, jd_hash, cache)
+                        else:
+                            result = self.run_step(step.name, cv_text, job_description)
+                    results[step.name] = result
+                    metrics = dict(usage, seconds=round(span.elapsed(), 2), cached=False,
+                                   error=isinstance(result, AgentFailure))
+                    span.set(llm_calls=usage['calls'], output_tokens=usage['output_tokens'], error=metrics['error'])
+                    if cache is not None and not metrics['error']:
+                        cache.put_cached(key, step.name, {'result': result_to_record(result), 'metrics': metrics})
+                    if on_result:
+                        on_result(step.name, result, metrics)
+            return results
+
+
+_pipeline: Optional[AnalysisPipeline] = None
+_pipeline_lock = threading.Lock()
+
+
+def get_pipeline() -> AnalysisPipeline:
+    """Shared pipeline, created on first use"""
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            _pipeline = AnalysisPipeline()
+        return _pipeline
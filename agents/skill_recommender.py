@@ -1,15 +1,22 @@
 from crewai import Agent
 from config.crew_config import CrewConfig
 from tools.search_tool import create_search_tools
+from tools.query_planner import query_planner
+from tools.skill_catalog import skill_catalog
+from utils.llm_scheduler import RequestCancelled
 from utils.logger import app_logger
+from utils.tracing import tracer
 from utils.text_cleaner import TextCleaner
+from utils.structured_output import AgentFailure, SkillRecommendation, generate_structured
+from typing import List, Union
 import os
 
 class SkillRecommenderAgent:
     """Agent responsible for identifying skill gaps and recommending learning resources"""
     
     def __init__(self):
-        self.llm = CrewConfig.get_llm()
+        self.llm = CrewConfig.get_llm('skill_recommender')
+        self.structured_llm = CrewConfig.get_llm('skill_recommender', output_schema=SkillRecommendation.SCHEMA)
         self.search_tools = create_search_tools()
         self.agent = None
         self._load_prompt()
@@ -48,12 +55,13 @@ class SkillRecommenderAgent:
             of online education platforms, certification programs, and skill development pathways. You have 
             helped countless professionals upskill and advance their careers by identifying precise skill gaps 
             and recommending the most effective learning resources tailored to their goals.""",
-            verbose=True,
+            verbose=CrewConfig.AGENT_VERBOSE,
             allow_delegation=False,
             llm=self.llm,
             tools=[]  # Empty tools list to avoid compatibility issues
         )
     
+    @tracer.traced('agent.recommend_skills', agent='Skill Recommender')
     def recommend_skills(self, cv_text: str, job_description: str) -> str:
         """
         Analyze skill gaps and recommend learning resources
@@ -69,45 +77,32 @@ class SkillRecommenderAgent:
             app_logger.log_agent_start("Skill Recommender", "Skill Gap Analysis")
             
             # Format the prompt with both CV and JD
-            formatted_prompt = self.system_prompt.format(
-                cv_text=cv_text,
-                job_description=job_description
-            )
+            with tracer.span('prompt.format'):
+                formatted_prompt = self.system_prompt.format(
+                    cv_text=cv_text,
+                    job_description=job_description
+                )
             
             # Execute the skill analysis using the LLM directly
-            try:
-                # Try different methods based on LLM version
-                if hasattr(self.llm, 'invoke'):
-                    result = self.llm.invoke(formatted_prompt)
-                elif hasattr(self.llm, '__call__'):
-                    result = self.llm(formatted_prompt)
-                elif hasattr(self.llm, 'generate'):
-                    result = self.llm.generate([formatted_prompt]).generations[0][0].text
-                else:
-                    # Fallback to string conversion
-                    result = str(self.llm.invoke(formatted_prompt))
-            except Exception as llm_error:
-                # Fallback method
-                result = f"LLM invocation failed: {llm_error}. Using fallback analysis."
+            # Try different methods based on LLM version
+            if hasattr(self.llm, 'invoke'):
+                result = self.llm.invoke(formatted_prompt)
+            elif hasattr(self.llm, '__call__'):
+                result = self.llm(formatted_prompt)
+            elif hasattr(self.llm, 'generate'):
+                result = self.llm.generate([formatted_prompt]).generations[0][0].text
+            else:
+                # Fallback to string conversion
+                result = str(self.llm.invoke(formatted_prompt))
             
             # Enhance with search results for key skills
             try:
                 # Extract potential skills that need development
                 enhanced_result = result + "\n\n## 🔍 Additional Learning Resources:\n"
                 
-                # Search for learning resources for common skills
-                learning_tool = next((tool for tool in self.search_tools if tool.name == 'learning_search'), None)
-                if learning_tool:
-                    # Sample skills to search for (in a real implementation, this would be extracted from the analysis)
-                    sample_skills = ["Python", "React", "Machine Learning", "Data Analysis"]
-                    for skill in sample_skills[:2]:  # Limit to 2 to avoid too many requests
-                        try:
-                            search_results = learning_tool.func(skill)
-                            enhanced_result += f"\n### {skill} Learning Resources:\n{search_results[:500]}...\n"
-                        except:
-                            continue
-                
-                result = enhanced_result
+                # Recommend resources only for JD skills that are missing from the CV
+                search_plan = query_planner.plan(cv_text, job_description)
+                result = enhanced_result + self._resource_sections(search_plan.skill_queries)
             except Exception as e:
                 # If search enhancement fails, continue with basic result
                 app_logger.warning(f"Search enhancement failed: {e}")
@@ -115,13 +110,74 @@ class SkillRecommenderAgent:
             # Clean the agent output using regex to remove think tags
             cleaned_result = TextCleaner.clean_agent_output(result)
             
-            app_logger.log_agent_complete("Skill Recommender", "Skill Gap Analysis", 0)
+            app_logger.log_agent_complete("Skill Recommender", "Skill Gap Analysis", tracer.current().elapsed())
             return cleaned_result
             
+        except RequestCancelled:
+            raise
         except Exception as e:
             error_msg = f"Skill recommendation analysis failed: {str(e)}"
             app_logger.log_agent_error("Skill Recommender", "Skill Gap Analysis", error_msg)
-            return f"Error in skill recommendation: {error_msg}"
+            return AgentFailure(f"Error in skill recommendation: {error_msg}")
+    
+    def _resource_sections(self, skills: List[str]) -> str:
+        """Learning resource sections for skills, from the catalog or a live search"""
+        sections = ""
+        learning_tool = next((tool for tool in self.search_tools if tool.name == 'learning_search'), None)
+        for skill in skills:
+            # Known skills are answered from the offline catalog
+            resources = skill_catalog.lookup(skill)
+            if resources:
+                sections += skill_catalog.format_resources(skill, resources)
+                continue
+            
+            # Live search only for skills the catalog does not know yet
+            if learning_tool:
+                try:
+                    search_results = query_planner.execute(learning_tool.name, skill, learning_tool.func)
+                    sections += f"\n### {skill} Learning Resources:\n{search_results[:500]}...\n"
+                except:
+                    continue
+        
+        # Enrich stale entries and learn the unknown skills for next time
+        skill_catalog.refresh_in_background()
+        return sections
+    
+    @tracer.traced('agent.recommend_skills_structured', agent='Skill Recommender')
+    def recommend_skills_structured(self, cv_text: str, job_description: str) -> Union[SkillRecommendation, str]:
+        """
+        Analyze skill gaps as a typed result, with catalog resources attached to each gap
+        
+        Args:
+            cv_text: The CV text to analyze
+            job_description: The target job description
+            
+        Returns:
+            SkillRecommendation, or the free-form analysis if the model output can't be parsed
+        """
+        app_logger.log_agent_start("Skill Recommender", "Skill Gap Analysis (structured)")
+        with tracer.span('prompt.format'):
+            formatted_prompt = self.system_prompt.format(cv_text=cv_text, job_description=job_description)
+        recommendation = generate_structured(self.structured_llm, formatted_prompt, SkillRecommendation)
+        if recommendation is None:
+            app_logger.warning("Structured skill analysis could not be parsed, using free-form output")
+            return self.recommend_skills(cv_text, job_description)
+        
+        try:
+            for gap in recommendation.gaps:
+                gap.resources = skill_catalog.lookup(gap.skill) or []
+            
+            # Planned skills without catalog resources still get a search section
+            covered = {query_planner.canonicalize(gap.skill) for gap in recommendation.gaps if gap.resources}
+            search_plan = query_planner.plan(cv_text, job_description)
+            remaining = [skill for skill in search_plan.skill_queries
+                         if query_planner.canonicalize(skill) not in covered]
+            recommendation.supplement = self._resource_sections(remaining).strip()
+        except Exception as e:
+            app_logger.warning(f"Search enhancement failed: {e}")
+        
+        app_logger.log_agent_complete("Skill Recommender", "Skill Gap Analysis (structured)", tracer.current().elapsed())
+        return recommendation
     
     def search_learning_resources(self, skill: str) -> str:
         """
@@ -134,14 +190,14 @@ class SkillRecommenderAgent:
             Learning resource search results
         """
         try:
-            app_logger.log_search_query("learning_search", skill)
+            resources = skill_catalog.lookup(skill)
+            if resources:
+                return skill_catalog.format_resources(skill, resources, limit=len(resources))
             
-            # Use the learning search tool
+            # Use the learning search tool (shared with the other agents' queries)
             learning_tool = next((tool for tool in self.search_tools if tool.name == 'learning_search'), None)
             if learning_tool:
-                results = learning_tool.func(skill)
-                app_logger.log_search_results("learning_search", skill, len(results.split('\n')))
-                return results
+                return query_planner.execute(learning_tool.name, skill, learning_tool.func)
             else:
                 return "Learning search tool not available"
                 
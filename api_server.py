@@ -0,0 +1,286 @@
+"""
+Async HTTP API for the CV analysis pipeline
+
+Runs the same shared agents, caches, job store and LLM scheduler as the
+Streamlit app, without rerunning a script per interaction.
+
+Endpoints:
+    GET    /health                   Ollama and LLM queue status
+    GET    /metrics                  Latency, cache and queue metrics (Prometheus text format)
+    POST   /analyses                 Submit a full analysis (background job)
+    POST   /analyses/batch           Submit several analyses at batch priority
+    GET    /analyses/{job_id}        Job state and (partial) results
+    GET    /analyses/{job_id}/events Server-sent events as the job progresses
+    DELETE /analyses/{job_id}        Cancel a job
+    POST   /agents/{step}            Run one agent (evaluation, improvement, skills, jobs)
+
+Usage:
+    python api_server.py [--host 127.0.0.1] [--port 8000]
+"""
+
+import argparse
+import asyncio
+import functools
+import json
+import os
+import sys
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from aiohttp import web
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from agents.pipeline import STEPS, get_pipeline
+from utils.analysis_jobs import analysis_jobs
+from utils.llm_scheduler import BATCH, INTERACTIVE, RequestCancelled, llm_scheduler
+from utils.logger import app_logger
+from utils.metrics import metrics
+from utils.ollama_health import ollama_health
+from utils.structured_output import AgentFailure, result_to_record
+from utils.text_cleaner import TextCleaner
+from utils.tracing import tracer
+
+API_HOST = os.getenv("API_HOST", "127.0.0.1")
+API_PORT = int(os.getenv("API_PORT", "8000"))
+
+# Threads for blocking work (agent calls, SQLite); LLM concurrency is capped by the scheduler
+API_WORKERS = int(os.getenv("API_WORKERS", "16"))
+
+# Largest batch accepted in one request
+MAX_BATCH_SIZE = int(os.getenv("API_MAX_BATCH_SIZE", "50"))
+
+# Seconds between job polls of an event stream
+EVENT_POLL_INTERVAL = 1.0
+
+STEP_NAMES = [step.name for step in STEPS]
+
+
+def _error(status: int, message: str) -> web.Response:
+    return web.json_response({'error': message}, status=status)
+
+
+def _client_id(request: web.Request) -> str:
+    """Owner of the request's jobs and its LLM scheduler session: the X-Client-ID header, else the peer address"""
+    return f"api:{request.headers.get('X-Client-ID') or request.remote or 'unknown'}"
+
+
+def _job_payload(job) -> dict:
+    return {
+        'job_id': job.job_id,
+        'state': job.state,
+        'progress': round(job.progress, 2),
+        'current_step': job.current_step or None,
+        'queue_position': analysis_jobs.queue_position(job.job_id),
+        'error': job.error or None,
+        'created': job.created,
+        'updated': job.updated,
+        'results': {name: result_to_record(value) for name, value in job.results.items()}
+    }
+
+
+def _parse_analysis(data) -> tuple:
+    """(raw CV, cleaned CV, cleaned job description) from a request body, or raise ValueError"""
+    if not isinstance(data, dict):
+        raise ValueError("Expected a JSON object")
+    cv_text = data.get('cv_text')
+    job_description = data.get('job_description')
+    if not isinstance(cv_text, str) or not cv_text.strip():
+        raise ValueError("'cv_text' is required")
+    if not isinstance(job_description, str) or not job_description.strip():
+        raise ValueError("'job_description' is required")
+    return cv_text, TextCleaner.clean_cv_text(cv_text), TextCleaner.clean_job_description(job_description)
+
+
+async def _read_json(request: web.Request):
+    try:
+        return await request.json()
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        raise ValueError("Request body must be valid JSON")
+
+
+class APIServer:
+    """aiohttp application over the shared analysis pipeline and job manager"""
+
+    def __init__(self, jobs=analysis_jobs, pipeline_factory=get_pipeline, workers: int = API_WORKERS):
+        self.jobs = jobs
+        self.pipeline_factory = pipeline_factory
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='api')
+
+    def create_app(self) -> web.Application:
+        app = web.Application(client_max_size=4 * 1024 * 1024, middlewares=[self._request_context])
+        app.add_routes([
+            web.get('/health', self.health),
+            web.get('/metrics', self.metrics),
+            web.post('/analyses', self.submit_analysis),
+            web.post('/analyses/batch', self.submit_batch),
+            web.get('/analyses/{job_id}', self.get_analysis),
+            web.get('/analyses/{job_id}/events', self.analysis_events),
+            web.delete('/analyses/{job_id}', self.cancel_analysis),
+            web.post('/agents/{step}', self.run_agent),
+        ])
+        app.on_cleanup.append(self._shutdown)
+        return app
+
+    @web.middleware
+    async def _request_context(self, request: web.Request, handler):
+        """Tag the request's log records (including those of the work it hands to threads) with its id"""
+        request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex[:12]
+        with app_logger.context(request_id=request_id):
+            response = await handler(request)
+        if not response.prepared:
+            response.headers['X-Request-ID'] = request_id
+        return response
+
+    async def _shutdown(self, app: web.Application):
+        self.executor.shutdown(wait=False)
+
+    async def _blocking(self, function, *args):
+        """Run blocking work off the event loop, keeping the request's log and trace context"""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, tracer.wrap(function), *args)
+
+    async def health(self, request: web.Request) -> web.Response:
+        ollama = await self._blocking(ollama_health.check)
+        return web.json_response({'status': 'ok' if ollama['connected'] else 'degraded', 'ollama': ollama,
+                                  'llm_queue': llm_scheduler.get_stats()})
+
+    async def metrics(self, request: web.Request) -> web.Response:
+        # Collectors may read SQLite, so render off the event loop
+        text = await self._blocking(metrics.render_prometheus)
+        return web.Response(body=text.encode('utf-8'),
+                            headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'})
+
+    async def submit_analysis(self, request: web.Request) -> web.Response:
+        try:
+            data = await _read_json(request)
+            cv_raw, cv_text, job_description = _parse_analysis(data)
+        except ValueError as e:
+            return _error(400, str(e))
+        priority = BATCH if data.get('priority') == 'batch' else INTERACTIVE
+        app_logger.log_user_input(len(cv_text), len(job_description))
+        job_id = await self._blocking(functools.partial(self.jobs.submit, cv_text, job_description, priority,
+                                                        cv_raw=cv_raw, owner=_client_id(request)))
+        return web.json_response({'job_id': job_id, 'status_url': f"/analyses/{job_id}"}, status=202)
+
+    async def submit_batch(self, request: web.Request) -> web.Response:
+        try:
+            data = await _read_json(request)
+            items = data.get('items') if isinstance(data, dict) else None
+            if not isinstance(items, list) or not items:
+                raise ValueError("'items' must be a non-empty list")
+            if len(items) > MAX_BATCH_SIZE:
+                raise ValueError(f"At most {MAX_BATCH_SIZE} items per batch")
+            analyses = [_parse_analysis(item) for item in items]
+        except ValueError as e:
+            return _error(400, str(e))
+        # Batch jobs yield to interactive requests in the LLM queue
+        owner = _client_id(request)
+        job_ids = [await self._blocking(functools.partial(self.jobs.submit, cv_text, job_description, BATCH,
+                                                          cv_raw=cv_raw, owner=owner))
+                   for cv_raw, cv_text, job_description in analyses]
+        return web.json_response({'job_ids': job_ids}, status=202)
+
+    async def get_analysis(self, request: web.Request) -> web.Response:
+        job = await self._blocking(self.jobs.get, request.match_info['job_id'])
+        if job is None:
+            return _error(404, "Analysis not found")
+        return web.json_response(_job_payload(job))
+
+    async def cancel_analysis(self, request: web.Request) -> web.Response:
+        job_id = request.match_info['job_id']
+        if await self._blocking(self.jobs.get, job_id) is None:
+            return _error(404, "Analysis not found")
+        cancelled = await self._blocking(self.jobs.cancel, job_id)
+        return web.json_response({'job_id': job_id, 'cancelled': cancelled})
+
+    async def analysis_events(self, request: web.Request) -> web.StreamResponse:
+        """
+        Stream a job's progress as server-sent events
+
+        Events: 'state' on every state or step change, 'result' once per
+        finished agent step, and a final 'done' when the job ends.
+        """
+        job_id = request.match_info['job_id']
+        job = await self._blocking(self.jobs.get, job_id)
+        if job is None:
+            return _error(404, "Analysis not found")
+
+        response = web.StreamResponse(headers={
+            'Content-Type': 'text/event-stream',
+            'Cache-Control': 'no-cache'
+        })
+        await response.prepare(request)
+
+        async def send(event: str, data: dict):
+            await response.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode('utf-8'))
+
+        sent_results = set()
+        last_status = None
+        while True:
+            status = (job.state, job.current_step)
+            if status != last_status:
+                last_status = status
+                await send('state', {'job_id': job_id, 'state': job.state, 'current_step': job.current_step or None,
+                                     'progress': round(job.progress, 2)})
+            for name, value in job.results.items():
+                if name not in sent_results:
+                    sent_results.add(name)
+                    await send('result', {'step': name, **result_to_record(value)})
+            if job.finished:
+                await send('done', {'job_id': job_id, 'state': job.state, 'error': job.error or None})
+                break
+            await asyncio.sleep(EVENT_POLL_INTERVAL)
+            job = await self._blocking(self.jobs.get, job_id)
+
+        await response.write_eof()
+        return response
+
+    def _run_step(self, step: str, cv_text: str, job_description: str, session_id: str,
+                  disconnected: threading.Event):
+        # Scheduler context is per thread, so enter it in the worker
+        with llm_scheduler.context(session_id, INTERACTIVE, is_alive=lambda: not disconnected.is_set()):
+            return self.pipeline_factory().run_step(step, cv_text, job_description)
+
+    async def run_agent(self, request: web.Request) -> web.Response:
+        """Run a single agent synchronously and return its result"""
+        step = request.match_info['step']
+        if step not in STEP_NAMES:
+            return _error(404, f"Unknown agent step '{step}', expected one of {STEP_NAMES}")
+        try:
+            _, cv_text, job_description = _parse_analysis(await _read_json(request))
+        except ValueError as e:
+            return _error(400, str(e))
+
+        disconnected = threading.Event()
+        try:
+            result = await self._blocking(self._run_step, step, cv_text, job_description, _client_id(request),
+                                          disconnected)
+        except asyncio.CancelledError:
+            # Client went away: drop this request's queued LLM call
+            disconnected.set()
+            raise
+        except RequestCancelled as e:
+            return _error(503, str(e))
+        except Exception as e:
+            app_logger.error(f"API agent step '{step}' failed: {e}")
+            return _error(500, f"Agent step failed: {e}")
+        if isinstance(result, AgentFailure):
+            return _error(500, str(result))
+        return web.json_response({'step': step, **result_to_record(result)})
+
+
+def main():
+    """Start the API server"""
+    parser = argparse.ArgumentParser(description="CrewAI CV Assistant HTTP API")
+    parser.add_argument('--host', default=API_HOST)
+    parser.add_argument('--port', type=int, default=API_PORT)
+    args = parser.parse_args()
+
+    app_logger.info(f"Starting API server on {args.host}:{args.port}")
+    web.run_app(APIServer().create_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
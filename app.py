@@ -1,5 +1,7 @@
 import streamlit as st
+import json
 import time
+import uuid
 from datetime import datetime
 import os
 import sys
@@ -7,14 +9,19 @@ import sys
 # Add project root to path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from agents.cv_evaluator import CVEvaluatorAgent
-from agents.cv_improver import CVImproverAgent
-from agents.skill_recommender import SkillRecommenderAgent
-from agents.job_finder import JobFinderAgent
+from agents.pipeline import STEPS, get_pipeline
 from utils.text_cleaner import TextCleaner
 from utils.pdf_reader import PDFReader
 from utils.logger import app_logger
-from config.crew_config import CrewConfig
+from utils.structured_output import ATSEvaluation, StructuredResult
+from utils.llm_scheduler import llm_scheduler
+from utils.analysis_jobs import analysis_jobs, DONE, FAILED, CANCELLED
+from utils.result_store import result_store
+from utils.metrics import start_metrics_server
+from utils.ollama_health import ollama_health
+
+# Seconds between progress refreshes while an analysis job runs (only the progress panel is redrawn)
+JOB_POLL_INTERVAL = 1.5
 
 # Page configuration
 st.set_page_config(
@@ -84,17 +91,13 @@ class CVAssistantApp:
             
         try:
             with st.spinner("Initializing AI agents... This may take a moment."):
-                # Test Ollama connection first
-                llm = CrewConfig.get_llm()
-                test_response = llm.invoke("Hello")
+                # Check Ollama and the model without generating (a test prompt would wait in the LLM queue)
+                status = ollama_health.check(force=True)
+                if not status['connected'] or not status['model_available']:
+                    raise ConnectionError(status['error'])
                 
-                # Initialize agents
-                self.agents = {
-                    'evaluator': CVEvaluatorAgent(),
-                    'improver': CVImproverAgent(),
-                    'skill_recommender': SkillRecommenderAgent(),
-                    'job_finder': JobFinderAgent()
-                }
+                # Initialize agents (shared with the background analysis jobs)
+                self.agents = get_pipeline().agents
                 
                 self.agents_initialized = True
                 st.success("✅ AI agents initialized successfully!")
@@ -137,15 +140,42 @@ class CVAssistantApp:
             
             st.header("⚙️ System Status")
             
-            # Ollama status check
-            try:
-                llm = CrewConfig.get_llm()
-                test_response = llm.invoke("ping")
+            # Ollama status check (cached; reads the installed models rather than generating)
+            status = ollama_health.check()
+            if status['connected'] and status['model_available']:
                 st.success("🟢 Ollama Connected")
-            except:
+            elif status['connected']:
+                st.warning(f"🟡 Ollama Connected, {status['error']}")
+                st.info("Please pull the model with `ollama pull`")
+            else:
                 st.error("🔴 Ollama Disconnected")
                 st.info("Please start Ollama and ensure the model is available")
             
+            # Shared model load across all sessions
+            scheduler_stats = llm_scheduler.get_stats()
+            st.caption(f"LLM queue: {scheduler_stats['active']} running, {scheduler_stats['queued']} waiting")
+            
+            # Analyses keep running in the background; reconnect to any of this session's
+            owner = st.session_state.owner_id
+            running_jobs = [job for job in analysis_jobs.recent(10, owner=owner)
+                            if job['state'] not in (DONE, FAILED, CANCELLED)]
+            if running_jobs:
+                st.header("⏳ Running Analyses")
+                for job in running_jobs:
+                    started = datetime.fromtimestamp(job['created']).strftime('%H:%M:%S')
+                    if st.button(f"{started} · {job['state']}", key=f"job_{job['job_id']}"):
+                        self.attach_job(job['job_id'])
+            
+            # Finished analyses load instantly from the result store
+            previous = result_store.recent(8, owner=owner)
+            if previous:
+                st.header("📚 Previous Analyses")
+                for entry in previous:
+                    created = datetime.fromtimestamp(entry['created']).strftime('%m-%d %H:%M')
+                    score = f" · {entry['score']}/100" if entry['score'] is not None else ""
+                    if st.button(f"{created} · {entry['title']}{score}", key=f"result_{entry['key']}"):
+                        self.open_stored_analysis(entry['key'])
+            
             # Agent status
             if self.agents_initialized:
                 st.success("🟢 Agents Ready")
@@ -163,7 +193,7 @@ class CVAssistantApp:
         try:
             if data_type == 'cv':
                 with open('data/sample_cv.txt', 'r', encoding='utf-8') as f:
-                    st.session_state.cv_text = f.read()
+                    st.session_state.cv_raw = st.session_state.cv_text = f.read()
                 st.success("Sample CV loaded!")
             elif data_type == 'jd':
                 with open('data/sample_jd.txt', 'r', encoding='utf-8') as f:
@@ -204,7 +234,7 @@ class CVAssistantApp:
             # Text area for CV
             cv_text_input = st.text_area(
                 "Or paste your CV text here:",
-                value=cv_text or st.session_state.get('cv_text', ''),
+                value=cv_text or st.session_state.get('cv_raw', st.session_state.get('cv_text', '')),
                 height=300,
                 placeholder="Paste your CV content here..."
             )
@@ -213,6 +243,8 @@ class CVAssistantApp:
             final_cv_text = cv_text_input if cv_text_input.strip() else cv_text
             
             if final_cv_text:
+                # Keep the raw text too: its line breaks delimit the sections reused across edits
+                st.session_state.cv_raw = final_cv_text
                 cv_cleaned = self.text_cleaner.clean_cv_text(final_cv_text)
                 st.session_state.cv_text = cv_cleaned
                 
@@ -262,66 +294,115 @@ class CVAssistantApp:
                 self.run_full_analysis(cv_text, jd_text)
     
     def run_full_analysis(self, cv_text: str, jd_text: str):
-        """Run full CV analysis with all agents"""
-        start_time = time.time()
+        """Submit a full CV analysis as a background job"""
+        job_id = analysis_jobs.submit(cv_text, jd_text, cv_raw=st.session_state.get('cv_raw'),
+                                      owner=st.session_state.owner_id)
+        self.attach_job(job_id)
+        st.rerun()
+    
+    def attach_job(self, job_id: str):
+        """Follow an analysis job; the id in the URL survives a page refresh"""
+        st.session_state.job_id = job_id
+        st.session_state.pop('stored_analysis', None)
+        st.session_state.analysis_completed = False
+        self.set_location(job=job_id)
+    
+    def open_stored_analysis(self, key: str):
+        """Show a previous analysis from the result store"""
+        st.session_state.stored_analysis = key
+        st.session_state.pop('job_id', None)
+        self.set_location(result=key)
+    
+    def set_location(self, **params):
+        """Put the open analysis in the URL, with the owner id so a refresh keeps this session's history"""
+        st.experimental_set_query_params(owner=st.session_state.owner_id, **params)
+    
+    def render_stored_section(self, key: str):
+        """Render a previous analysis with how long each step took"""
+        stored = result_store.get(key) if result_store.is_owner(key, st.session_state.owner_id) else None
+        if stored is None:
+            st.warning("⚠️ Previous analysis not found. It may have expired.")
+            st.session_state.pop('stored_analysis', None)
+            self.set_location()
+            return
         
-        # Progress tracking
-        progress_bar = st.progress(0)
-        status_text = st.empty()
+        st.session_state.analysis_results = stored.results
+        st.session_state.analysis_completed = True
         
-        results = {}
+        created = datetime.fromtimestamp(stored.created).strftime('%Y-%m-%d %H:%M')
+        st.info(f"📚 Previous analysis from {created}: {stored.title}")
+        step_metrics = [
+            f"{step.name}: {stored.metrics[step.name].get('seconds', 0):.1f}s, "
+            f"{stored.metrics[step.name].get('output_tokens', 0)} tokens"
+            for step in STEPS if step.name in stored.metrics
+        ]
+        if step_metrics:
+            st.caption(f"⏱️ {' · '.join(step_metrics)} (model: {stored.model})")
         
-        try:
-            # Agent 1: CV Evaluator
-            status_text.text("🔍 Evaluating CV for ATS compatibility...")
-            progress_bar.progress(25)
-            
-            results['evaluation'] = self.agents['evaluator'].evaluate_cv(cv_text)
-            
-            # Agent 2: CV Improver
-            status_text.text("🎯 Analyzing CV improvements...")
-            progress_bar.progress(50)
-            
-            results['improvement'] = self.agents['improver'].improve_cv(cv_text, jd_text)
-            
-            # Agent 3: Skill Recommender
-            status_text.text("📚 Identifying skill gaps and learning resources...")
-            progress_bar.progress(75)
-            
-            results['skills'] = self.agents['skill_recommender'].recommend_skills(cv_text, jd_text)
-            
-            # Agent 4: Job Finder
-            status_text.text("💼 Finding relevant job opportunities...")
-            progress_bar.progress(100)
-            
-            results['jobs'] = self.agents['job_finder'].find_jobs(cv_text, jd_text)
-            
-            # Store results in session state
-            st.session_state.analysis_results = results
-            st.session_state.analysis_completed = True
-            
-            total_time = time.time() - start_time
-            app_logger.log_crew_execution(4, total_time)
-            
-            # Clear progress indicators
-            progress_bar.empty()
-            status_text.empty()
-            
-            st.success(f"✅ Analysis completed in {total_time:.1f} seconds!")
-            
-        except Exception as e:
-            st.error(f"❌ Analysis failed: {str(e)}")
-            app_logger.error(f"Full analysis failed: {str(e)}")
+        self.render_results_section(stored.results)
     
-    def render_results_section(self):
-        """Render analysis results"""
-        if not st.session_state.get('analysis_completed', False):
+    def render_job_section(self, job_id: str):
+        """Render the progress and (partial) results of an analysis job"""
+        job = analysis_jobs.get(job_id)
+        if job is None or job.owner != st.session_state.owner_id:
+            st.warning("⚠️ Analysis not found. It may have expired.")
+            st.session_state.pop('job_id', None)
+            self.set_location()
             return
         
-        results = st.session_state.get('analysis_results', {})
+        st.session_state.analysis_results = job.results
+        st.session_state.analysis_completed = job.state == DONE
+        
+        if not job.finished:
+            progress_panel = st.empty()
+            self.render_job_progress(progress_panel, job)
+            if st.button("✖️ Cancel Analysis"):
+                analysis_jobs.cancel(job_id)
+                st.rerun()
+        elif job.state == DONE:
+            st.success(f"✅ Analysis completed in {job.updated - job.created:.1f} seconds!")
+        elif job.state == FAILED:
+            st.error(f"❌ Analysis failed: {job.error}")
+        elif job.state == CANCELLED:
+            st.warning("Analysis cancelled")
         
+        if job.results:
+            self.render_results_section(job.results, pending=not job.finished)
+        
+        if not job.finished:
+            # Poll the job and redraw only the progress panel; the whole page (sidebar included)
+            # reruns only when a step adds results or the job ends. The job keeps running even if
+            # this page goes away, and a click on Cancel interrupts the loop with its own rerun
+            shown = set(job.results)
+            while True:
+                time.sleep(JOB_POLL_INTERVAL)
+                job = analysis_jobs.get(job_id)
+                if job is None or job.finished or set(job.results) != shown:
+                    st.rerun()
+                self.render_job_progress(progress_panel, job)
+    
+    def render_job_progress(self, panel, job):
+        """Draw a running job's progress bar and queue position into a placeholder"""
+        position = analysis_jobs.queue_position(job.job_id)
+        labels = {step.name: step.label for step in STEPS}
+        with panel.container():
+            st.progress(int(job.progress * 100))
+            if position:
+                # The model is shared with other sessions; show where this one waits
+                st.text(f"⏳ Waiting for the model... position {position} in queue")
+            else:
+                st.text(labels.get(job.current_step, "⏳ Analysis queued..."))
+    
+    def render_results_section(self, results, pending: bool = False):
+        """Render analysis results, marking steps still running when pending"""
         st.header("📊 Analysis Results")
         
+        def not_available(message: str):
+            if pending:
+                st.info("⏳ Still running...")
+            else:
+                st.error(message)
+        
         # Create tabs for each agent's results
         tab1, tab2, tab3, tab4 = st.tabs([
             "📈 ATS Evaluation", 
@@ -335,24 +416,34 @@ class CVAssistantApp:
             st.subheader("🔍 ATS Compatibility Analysis")
             
             if 'evaluation' in results:
-                # Try to extract score if present
-                evaluation_text = results['evaluation']
-                score_match = None
-                import re
-                score_pattern = r'(\d+)/100|Score:\s*(\d+)|ATS.*?(\d+)'
-                score_match = re.search(score_pattern, evaluation_text, re.IGNORECASE)
+                evaluation = results['evaluation']
+                score = None
+                if isinstance(evaluation, ATSEvaluation):
+                    # Structured results carry the score as a field
+                    score = evaluation.score
+                else:
+                    # Try to extract score if present
+                    import re
+                    score_pattern = r'(\d+)/100|Score:\s*(\d+)|ATS.*?(\d+)'
+                    score_match = re.search(score_pattern, evaluation, re.IGNORECASE)
+                    if score_match:
+                        score = next(group for group in score_match.groups() if group)
                 
-                if score_match:
-                    score = next(group for group in score_match.groups() if group)
+                if score is not None:
                     st.markdown(f"""
                     <div class="score-box">
                         ATS Compatibility Score: {score}/100
                     </div>
                     """, unsafe_allow_html=True)
                 
-                st.markdown(evaluation_text)
+                if isinstance(evaluation, ATSEvaluation) and evaluation.sub_scores:
+                    for column, (area, value) in zip(st.columns(len(evaluation.sub_scores)),
+                                                     evaluation.sub_scores.items()):
+                        column.metric(area.replace('_', ' ').title(), f"{value}/100")
+                
+                st.markdown(str(evaluation))
             else:
-                st.error("Evaluation results not available")
+                not_available("Evaluation results not available")
             st.markdown('</div>', unsafe_allow_html=True)
         
         with tab2:
@@ -360,9 +451,9 @@ class CVAssistantApp:
             st.subheader("🎯 CV Improvement Recommendations")
             
             if 'improvement' in results:
-                st.markdown(results['improvement'])
+                st.markdown(str(results['improvement']))
             else:
-                st.error("Improvement results not available")
+                not_available("Improvement results not available")
             st.markdown('</div>', unsafe_allow_html=True)
         
         with tab3:
@@ -370,9 +461,9 @@ class CVAssistantApp:
             st.subheader("📚 Skill Gap Analysis & Learning Resources")
             
             if 'skills' in results:
-                st.markdown(results['skills'])
+                st.markdown(str(results['skills']))
             else:
-                st.error("Skill analysis results not available")
+                not_available("Skill analysis results not available")
             st.markdown('</div>', unsafe_allow_html=True)
         
         with tab4:
@@ -380,13 +471,14 @@ class CVAssistantApp:
             st.subheader("💼 Relevant Job Opportunities")
             
             if 'jobs' in results:
-                st.markdown(results['jobs'])
+                st.markdown(str(results['jobs']))
             else:
-                st.error("Job search results not available")
+                not_available("Job search results not available")
             st.markdown('</div>', unsafe_allow_html=True)
         
         # Download results option
-        self.render_download_section(results)
+        if not pending:
+            self.render_download_section(results)
     
     def render_download_section(self, results):
         """Render download section for results"""
@@ -413,6 +505,12 @@ Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 Generated by CrewAI CV Assistant
         """
         
+        # Typed results are exported as-is; free-form ones as their text
+        report_data = {
+            name: value.to_dict() if isinstance(value, StructuredResult) else {'text': value}
+            for name, value in results.items()
+        }
+        
         col1, col2, col3 = st.columns(3)
         
         with col2:
@@ -423,6 +521,15 @@ Generated by CrewAI CV Assistant
                 mime="text/markdown",
                 use_container_width=True
             )
+        
+        with col3:
+            st.download_button(
+                label="🧾 Download JSON",
+                data=json.dumps(report_data, indent=2, ensure_ascii=False),
+                file_name=f"cv_analysis_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
+                mime="application/json",
+                use_container_width=True
+            )
     
     def run(self):
         """Main application entry point"""
@@ -434,9 +541,13 @@ Generated by CrewAI CV Assistant
         
         self.render_analysis_section()
         
-        if st.session_state.get('analysis_completed', False):
+        job_id = st.session_state.get('job_id')
+        if job_id:
             st.divider()
-            self.render_results_section()
+            self.render_job_section(job_id)
+        elif st.session_state.get('stored_analysis'):
+            st.divider()
+            self.render_stored_section(st.session_state.stored_analysis)
 
 def main():
     """Main function to run the Streamlit app"""
@@ -447,6 +558,19 @@ def main():
         st.session_state.jd_text = ''
     if 'analysis_completed' not in st.session_state:
         st.session_state.analysis_completed = False
+    params = st.experimental_get_query_params()
+    if 'owner_id' not in st.session_state:
+        # Jobs and previous analyses are listed per owner; the id survives a refresh in the URL
+        st.session_state.owner_id = params.get('owner', [''])[0] or uuid.uuid4().hex
+    if 'job_id' not in st.session_state and 'stored_analysis' not in st.session_state:
+        # Reconnect to the analysis named in the URL after a refresh
+        if params.get('job'):
+            st.session_state.job_id = params['job'][0]
+        elif params.get('result'):
+            st.session_state.stored_analysis = params['result'][0]
+    
+    # Prometheus endpoint for this process (no-op unless METRICS_PORT is set)
+    start_metrics_server()
     
     # Create and run the app
     app = CVAssistantApp()
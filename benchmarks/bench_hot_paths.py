@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the text, PDF and HTML hot paths
+
+Measures ops/s and MB/s of TextCleaner (cleaning, skill and title
+extraction, normalization), PDFReader text extraction and WebScraper field
+extraction on generated corpora and the fixtures in benchmarks/fixtures
+and data/. Each case runs for a minimum time several times and keeps its
+best run. Results can be saved as a JSON baseline; later runs compare
+against it and exit with status 1 when a case is slower than the baseline
+by more than the threshold. Baselines are machine-specific, so save one
+on the machine that runs the comparison.
+
+Usage:
+    python benchmarks/bench_hot_paths.py [--filter text.] [--min-time 0.5] [--repeat 3]
+    python benchmarks/bench_hot_paths.py --save-baseline
+    python benchmarks/bench_hot_paths.py --threshold 0.2
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+# Span export would measure disk writes rather than the code under test
+os.environ.setdefault('TRACING_ENABLED', 'false')
+
+# Add project root to path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from tools.scraping_utils import WebScraper
+from utils.cv_parser import parse_cv
+from utils.pdf_reader import PDFReader
+from utils.text_cleaner import TextCleaner
+
+FIXTURES_DIR = os.path.join(ROOT, 'benchmarks', 'fixtures')
+DEFAULT_BASELINE = os.path.join(ROOT, 'benchmarks', 'baselines', 'hot_paths.json')
+
+# Generated documents per corpus; more than parse_cv's cache holds, so every call parses
+CORPUS_SIZE = 96
+
+SKILLS = ["Python", "JavaScript", "TypeScript", "React", "Node.js", "Django", "Flask", "SQL", "PostgreSQL",
+          "MongoDB", "AWS", "Docker", "Kubernetes", "Git", "Java", "Go", "Machine Learning", "TensorFlow",
+          "Redis", "GraphQL", "Terraform", "Linux", "CI/CD", "Agile"]
+TITLES = ["Software Engineer", "Senior Software Engineer", "Backend Developer", "Full Stack Developer",
+          "Data Scientist", "DevOps Engineer", "Frontend Developer", "Machine Learning Engineer"]
+COMPANIES = ["TechCorp", "DataSoft", "Cloudify", "Innovate Labs", "BrightPath", "Nimbus Systems"]
+VERBS = ["Built", "Led", "Designed", "Migrated", "Optimized", "Automated", "Maintained", "Shipped"]
+OBJECTS = ["a payments API", "the data pipeline", "internal dashboards", "CI pipelines", "search services",
+           "a recommendation engine", "customer onboarding flows", "monitoring and alerting"]
+
+
+class Case(NamedTuple):
+    """One benchmarked function and the inputs it cycles through"""
+    name: str
+    func: Callable
+    inputs: List
+    sizes: List[int]
+
+
+def generate_cv(rng: random.Random) -> str:
+    """A CV with the usual sections and the spacing noise of pasted text"""
+    name = f"{rng.choice(['Alex', 'Sam', 'Jordan', 'Taylor'])} {rng.choice(['Lee', 'Khan', 'Smith', 'Garcia'])}"
+    phone = f"+1 (555) {rng.randint(100, 999)}-{rng.randint(1000, 9999)}"
+    lines = [name, f"{name.split()[0].lower()}@example.com  |  {phone}",
+             f"linkedin.com/in/{name.replace(' ', '').lower()}", "", "SUMMARY",
+             f"{rng.choice(TITLES)} with {rng.randint(2, 15)} years of experience in "
+             f"{', '.join(rng.sample(SKILLS, 3))}.", "", "EXPERIENCE"]
+    for _ in range(rng.randint(2, 5)):
+        start = rng.randint(2008, 2020)
+        lines += ["", f"{rng.choice(TITLES)}   |   {rng.choice(COMPANIES)}   |   {start} - {start + rng.randint(1, 4)}"]
+        lines += [f"•  {rng.choice(VERBS)} {rng.choice(OBJECTS)} using {' and '.join(rng.sample(SKILLS, 2))}, "
+                  f"improving throughput by {rng.randint(5, 80)}%" for _ in range(rng.randint(3, 7))]
+    lines += ["", "SKILLS", ', '.join(rng.sample(SKILLS, rng.randint(6, 14))), "", "EDUCATION",
+              f"Bachelor of Science in Computer Science, State University, {rng.randint(2004, 2016)}"]
+    # Pasted CVs carry runs of spaces and blank lines
+    return '\n'.join(line.replace(' ', '  ') if rng.random() < 0.2 else line for line in lines) + '\n\n\n'
+
+
+def generate_job_description(rng: random.Random) -> str:
+    """A job description with requirements, responsibilities and salary"""
+    title = rng.choice(TITLES)
+    lines = [f"{title} - {rng.choice(COMPANIES)}", "", "About the role",
+             f"We are hiring a {title} to join our platform team.", "", "Requirements:"]
+    lines += [f"- {rng.randint(2, 8)}+ years with {skill}" for skill in rng.sample(SKILLS, rng.randint(4, 9))]
+    lines += ["", "Responsibilities:"]
+    lines += [f"- {rng.choice(VERBS)} {rng.choice(OBJECTS)}" for _ in range(rng.randint(3, 6))]
+    lines += ["", f"Salary: ${rng.randint(80, 140)},000 - ${rng.randint(150, 220)},000 per year"]
+    return '\n'.join(lines)
+
+
+def generate_job_page(rng: random.Random) -> bytes:
+    """A job posting page with the markup the scraper's selectors target, plus boilerplate"""
+    description = generate_job_description(rng)
+    requirements = ''.join(f"<li>{skill} experience</li>" for skill in rng.sample(SKILLS, 6))
+    boilerplate = ''.join(f"<div class='nav-item'><a href='/jobs/{index}'>{rng.choice(TITLES)}</a></div>"
+                          for index in range(rng.randint(100, 300)))
+    return (f"<html><head><title>{rng.choice(TITLES)}</title></head><body><nav>{boilerplate}</nav>"
+            f"<h1 class='job-title'>{rng.choice(TITLES)}</h1><div class='company-name'>{rng.choice(COMPANIES)}</div>"
+            f"<div class='location'>Remote</div><div class='job-description'><p>{description}</p>"
+            f"<h3>Requirements</h3><ul>{requirements}</ul></div>"
+            f"<span class='salary'>${rng.randint(80, 140)},000 - ${rng.randint(150, 220)},000</span>"
+            f"<footer>{boilerplate}</footer></body></html>").encode('utf-8')
+
+
+def make_pdf(text: str, lines_per_page: int = 50) -> bytes:
+    """A minimal text PDF (Helvetica, one line per text row) for the extraction benchmark"""
+    rows = text.splitlines() or ['']
+    pages = [rows[i:i + lines_per_page] for i in range(0, len(rows), lines_per_page)]
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page_rows in pages:
+        stream = "BT /F1 10 Tf 12 TL 50 780 Td " + ' '.join(
+            "(" + row.encode('latin-1', 'replace').decode('latin-1')
+            .replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)') + ") Tj T*" for row in page_rows) + " ET"
+        objects.append(f"<< /Length {len(stream.encode('latin-1'))} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    output = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += f"{number} 0 obj\n{body}\nendobj\n".encode('latin-1')
+    xref = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode('latin-1')
+    output += ''.join(f"{offset:010d} 00000 n \n" for offset in offsets).encode('latin-1')
+    output += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode('latin-1')
+    return output
+
+
+def cold(extract: Callable) -> Callable:
+    """Run an extractor without the parsed document cached, as on a CV's first use"""
+    def run(text):
+        parse_cv.cache_clear()
+        return extract(text)
+    return run
+
+
+def build_cases(seed: int) -> List[Case]:
+    """Benchmark cases on generated corpora and fixtures"""
+    rng = random.Random(seed)
+    cvs = [generate_cv(rng) for _ in range(CORPUS_SIZE)]
+    jds = [generate_job_description(rng) for _ in range(CORPUS_SIZE)]
+    job_pages = [generate_job_page(rng) for _ in range(16)]
+    pdfs = [make_pdf(cv * 3) for cv in cvs[:16]]
+
+    with open(os.path.join(ROOT, 'data', 'sample_cv.txt'), encoding='utf-8') as f:
+        sample_cv = f.read()
+    with open(os.path.join(ROOT, 'data', 'sample_jd.txt'), encoding='utf-8') as f:
+        sample_jd = f.read()
+    with open(os.path.join(FIXTURES_DIR, 'job_posting.html'), 'rb') as f:
+        job_fixture = f.read()
+    with open(os.path.join(FIXTURES_DIR, 'course_page.html'), 'rb') as f:
+        course_fixture = f.read()
+
+    scraper = WebScraper(store=None)
+    text_size = lambda texts: [len(text.encode('utf-8')) for text in texts]
+    return [
+        Case('text.clean_cv', TextCleaner.clean_cv_text, cvs, text_size(cvs)),
+        Case('text.clean_job_description', TextCleaner.clean_job_description, jds, text_size(jds)),
+        Case('text.standardize', TextCleaner.standardize_text, cvs, text_size(cvs)),
+        Case('text.clean_agent_output', TextCleaner.clean_agent_output, jds, text_size(jds)),
+        Case('text.extract_skills', cold(TextCleaner.extract_skills_from_text), cvs, text_size(cvs)),
+        Case('text.extract_skills[sample_cv]', cold(TextCleaner.extract_skills_from_text), [sample_cv],
+             text_size([sample_cv])),
+        Case('text.extract_titles[sample_jd]', cold(TextCleaner.extract_job_titles), [sample_jd],
+             text_size([sample_jd])),
+        Case('text.parse_cv', cold(parse_cv), cvs, text_size(cvs)),
+        Case('pdf.extract', PDFReader.extract_text_from_pdf_bytes, pdfs, [len(pdf) for pdf in pdfs]),
+        Case('html.job_details', scraper._parse_job_details, job_pages, [len(page) for page in job_pages]),
+        Case('html.job_details[fixture]', scraper._parse_job_details, [job_fixture], [len(job_fixture)]),
+        Case('html.course[fixture]', scraper._parse_learning_resource, [course_fixture], [len(course_fixture)]),
+    ]
+
+
+def measure(case: Case, min_time: float, repeat: int) -> Dict[str, float]:
+    """Best seconds per op over `repeat` runs of at least `min_time` seconds each"""
+    for item in case.inputs[:3]:
+        case.func(item)  # warm-up
+    best = None
+    for _ in range(repeat):
+        ops = processed = 0
+        started = time.perf_counter()
+        while True:
+            index = ops % len(case.inputs)
+            case.func(case.inputs[index])
+            processed += case.sizes[index]
+            ops += 1
+            elapsed = time.perf_counter() - started
+            if elapsed >= min_time and ops >= len(case.inputs):
+                break
+        if best is None or elapsed / ops < best[0]:
+            best = (elapsed / ops, processed / ops)
+    seconds, size = best
+    return {'ops_per_sec': round(1 / seconds, 2), 'mb_per_sec': round(size / seconds / (1024 * 1024), 3),
+            'mean_bytes': int(size)}
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]],
+            threshold: float) -> List[str]:
+    """Cases slower than the baseline by more than threshold (as a fraction)"""
+    regressions = []
+    for name, result in results.items():
+        if name in baseline and result['ops_per_sec'] < baseline[name]['ops_per_sec'] * (1 - threshold):
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    """Run the hot-path benchmarks"""
+    parser = argparse.ArgumentParser(description="Benchmark the text, PDF and HTML hot paths")
+    parser.add_argument('--filter', default='', help="Only run cases whose name contains this")
+    parser.add_argument('--min-time', type=float, default=0.5, help="Minimum seconds per run")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per case; the fastest counts")
+    parser.add_argument('--seed', type=int, default=42, help="Seed for the generated corpora")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="Baseline JSON to compare with or save to")
+    parser.add_argument('--save-baseline', action='store_true', help="Save these results as the baseline")
+    parser.add_argument('--threshold', type=float, default=0.2, help="Allowed slowdown vs the baseline (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    baseline: Optional[Dict] = None
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    print("⏱️ Hot-path micro-benchmarks")
+    print(f"Python {platform.python_version()} on {platform.platform()}")
+    if baseline:
+        print(f"Baseline: {args.baseline} ({baseline.get('created', '?')}), threshold {args.threshold:.0%}")
+    print("=" * 78)
+    print(f"{'case':<34} {'ops/s':>10} {'MB/s':>9} {'KB/op':>8} {'vs baseline':>12}")
+
+    results = {}
+    for case in build_cases(args.seed):
+        if args.filter not in case.name:
+            continue
+        result = results[case.name] = measure(case, args.min_time, args.repeat)
+        change = ''
+        if baseline and case.name in baseline['results']:
+            ratio = result['ops_per_sec'] / baseline['results'][case.name]['ops_per_sec']
+            change = f"{ratio - 1:+.1%}" + (" ❌" if ratio < 1 - args.threshold else "")
+        print(f"{case.name:<34} {result['ops_per_sec']:>10.1f} {result['mb_per_sec']:>9.2f} "
+              f"{result['mean_bytes'] / 1024:>8.1f} {change:>12}")
+
+    if args.save_baseline:
+        existing = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding='utf-8') as f:
+                existing = json.load(f).get('results', {})
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            # Filtered runs update only their cases
+            json.dump({'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                       'python': platform.python_version(), 'platform': platform.platform(),
+                       'results': dict(existing, **results)}, f, indent=2)
+        print(f"\n💾 Baseline saved to {args.baseline}")
+        return
+
+    if baseline:
+        regressions = compare(results, baseline['results'], args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} case(s) regressed more than {args.threshold:.0%}: "
+                  f"{', '.join(regressions)}")
+            sys.exit(1)
+        print("\n✅ No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Benchmark for WebScraper HTML field extraction
+
+Compares the single-pass extraction engine against the previous approach
+(html.parser, one select_one probe per selector, and a full soup.get_text()
+per regex field) on the saved pages in benchmarks/fixtures.
+
+Usage:
+    python benchmarks/bench_html_extraction.py [--iterations N]
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+from urllib.parse import urlparse
+
+from tools.html_extractor import HTML_PARSER
+from tools.scraping_utils import WebScraper
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def _select_first_text(soup, selectors, **get_text_kwargs):
+    """Previous behaviour: probe each selector with its own select_one"""
+    for selector in selectors:
+        element = soup.select_one(selector)
+        if element:
+            return element.get_text(**get_text_kwargs)
+    return None
+
+
+def legacy_parse_job(content: bytes) -> dict:
+    """Job extraction as implemented before the single-pass engine"""
+    soup = BeautifulSoup(content, 'html.parser')
+    selectors = WebScraper.JOB_FIELD_SELECTORS
+
+    description = _select_first_text(soup, selectors['description'], separator='\n', strip=True)
+    requirements = None
+    for keyword in ['requirements', 'qualifications', 'skills', 'experience']:
+        for heading in soup.find_all(['h2', 'h3', 'h4', 'strong'], string=re.compile(keyword, re.IGNORECASE)):
+            next_element = heading.find_next_sibling(['ul', 'ol', 'div', 'p'])
+            if next_element:
+                requirements = ' '.join(next_element.get_text(separator='\n', strip=True).split())[:500]
+                break
+        if requirements:
+            break
+
+    salary = _select_first_text(soup, selectors['salary'], strip=True)
+    if not salary:
+        salary_match = re.search(r'\$[\d,]+(?:\s*-\s*\$[\d,]+)?(?:\s*per\s+year|/year|annually)?',
+                                 soup.get_text(), re.IGNORECASE)
+        salary = salary_match.group() if salary_match else None
+
+    details = {
+        'title': _select_first_text(soup, selectors['title'], strip=True),
+        'company': _select_first_text(soup, selectors['company'], strip=True),
+        'location': _select_first_text(soup, selectors['location'], strip=True),
+        'description': ' '.join(description.split())[:1000] if description else None,
+        'requirements': requirements,
+        'salary': salary
+    }
+    return {k: v for k, v in details.items() if v}
+
+
+def legacy_parse_course(content: bytes) -> dict:
+    """Learning resource extraction as implemented before the single-pass engine"""
+    soup = BeautifulSoup(content, 'html.parser')
+    selectors = WebScraper.COURSE_FIELD_SELECTORS
+
+    canonical = soup.find('link', {'rel': 'canonical'})
+    domain = urlparse(canonical['href'] if canonical else '').netloc
+    providers = {'coursera.org': 'Coursera', 'udemy.com': 'Udemy', 'edx.org': 'edX',
+                 'youtube.com': 'YouTube', 'pluralsight.com': 'Pluralsight',
+                 'linkedin.com': 'LinkedIn Learning'}
+    provider = next((name for key, name in providers.items() if key in domain), None)
+
+    duration = re.search(r'(\d+(?:\.\d+)?)\s*(hour|hr|minute|min|week|month|day)s?', soup.get_text(), re.IGNORECASE)
+    price = re.search(r'\$\d+(?:\.\d{2})?|free|Free', soup.get_text(), re.IGNORECASE)
+
+    rating = None
+    for selector in selectors['rating']:
+        element = soup.select_one(selector)
+        if element:
+            rating_match = re.search(r'(\d+(?:\.\d+)?)', element.get_text(strip=True))
+            if rating_match:
+                rating = rating_match.group()
+                break
+
+    description = _select_first_text(soup, selectors['description'], separator=' ', strip=True)
+    info = {
+        'title': _select_first_text(soup, selectors['title'], strip=True),
+        'provider': provider,
+        'duration': duration.group() if duration else None,
+        'rating': rating,
+        'price': price.group() if price else None,
+        'description': ' '.join(description.split())[:300] if description else None
+    }
+    return {k: v for k, v in info.items() if v}
+
+
+def time_it(func, content: bytes, iterations: int) -> float:
+    """Return the mean seconds per call"""
+    func(content)  # warm-up
+    start_time = time.perf_counter()
+    for _ in range(iterations):
+        func(content)
+    return (time.perf_counter() - start_time) / iterations
+
+
+def main():
+    """Run the extraction benchmark"""
+    parser = argparse.ArgumentParser(description="Benchmark WebScraper HTML extraction")
+    parser.add_argument('--iterations', type=int, default=20, help="Iterations per fixture")
+    args = parser.parse_args()
+
+    scraper = WebScraper()
+    cases = [
+        ('job_posting.html', legacy_parse_job, scraper._parse_job_details),
+        ('course_page.html', legacy_parse_course, scraper._parse_learning_resource)
+    ]
+
+    print("⏱️ WebScraper extraction benchmark")
+    print(f"Parser backend: {HTML_PARSER}")
+    print("=" * 60)
+
+    for fixture, legacy_func, engine_func in cases:
+        with open(os.path.join(FIXTURES_DIR, fixture), 'rb') as f:
+            content = f.read()
+
+        legacy_result = legacy_func(content)
+        engine_result = engine_func(content)
+        if legacy_result != engine_result:
+            print(f"⚠️ {fixture}: results differ\n  legacy: {legacy_result}\n  engine: {engine_result}")
+
+        legacy_time = time_it(legacy_func, content, args.iterations)
+        engine_time = time_it(engine_func, content, args.iterations)
+        size_mb = len(content) / (1024 * 1024)
+
+        print(f"{fixture} ({len(content) / 1024:.0f} KB)")
+        print(f"  legacy: {legacy_time * 1000:8.2f} ms/page  {size_mb / legacy_time:6.2f} MB/s")
+        print(f"  engine: {engine_time * 1000:8.2f} ms/page  {size_mb / engine_time:6.2f} MB/s")
+        print(f"  speedup: {legacy_time / engine_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+End-to-end load benchmark for the full analysis pipeline
+
+Starts the stand-in Ollama server from benchmarks/mock_ollama.py and runs
+complete analyses (the same AnalysisPipeline the app's "Run Full Analysis"
+uses) at increasing concurrency. Web searches return canned results after
+a simulated delay and the skill catalog refresh is disabled, so it runs
+on a laptop with no GPU or network. Reports analyses per second,
+p50/p95/p99 latency, LLM throughput and memory per concurrency level.
+
+With --cassette the run's LLM, search and embedding traffic is recorded,
+and a later run with the same levels replays it without the mock server
+doing any work (LLM columns then count nothing).
+
+Usage:
+    python benchmarks/bench_load.py [--levels 1,2,4,8] [--requests-per-level N] [--tokens-per-second 30]
+    python benchmarks/bench_load.py --cassette runs/base.jsonl --cassette-mode record
+    python benchmarks/bench_load.py --cassette runs/base.jsonl --cassette-speed 0
+"""
+
+import argparse
+import math
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+# Add project root to path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from mock_ollama import MockOllamaServer, add_settings_arguments, settings_from_args
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def isolate_environment(base_url: str, max_concurrent: int, cassette_path: Optional[str], cassette_mode: str,
+                        cassette_speed: float) -> str:
+    """Point the app at the mock server and keep its stores out of data/ (before project imports)"""
+    work_dir = tempfile.mkdtemp(prefix='cv_assistant_bench_')
+    if cassette_path:
+        os.environ['CASSETTE_PATH'] = os.path.abspath(cassette_path)
+        os.environ['CASSETTE_MODE'] = cassette_mode
+        os.environ['CASSETTE_SPEED'] = str(cassette_speed)
+    os.environ['OLLAMA_BASE_URL'] = base_url
+    os.environ['MAX_CONCURRENT_LLM_CALLS'] = str(max_concurrent)
+    os.environ['TRACING_ENABLED'] = 'false'
+    os.environ['LOG_CONSOLE_LEVEL'] = 'WARNING'
+    os.environ['LOG_DIR'] = os.path.join(work_dir, 'logs')
+    for name, path in [('RESULT_STORE_PATH', 'results.db'), ('ANALYSIS_JOBS_PATH', 'analysis_jobs.db'),
+                       ('JOB_STORE_PATH', 'jobs.db'), ('DEDUP_INDEX_PATH', 'job_dedup_index.json'),
+                       ('SKILL_CATALOG_PATH', 'skill_catalog.json'), ('HTTP_CACHE_DIR', 'http_cache'),
+                       ('VECTOR_INDEX_DIR', 'vectors'), ('GENERATION_STATS_PATH', 'generation_stats.json'),
+                       ('TRACE_PATH', 'traces.jsonl')]:
+        os.environ[name] = os.path.join(work_dir, path)
+    os.environ.setdefault('SKILL_CATALOG_SEED_PATH', os.path.join(ROOT, 'data', 'skill_catalog_seed.json'))
+    return work_dir
+
+
+def stub_network(search_latency: float):
+    """Replace web searches with canned results after a fixed delay (still recorded and replayed)"""
+    from tools.search_tool import SearchTool
+    from tools.skill_catalog import SkillCatalog
+    from utils.cassette import cassette
+
+    def canned(query: str, max_results: int) -> List[Dict[str, str]]:
+        time.sleep(search_latency)
+        return [{'title': f"{query.title()} - Example Corp {index}",
+                 'link': f"https://example.com/{index}/{query.replace(' ', '-')}",
+                 'snippet': f"Hiring {query} with Python, SQL and cloud experience. Remote."}
+                for index in range(max_results)]
+
+    def results(self, query: str, max_results: int) -> List[Dict[str, str]]:
+        return cassette.call('search', 'results', {'query': query, 'max_results': max_results},
+                             lambda: canned(query, max_results))
+
+    def run(self, query: str) -> str:
+        return cassette.call('search', 'text', {'query': query},
+                             lambda: '\n'.join(f"{hit['title']}: {hit['snippet']}" for hit in canned(query, 5)))
+
+    SearchTool._results = results
+    SearchTool._run = run
+    SkillCatalog.refresh_in_background = lambda self, **kwargs: False
+
+
+def memory_mb() -> Dict[str, Optional[float]]:
+    """Current and peak resident memory of this process, where the platform reports them"""
+    current = peak = None
+    try:
+        with open('/proc/self/statm') as f:
+            current = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1024 / 1024
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is not None:
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+    return {'current': current, 'peak': peak}
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1))]
+
+
+def run_level(pipeline, cv_text: str, job_description: str, concurrency: int, requests: int,
+              offset: int) -> Dict[str, float]:
+    """Run `requests` analyses with `concurrency` in flight; each CV is unique so nothing is cached"""
+    from utils.llm_scheduler import llm_scheduler
+    from utils.structured_output import AgentFailure
+
+    def analysis(index: int):
+        with llm_scheduler.context(f"bench:{index}"):
+            started = time.perf_counter()
+            results = pipeline.run(f"{cv_text}\nReference: bench-{index}", job_description)
+            failed = any(isinstance(value, AgentFailure) for value in results.values())
+            return time.perf_counter() - started, failed
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = list(executor.map(analysis, range(offset, offset + requests)))
+    wall = time.perf_counter() - started
+
+    latencies = [seconds for seconds, _ in outcomes]
+    return {
+        'wall': wall,
+        'throughput': requests / wall,
+        'p50': percentile(latencies, 0.5),
+        'p95': percentile(latencies, 0.95),
+        'p99': percentile(latencies, 0.99),
+        'failed': sum(failed for _, failed in outcomes)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end load benchmark against a mock Ollama server")
+    parser.add_argument('--levels', default='1,2,4,8', help="Comma-separated numbers of concurrent analyses")
+    parser.add_argument('--requests-per-level', type=int, default=8, help="Analyses run at each level")
+    parser.add_argument('--max-concurrent-llm', type=int, default=4, help="MAX_CONCURRENT_LLM_CALLS for the app")
+    parser.add_argument('--search-latency-ms', type=float, default=300.0, help="Simulated web search delay")
+    parser.add_argument('--cassette', help="Record the run's LLM and search traffic to, or replay it from, this file")
+    parser.add_argument('--cassette-mode', choices=['record', 'replay'], default='replay')
+    parser.add_argument('--cassette-speed', type=float, default=1.0, help="Replay speed (0 for instant)")
+    add_settings_arguments(parser)
+    args = parser.parse_args()
+    levels = [int(level) for level in args.levels.split(',') if level.strip()]
+
+    server = MockOllamaServer(settings_from_args(args)).start()
+    work_dir = isolate_environment(server.url, args.max_concurrent_llm, args.cassette, args.cassette_mode,
+                                   args.cassette_speed)
+    stub_network(args.search_latency_ms / 1000)
+
+    from agents.pipeline import get_pipeline
+
+    with open(os.path.join(ROOT, 'data', 'sample_cv.txt'), encoding='utf-8') as f:
+        cv_text = f.read()
+    with open(os.path.join(ROOT, 'data', 'sample_jd.txt'), encoding='utf-8') as f:
+        job_description = f.read()
+
+    print("🚀 End-to-end load benchmark")
+    print(f"   Mock Ollama: {server.url} (TTFT {args.ttft_ms:.0f} ms {args.ttft_distribution}, "
+          f"{args.tokens_per_second:.0f} tok/s, {args.parallel} parallel)")
+    print(f"   App LLM slots: {args.max_concurrent_llm}, search delay {args.search_latency_ms:.0f} ms")
+    print(f"   Scratch data: {work_dir}")
+    if args.cassette:
+        print(f"   Cassette: {args.cassette_mode} {args.cassette} (speed {args.cassette_speed:g})")
+
+    pipeline = get_pipeline()
+    print("\n🔥 Warm-up analysis...")
+    run_level(pipeline, cv_text, job_description, 1, 1, offset=0)
+    print(f"   Memory after warm-up: {memory_mb()['current'] or 0:.0f} MB")
+
+    print(f"\n{'conc':>5} {'analyses/s':>11} {'p50 s':>8} {'p95 s':>8} {'p99 s':>8} {'LLM req':>8} "
+          f"{'tok/s':>8} {'RSS MB':>8} {'peak MB':>8} {'failed':>7}")
+    offset = 1
+    for concurrency in levels:
+        before = dict(server.mock.stats)
+        result = run_level(pipeline, cv_text, job_description, concurrency, args.requests_per_level, offset)
+        offset += args.requests_per_level
+        llm_requests = server.mock.stats['requests'] - before['requests']
+        tokens = server.mock.stats['output_tokens'] - before['output_tokens']
+        memory = memory_mb()
+        print(f"{concurrency:>5} {result['throughput']:>11.3f} {result['p50']:>8.2f} {result['p95']:>8.2f} "
+              f"{result['p99']:>8.2f} {llm_requests:>8} {tokens / result['wall']:>8.1f} "
+              f"{memory['current'] or 0:>8.0f} {memory['peak'] or 0:>8.0f} {result['failed']:>7}")
+
+    print(f"\n✅ Done. Longest mock Ollama queue: {server.mock.stats['max_waiting']} requests")
+    if args.cassette:
+        from utils.cassette import cassette
+        print(f"   Cassette: {cassette.get_stats()}")
+    server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Stand-in Ollama HTTP server for load testing
+
+Implements the endpoints the app uses (/api/generate, /api/chat,
+/api/embeddings, /api/embed, /api/tags, /api/version) with simulated
+timings: a sampled time to first token (model load plus prompt
+evaluation), then tokens streamed at a fixed rate. At most `parallel`
+requests generate at once, like OLLAMA_NUM_PARALLEL; the rest queue.
+Requests with a JSON schema format get schema-valid JSON back, so the
+structured agents parse their output as with a real model.
+
+Usage:
+    python benchmarks/mock_ollama.py [--port 11500] [--ttft-ms 400] [--tokens-per-second 30]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+WORDS = ("candidate experience skills python cloud team project delivery improve role requirements "
+         "keywords resume impact metrics leadership backend data design systems").split()
+
+# Seconds between streamed chunks; tokens generated in between are sent together
+CHUNK_INTERVAL = 0.05
+
+EMBEDDING_SIZE = 256
+
+
+@dataclass
+class MockSettings:
+    """Simulated model behaviour"""
+    ttft_ms: float = 400.0
+    ttft_distribution: str = 'lognormal'  # fixed, uniform (±50%) or lognormal
+    ttft_sigma: float = 0.5
+    tokens_per_second: float = 30.0
+    output_tokens: int = 300
+    parallel: int = 4
+    embedding_ms: float = 20.0
+    models: List[str] = field(default_factory=lambda: ["llama3:latest", "mistral:latest", "deepseek-r1:1.5b",
+                                                       "nomic-embed-text:latest"])
+    seed: Optional[int] = None
+
+
+def sample_from_schema(schema: Dict[str, Any], rng: random.Random) -> Any:
+    """A small value that satisfies a JSON schema (types, enums, required properties, bounds)"""
+    if 'enum' in schema:
+        return schema['enum'][0]
+    kind = schema.get('type')
+    if isinstance(kind, list):
+        kind = next((item for item in kind if item != 'null'), 'string')
+    if kind == 'object' or 'properties' in schema:
+        return {name: sample_from_schema(child, rng) for name, child in schema.get('properties', {}).items()}
+    if kind == 'array':
+        count = max(schema.get('minItems', 0), min(3, schema.get('maxItems', 3)))
+        return [sample_from_schema(schema.get('items', {}), rng) for _ in range(count)]
+    if kind in ('integer', 'number'):
+        low, high = schema.get('minimum', 0), schema.get('maximum', 100)
+        value = rng.uniform(low, high)
+        return int(value) if kind == 'integer' else round(value, 2)
+    if kind == 'boolean':
+        return True
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, 12)))
+
+
+class MockOllama:
+    """aiohttp application simulating an Ollama server, plus request statistics"""
+
+    def __init__(self, settings: MockSettings):
+        self.settings = settings
+        self.rng = random.Random(settings.seed)
+        self.stats = {'requests': 0, 'embeddings': 0, 'output_tokens': 0, 'max_waiting': 0}
+        self._waiting = 0
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    def create_app(self) -> web.Application:
+        app = web.Application(client_max_size=16 * 1024 * 1024)
+        app.add_routes([
+            web.get('/api/tags', self.tags),
+            web.get('/api/version', self.version),
+            web.post('/api/generate', self.generate),
+            web.post('/api/chat', self.generate),
+            web.post('/api/embeddings', self.embeddings),
+            web.post('/api/embed', self.embeddings),
+        ])
+        return app
+
+    async def tags(self, request: web.Request) -> web.Response:
+        return web.json_response({'models': [{'name': name, 'model': name} for name in self.settings.models]})
+
+    async def version(self, request: web.Request) -> web.Response:
+        return web.json_response({'version': '0.0.0-mock'})
+
+    def _ttft(self) -> float:
+        median = self.settings.ttft_ms / 1000
+        if self.settings.ttft_distribution == 'fixed':
+            return median
+        if self.settings.ttft_distribution == 'uniform':
+            return self.rng.uniform(median * 0.5, median * 1.5)
+        return self.rng.lognormvariate(0, self.settings.ttft_sigma) * median
+
+    def _completion(self, body: Dict[str, Any]) -> str:
+        """Output text: schema-valid JSON when a schema format is requested, else filler words"""
+        options = body.get('options') or {}
+        budget = options.get('num_predict') or self.settings.output_tokens
+        length = max(1, min(int(budget), int(self.rng.lognormvariate(0, 0.3) * self.settings.output_tokens)))
+        response_format = body.get('format')
+        if isinstance(response_format, dict):
+            return json.dumps(sample_from_schema(response_format, self.rng))
+        if response_format == 'json':
+            return json.dumps({'result': ' '.join(self.rng.choice(WORDS) for _ in range(length))})
+        return ' '.join(self.rng.choice(WORDS) for _ in range(length))
+
+    async def generate(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        chat = request.path.endswith('/chat')
+        prompt = body.get('prompt') or ' '.join(str(message.get('content', '')) for message in body.get('messages', []))
+        stream = body.get('stream', True)
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.settings.parallel)
+
+        self._waiting += 1
+        self.stats['max_waiting'] = max(self.stats['max_waiting'], self._waiting)
+        started = time.perf_counter()
+        async with self._slots:
+            self._waiting -= 1
+            self.stats['requests'] += 1
+            queued = time.perf_counter() - started
+            ttft = self._ttft()
+            await asyncio.sleep(ttft)
+
+            text = self._completion(body)
+            budget = int((body.get('options') or {}).get('num_predict') or 4096)
+            # One word (with its trailing space) counts as one token
+            pieces = re.findall(r'\S+\s*', text)[:budget] or ['']
+            per_chunk = max(1, int(self.settings.tokens_per_second * CHUNK_INTERVAL))
+            chunks = [pieces[i:i + per_chunk] for i in range(0, len(pieces), per_chunk)]
+            self.stats['output_tokens'] += len(pieces)
+
+            def message(content: str, done: bool) -> Dict[str, Any]:
+                payload = {'model': body.get('model', ''), 'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ'),
+                           'done': done}
+                if chat:
+                    payload['message'] = {'role': 'assistant', 'content': content}
+                else:
+                    payload['response'] = content
+                return payload
+
+            def final(content: str) -> Dict[str, Any]:
+                eval_seconds = len(pieces) / self.settings.tokens_per_second
+                return dict(message(content, True), done_reason='length' if len(pieces) >= budget else 'stop',
+                            total_duration=int((queued + ttft + eval_seconds) * 1e9),
+                            load_duration=int(ttft * 0.2 * 1e9),
+                            prompt_eval_count=max(1, len(prompt) // 4),
+                            prompt_eval_duration=int(ttft * 0.8 * 1e9),
+                            eval_count=len(pieces),
+                            eval_duration=int(eval_seconds * 1e9))
+
+            if not stream:
+                await asyncio.sleep(len(pieces) / self.settings.tokens_per_second)
+                return web.json_response(final(''.join(pieces)))
+
+            response = web.StreamResponse(headers={'Content-Type': 'application/x-ndjson'})
+            await response.prepare(request)
+            for chunk in chunks:
+                await response.write((json.dumps(message(''.join(chunk), False)) + '\n').encode('utf-8'))
+                await asyncio.sleep(len(chunk) / self.settings.tokens_per_second)
+            await response.write((json.dumps(final('')) + '\n').encode('utf-8'))
+            await response.write_eof()
+            return response
+
+    async def embeddings(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        self.stats['embeddings'] += 1
+        await asyncio.sleep(self.settings.embedding_ms / 1000)
+        texts = body.get('input', body.get('prompt', ''))
+        vectors = [self._vector(text) for text in (texts if isinstance(texts, list) else [texts])]
+        if request.path.endswith('/embed'):
+            return web.json_response({'model': body.get('model', ''), 'embeddings': vectors})
+        return web.json_response({'embedding': vectors[0]})
+
+    @staticmethod
+    def _vector(text: str) -> List[float]:
+        """Deterministic unit vector per text"""
+        seed = int.from_bytes(hashlib.sha256(str(text).encode('utf-8')).digest()[:8], 'big')
+        rng = random.Random(seed)
+        values = [rng.gauss(0, 1) for _ in range(EMBEDDING_SIZE)]
+        norm = sum(value * value for value in values) ** 0.5 or 1.0
+        return [value / norm for value in values]
+
+
+class MockOllamaServer:
+    """Runs a MockOllama on its own event loop thread (for use from synchronous benchmarks)"""
+
+    def __init__(self, settings: MockSettings, host: str = '127.0.0.1', port: int = 0):
+        self.mock = MockOllama(settings)
+        self.host = host
+        self.port = port
+        self._loop = asyncio.new_event_loop()
+        self._runner: Optional[web.AppRunner] = None
+        self._thread = threading.Thread(target=self._loop.run_forever, name='mock-ollama', daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self) -> 'MockOllamaServer':
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop).result(timeout=10)
+        return self
+
+    async def _start(self):
+        self._runner = web.AppRunner(self.mock.create_app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        # Port 0 picks a free port
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    def stop(self):
+        if self._runner is not None:
+            asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result(timeout=10)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+
+def add_settings_arguments(parser: argparse.ArgumentParser):
+    """Command-line options for MockSettings"""
+    parser.add_argument('--ttft-ms', type=float, default=400.0, help="Median time to first token")
+    parser.add_argument('--ttft-distribution', choices=['fixed', 'uniform', 'lognormal'], default='lognormal')
+    parser.add_argument('--ttft-sigma', type=float, default=0.5, help="Spread of the lognormal distribution")
+    parser.add_argument('--tokens-per-second', type=float, default=30.0, help="Generation speed per request")
+    parser.add_argument('--output-tokens', type=int, default=300, help="Typical free-form output length")
+    parser.add_argument('--parallel', type=int, default=4, help="Requests generated at once (OLLAMA_NUM_PARALLEL)")
+    parser.add_argument('--seed', type=int, default=None, help="Seed for reproducible timings")
+
+
+def settings_from_args(args) -> MockSettings:
+    return MockSettings(ttft_ms=args.ttft_ms, ttft_distribution=args.ttft_distribution, ttft_sigma=args.ttft_sigma,
+                        tokens_per_second=args.tokens_per_second, output_tokens=args.output_tokens,
+                        parallel=args.parallel, seed=args.seed)
+
+
+def main():
+    """Run the mock server in the foreground"""
+    parser = argparse.ArgumentParser(description="Stand-in Ollama server with simulated timings")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11500)
+    add_settings_arguments(parser)
+    args = parser.parse_args()
+
+    print(f"🧪 Mock Ollama on http://{args.host}:{args.port} (set OLLAMA_BASE_URL to use it)")
+    web.run_app(MockOllama(settings_from_args(args)).create_app(), host=args.host, port=args.port,
+                access_log=None, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,10 @@
 import os
+from typing import Optional
 from dotenv import load_dotenv
 # from langchain_community.llms import Ollama
 from langchain_ollama import OllamaLLM
 from config.ollama_config import OllamaConfig
+from utils.llm_client import ManagedLLM
 
 load_dotenv()
 
@@ -13,16 +15,56 @@ class CrewConfig:
     APP_TITLE = os.getenv("APP_TITLE", "CrewAI CV Assistant")
     DEBUG_MODE = os.getenv("DEBUG_MODE", "False").lower() == "true"
     
+    # CrewAI's step-by-step agent console output (slow on long runs; for debugging)
+    AGENT_VERBOSE = os.getenv("AGENT_VERBOSE", "False").lower() == "true"
+    
+    # Agents return typed results from schema-constrained JSON instead of free-form markdown
+    STRUCTURED_OUTPUT = os.getenv("STRUCTURED_OUTPUT", "True").lower() == "true"
+    
     # Search API settings
     SERPAPI_API_KEY = os.getenv("SERPAPI_API_KEY", "")
     
     @classmethod
-    def get_llm(cls):
-        """Initialize and return Ollama LLM instance"""
+    def get_llm(cls, agent_name: Optional[str] = None, output_schema: Optional[dict] = None):
+        """
+        Initialize and return Ollama LLM instance
+        
+        Args:
+            agent_name: Agent whose generation profile (token budget, stop
+                sequences, sampling, reasoning) and model routing apply; None
+                for a plain client on OLLAMA_MODEL
+            output_schema: JSON schema the output must follow; older Ollama
+                clients that only accept format="json" fall back to plain JSON mode
+        """
         try:
-            llm_params = OllamaConfig.get_llm_params()
-            llm = OllamaLLM(**llm_params)
-            return llm
+            profile = OllamaConfig.get_agent_profile(agent_name)
+            
+            def create(num_predict: int, model: Optional[str] = None):
+                llm_params = dict(OllamaConfig.get_llm_params(agent_name, model), num_predict=num_predict)
+                # Only reasoning models accept the think option
+                if profile["reasoning"] is not None and OllamaConfig.get_model_config(model).get("reasoning"):
+                    llm_params["reasoning"] = profile["reasoning"]
+                if output_schema is not None:
+                    llm_params["format"] = output_schema
+                # Older clients lack reasoning and schema formats; drop them one at a time
+                for fallback in ({}, {"format": "json"} if output_schema is not None else {}, {"reasoning": None}):
+                    llm_params.update(fallback)
+                    try:
+                        return OllamaLLM(**{k: v for k, v in llm_params.items() if v is not None})
+                    except (TypeError, ValueError):
+                        continue
+                raise ValueError(f"Unsupported LLM parameters: {sorted(llm_params)}")
+            
+            if agent_name is None:
+                return create(profile["max_tokens"])
+            
+            return ManagedLLM(
+                agent_name=agent_name,
+                factory=create,
+                profile=profile,
+                ceiling=OllamaConfig.get_model_config()["max_tokens"],
+                stats_key=f"{agent_name}.structured" if output_schema is not None else agent_name
+            )
         except Exception as e:
             raise ConnectionError(f"Failed to connect to Ollama: {e}")
     
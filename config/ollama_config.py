@@ -1,4 +1,5 @@
 import os
+from typing import Optional
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -8,39 +9,123 @@ class OllamaConfig:
     
     MODEL = os.getenv("OLLAMA_MODEL", "llama3")
     BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+    EMBEDDING_MODEL = os.getenv("OLLAMA_EMBEDDING_MODEL", "nomic-embed-text")
     TEMPERATURE = 0.7
     TOP_P = 0.9
     
     # Model-specific configurations
+    # size is the parameter count in billions (used as a speed prior for routing);
+    # reasoning marks models that accept Ollama's think option
     MODEL_CONFIGS = {
         "deepseek-r1:1.5b": {
             "max_tokens": 4096,
-            "context_window": 8192
+            "context_window": 8192,
+            "size": 1.5,
+            "reasoning": True
         },
         "llama3": {
             "max_tokens": 4096,
-            "context_window": 8192
+            "context_window": 8192,
+            "size": 8.0,
+            "reasoning": False
         },
         "mistral": {
             "max_tokens": 4096,
-            "context_window": 8192
+            "context_window": 8192,
+            "size": 7.0,
+            "reasoning": False
+        }
+    }
+    
+    # Route each agent to a model from MODEL_CONFIGS instead of OLLAMA_MODEL for all (off: OLLAMA_MODEL everywhere)
+    MODEL_ROUTING = os.getenv("MODEL_ROUTING", "False").lower() == "true"
+    
+    # Preferred models per agent, best quality first; the router moves down the
+    # list when the preferred model would miss the agent's latency target
+    AGENT_MODELS = {
+        "evaluator": ["deepseek-r1:1.5b", "mistral", "llama3"],
+        "improver": ["llama3", "mistral", "deepseek-r1:1.5b"],
+        "skill_recommender": ["mistral", "llama3", "deepseek-r1:1.5b"],
+        "job_finder": ["mistral", "llama3", "deepseek-r1:1.5b"]
+    }
+    
+    # Latency targets per agent in seconds
+    LATENCY_TARGETS = {
+        "evaluator": 20.0,
+        "improver": 90.0,
+        "skill_recommender": 60.0,
+        "job_finder": 60.0
+    }
+    
+    # Per-agent generation profiles. max_tokens is the starting budget; it is
+    # tuned from observed output lengths (see utils.llm_client.OutputLengthStats).
+    # Stop sequences cut generation when the model starts echoing the prompt inputs.
+    AGENT_PROFILES = {
+        "evaluator": {
+            "max_tokens": 1024,
+            "min_tokens": 256,
+            "temperature": 0.2,
+            "top_p": 0.9,
+            "reasoning": False,
+            "stop": ["\nCV TO EVALUATE:"]
+        },
+        "improver": {
+            "max_tokens": 2048,
+            "min_tokens": 512,
+            "temperature": 0.5,
+            "top_p": 0.9,
+            "reasoning": True,
+            "stop": ["\nCV TO IMPROVE:", "\nJOB DESCRIPTION:"]
+        },
+        "skill_recommender": {
+            "max_tokens": 1536,
+            "min_tokens": 384,
+            "temperature": 0.4,
+            "top_p": 0.9,
+            "reasoning": False,
+            "stop": ["\nCV TO ANALYZE:", "\nJOB DESCRIPTION:"]
+        },
+        "job_finder": {
+            "max_tokens": 1536,
+            "min_tokens": 384,
+            "temperature": 0.6,
+            "top_p": 0.9,
+            "reasoning": False,
+            "stop": ["\nTARGET JOB DESCRIPTION:", "\nCANDIDATE CV SUMMARY:"]
         }
     }
     
     @classmethod
-    def get_model_config(cls):
-        """Get configuration for the current model"""
+    def get_model_config(cls, model: Optional[str] = None):
+        """Get configuration for a model (the current model by default)"""
         default_model = "llama3"
-        return cls.MODEL_CONFIGS.get(cls.MODEL, cls.MODEL_CONFIGS[default_model])
+        return cls.MODEL_CONFIGS.get(model or cls.MODEL, cls.MODEL_CONFIGS[default_model])
     
     @classmethod
-    def get_llm_params(cls):
-        """Get LLM parameters for initialization"""
-        config = cls.get_model_config()
-        return {
-            "model": cls.MODEL,
-            "base_url": cls.BASE_URL,
+    def get_agent_profile(cls, agent_name: Optional[str] = None) -> dict:
+        """Get the generation profile for an agent (model defaults if unknown)"""
+        profile = {
+            "max_tokens": cls.get_model_config()["max_tokens"],
+            "min_tokens": 256,
             "temperature": cls.TEMPERATURE,
             "top_p": cls.TOP_P,
-            "num_predict": config["max_tokens"]
+            "reasoning": None,
+            "stop": []
+        }
+        profile.update(cls.AGENT_PROFILES.get(agent_name, {}))
+        return profile
+    
+    @classmethod
+    def get_llm_params(cls, agent_name: Optional[str] = None, model: Optional[str] = None):
+        """Get LLM parameters for initialization"""
+        profile = cls.get_agent_profile(agent_name)
+        params = {
+            "model": model or cls.MODEL,
+            "base_url": cls.BASE_URL,
+            "temperature": profile["temperature"],
+            "top_p": profile["top_p"],
+            "num_predict": profile["max_tokens"]
         }
+        if profile["stop"]:
+            params["stop"] = list(profile["stop"])
+        return params
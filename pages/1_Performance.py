@@ -0,0 +1,142 @@
+import os
+import sys
+import time
+from datetime import datetime
+
+import streamlit as st
+
+# Add project root to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Components register their metric collectors on import
+import tools.query_planner
+import utils.analysis_jobs
+import utils.model_router
+from utils.cassette import cassette
+from utils.metrics import metrics, start_metrics_server
+from utils.tracing import tracer
+
+# Seconds between refreshes when auto-refresh is on
+REFRESH_INTERVAL = 5
+
+st.set_page_config(
+    page_title="Performance · CrewAI CV Assistant",
+    page_icon="📈",
+    layout="wide"
+)
+
+start_metrics_server()
+
+
+def gauge(gauges, name: str) -> float:
+    """Sum of a collected gauge over its label sets"""
+    return sum(value for _, value in gauges.get(f"{metrics.prefix}_{name}", []))
+
+
+def hit_rate(counters, cache: str) -> str:
+    """Hit rate of a cache from the cache_requests counter"""
+    rows = [row for row in counters.get('cache_requests_total', []) if row.get('cache') == cache]
+    hits = sum(row['value'] for row in rows if row.get('result') == 'hit')
+    total = sum(row['value'] for row in rows)
+    return f"{hits / total:.0%} of {int(total)}" if total else "—"
+
+
+def latency_table(rows, *columns):
+    """Histogram summary rows as a table of milliseconds, slowest p95 first"""
+    table = [
+        {
+            **{column: row.get(column, '') for column in columns},
+            'count': row['count'],
+            'mean (ms)': round(row['mean'] * 1000, 1),
+            'p50 (ms)': round(row['p50'] * 1000, 1),
+            'p95 (ms)': round(row['p95'] * 1000, 1),
+            'p99 (ms)': round(row['p99'] * 1000, 1)
+        }
+        for row in rows
+    ]
+    return sorted(table, key=lambda row: row['p95 (ms)'], reverse=True)
+
+
+def render():
+    st.title("📈 Performance")
+    st.caption("Metrics of this app process since it started; percentiles cover the most recent calls.")
+
+    snapshot = metrics.snapshot()
+    histograms, counters, gauges = snapshot['histograms'], snapshot['counters'], snapshot['gauges']
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("LLM calls running / waiting",
+                  f"{int(gauge(gauges, 'llm_scheduler_active'))} / {int(gauge(gauges, 'llm_scheduler_queued'))}")
+        st.metric("Avg LLM queue wait", f"{gauge(gauges, 'llm_scheduler_avg_wait'):.2f}s")
+    with col2:
+        st.metric("Analyses queued / running",
+                  f"{int(gauge(gauges, 'analysis_jobs_queued'))} / {int(gauge(gauges, 'analysis_jobs_running'))}")
+        st.metric("Stored analyses", int(gauge(gauges, 'result_store_entries')))
+    with col3:
+        st.metric("Result store recall", hit_rate(counters, 'result_store'))
+        st.metric("Pipeline step cache", hit_rate(counters, 'pipeline_step'))
+    with col4:
+        executed = gauge(gauges, 'search_planner_executed')
+        deduplicated = gauge(gauges, 'search_planner_deduplicated')
+        searches = executed + deduplicated
+        st.metric("Searches deduplicated", f"{deduplicated / searches:.0%} of {int(searches)}" if searches else "—")
+        tokens = sum(row['value'] for row in counters.get('llm_tokens_total', []) if row.get('kind') == 'output')
+        st.metric("Output tokens generated", int(tokens))
+
+    if cassette.mode != 'off':
+        stats = cassette.get_stats()
+        st.info(f"📼 Cassette {cassette.mode}: {cassette.path} — {stats['recorded']} recorded, "
+                f"{stats['replayed']} replayed, {stats['approximate']} approximate, {stats['missed']} missed")
+
+    st.subheader("⏱️ Latency by Operation")
+    spans = histograms.get('span_duration_seconds', [])
+    if spans:
+        st.dataframe(latency_table(spans, 'span', 'agent'), use_container_width=True, hide_index=True)
+    else:
+        st.info("No operations recorded yet. Run an analysis to collect metrics.")
+
+    st.subheader("🤖 LLM Requests")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.markdown("**Request latency** (including queue wait)")
+        st.dataframe(latency_table(histograms.get('llm_request_seconds', []), 'agent', 'model'),
+                     use_container_width=True, hide_index=True)
+        st.markdown("**Time to first token**")
+        st.dataframe(latency_table(histograms.get('llm_time_to_first_token_seconds', []), 'agent', 'model'),
+                     use_container_width=True, hide_index=True)
+    with col2:
+        st.markdown("**Ollama throughput** (tokens/s)")
+        st.dataframe([
+            {'model': row.get('model', ''), 'requests': row['count'], 'mean': round(row['mean'], 1),
+             'p50': round(row['p50'], 1)}
+            for row in histograms.get('llm_tokens_per_second', [])
+        ], use_container_width=True, hide_index=True)
+        models = gauges.get(f"{metrics.prefix}_model_router_last_latency", [])
+        if models:
+            st.markdown("**Last latency per model** (s)")
+            st.dataframe([{'model': dict(labels).get('model', ''), 'seconds': value} for labels, value in models],
+                         use_container_width=True, hide_index=True)
+
+    st.subheader("🧭 Recent Spans")
+    st.dataframe([
+        {
+            'time': datetime.fromtimestamp(span['start']).strftime('%H:%M:%S'),
+            'span': span['name'],
+            'ms': round(span['duration'] * 1000, 1),
+            'status': span['status'],
+            'attributes': ', '.join(f"{key}={value}" for key, value in span['attributes'].items())
+        }
+        for span in tracer.recent(50)
+    ], use_container_width=True, hide_index=True)
+
+    with st.expander("📤 Prometheus export"):
+        st.caption("Scrape GET /metrics on the HTTP API, or set METRICS_PORT to serve this process's metrics.")
+        st.code(metrics.render_prometheus(), language="text")
+
+    if st.checkbox(f"Auto-refresh every {REFRESH_INTERVAL}s"):
+        time.sleep(REFRESH_INTERVAL)
+        st.rerun()
+
+
+render()
@@ -82,12 +82,504 @@ def test_text_processing():
         skills = cleaner.extract_skills_from_text("I have experience with Python, React, and MySQL")
         print(f"✅ Skill extraction: {skills}")
         
+        # Test job title extraction (original casing, case-insensitive dedup)
+        titles = cleaner.extract_job_titles("Senior iOS Developer and QA Engineer; senior ios developer")
+        if titles != ['Senior iOS Developer', 'QA Engineer']:
+            print(f"❌ Unexpected job titles: {titles}")
+            return False
+        print(f"✅ Job title extraction: {titles}")
+        
         return True
         
     except Exception as e:
         print(f"❌ Text processing failed: {e}")
         return False
 
+def test_query_planner():
+    """Test search query planning and deduplication"""
+    print("\n🗺️ Testing query planner...")
+    
+    try:
+        from tools.query_planner import QueryPlanner, SearchFailure
+        
+        planner = QueryPlanner()
+        plan = planner.plan(
+            "Software Engineer with Python and React",
+            "Senior Backend Developer - Python, Kubernetes and Go required"
+        )
+        if plan.job_queries != ['Senior Backend Developer'] or plan.skill_queries != ['Kubernetes', 'Go']:
+            print(f"❌ Unexpected search plan: {plan}")
+            return False
+        print(f"✅ Job queries: {plan.job_queries}")
+        print(f"✅ Skill queries: {plan.skill_queries}")
+        
+        key = QueryPlanner.canonicalize("Sr. Full-Stack Developer")
+        if key != 'engineer full senior stack' or QueryPlanner.canonicalize("senior fullstack engineer") != key:
+            print(f"❌ Unexpected canonical query: {key}")
+            return False
+        print(f"✅ Canonical query: {key}")
+        
+        calls = []
+        planner.execute("job_search", "Sr. Full-Stack Developer", lambda q: calls.append(q) or "result")
+        planner.execute("job_search", "senior fullstack engineer", lambda q: calls.append(q) or "result")
+        if len(calls) != 1 or planner.stats['executed'] != 1 or planner.stats['deduplicated'] != 1:
+            print(f"❌ Duplicate query was not collapsed: {calls}, {planner.stats}")
+            return False
+        print("✅ Equivalent queries collapsed into one search")
+        
+        for _ in range(2):
+            planner.execute("job_search", "go engineer", lambda q: calls.append(q) or SearchFailure("Search failed"))
+        if len(calls) != 3 or planner.stats['failed'] != 2:
+            print(f"❌ Failed search was cached: {calls}")
+            return False
+        print("✅ Failed searches are not cached")
+        
+        expiring = QueryPlanner(result_ttl=0.2)
+        expiring.execute("job_search", "python developer", lambda q: calls.append(q) or "result")
+        expiring.execute("job_search", "python developer", lambda q: calls.append(q) or "result")
+        time.sleep(0.3)
+        expiring.execute("job_search", "python developer", lambda q: calls.append(q) or "result")
+        if len(calls) != 5 or expiring.stats['deduplicated'] != 1 or expiring.stats['expired'] != 1:
+            print(f"❌ Search results not reused within the TTL or reused after it: {calls}, {expiring.stats}")
+            return False
+        print("✅ Search results are reused within the TTL and fetched again after it")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Query planner failed: {e}")
+        return False
+
+def test_structured_output():
+    """Test parsing of structured agent output"""
+    print("\n🧾 Testing structured output parsing...")
+    
+    try:
+        from utils.structured_output import ATSEvaluation, parse_structured
+        
+        output = '<think>scoring</think>{"score": "78/100", "sub_scores": {"keywords": 65}, "strengths": ["Clear layout",]}'
+        evaluation = parse_structured(output, ATSEvaluation)
+        if evaluation is None or evaluation.score != 78 or evaluation.sub_scores != {'keywords': 65}:
+            print(f"❌ Unexpected structured evaluation: {evaluation}")
+            return False
+        print(f"✅ Parsed ATS score: {evaluation.score}/100")
+        
+        if parse_structured("No JSON here", ATSEvaluation) is not None:
+            print("❌ Free-form output should not parse")
+            return False
+        print("✅ Free-form output falls back")
+        
+        return True
+        
+    except Exception as e:
+        print(f"❌ Structured output parsing failed: {e}")
+        return False
+
+def test_llm_scheduler():
+    """Test LLM call priority lanes and cancellation of queued calls"""
+    print("\n🚦 Testing LLM scheduler...")
+    
+    try:
+        import threading
+        from utils.llm_scheduler import BATCH, INTERACTIVE, LLMScheduler, RequestCancelled
+        
+        scheduler = LLMScheduler(max_concurrent=1)
+        scheduler.POLL_INTERVAL = 0.05
+        admitted = []
+        release = threading.Event()
+        
+        def call(session_id, priority, hold=False, is_alive=None):
+            try:
+                with scheduler.context(session_id, priority, is_alive=is_alive), scheduler.slot():
+                    admitted.append(session_id)
+                    if hold:
+                        release.wait(5)
+            except RequestCancelled:
+                admitted.append(f"{session_id} (cancelled)")
+        
+        def wait_until(condition):
+            deadline = time.time() + 5
+            while not condition() and time.time() < deadline:
+                time.sleep(0.01)
+        
+        threads = [threading.Thread(target=call, args=('holder', INTERACTIVE, True))]
+        threads[0].start()
+        wait_until(lambda: admitted == ['holder'])
+        # Queue a batch call first; the interactive ones must still go ahead of it
+        for queued, (session_id, priority) in enumerate([('batch', BATCH), ('gone', INTERACTIVE),
+                                                         ('interactive', INTERACTIVE)], 1):
+            threads.append(threading.Thread(target=call, args=(session_id, priority)))
+            threads[-1].start()
+            wait_until(lambda: scheduler.queue_length() == queued)
+        
+        scheduler.cancel_session('gone')
+        wait_until(lambda: len(admitted) == 2)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        
+        expected = ['holder', 'gone (cancelled)', 'interactive', 'batch']
+        if admitted != expected:
+            print(f"❌ Unexpected admission order: {admitted}")
+            return False
+        print("✅ Cancelled calls never run; interactive calls go before batch calls")
+        
+        # A caller that goes away drops only its own call, not the rest of its session
+        admitted.clear()
+        release.clear()
+        abandoned = threading.Event()
+        threads = [threading.Thread(target=call, args=('holder', INTERACTIVE, True))]
+        threads[0].start()
+        wait_until(lambda: admitted == ['holder'])
+        for queued, is_alive in enumerate([lambda: not abandoned.is_set(), None], 1):
+            threads.append(threading.Thread(target=call, args=('owner', INTERACTIVE, False, is_alive)))
+            threads[-1].start()
+            wait_until(lambda: scheduler.queue_length() == queued)
+        
+        abandoned.set()
+        wait_until(lambda: len(admitted) == 2)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        
+        if admitted != ['holder', 'owner (cancelled)', 'owner']:
+            print(f"❌ Unexpected admissions after a caller went away: {admitted}")
+            return False
+        print("✅ Abandoned call dropped; the session's other calls still run")
+        
+        return True
+    
+    except Exception as e:
+        print(f"❌ LLM scheduler failed: {e}")
+        return False
+
+def test_result_store():
+    """Test analysis result retention"""
+    print("\n🗃️ Testing result store retention...")
+    
+    try:
+        import tempfile
+        from utils.result_store import AnalysisResultStore
+        
+        directory = tempfile.mkdtemp()
+        store = AnalysisResultStore(os.path.join(directory, 'results.db'), max_entries=2)
+        for name in ('first', 'second'):
+            store.create(name, f"{name} CV", "Backend Developer", 'model', 'v1', owner='session')
+            store.save_step(name, 'evaluation', f"{name} evaluation")
+        store.get('first')  # Now the second is the least recently used
+        store.create('third', "third CV", "Backend Developer", 'model', 'v1', owner='session')
+        store.save_step('third', 'evaluation', "third evaluation")
+        
+        kept = sorted(entry['key'] for entry in store.recent(owner='session'))
+        if kept != ['first', 'third']:
+            print(f"❌ Expected the least recently used analysis to be dropped, kept {kept}")
+            return False
+        print("✅ Least recently used analysis dropped at the entry cap")
+        
+        expiring = AnalysisResultStore(os.path.join(directory, 'expiring.db'), max_age_days=0)
+        expiring.create('old', "CV", "JD", 'model', 'v1')
+        expiring.save_step('old', 'evaluation', "evaluation")
+        if expiring.get('old') is not None:
+            print("❌ Analysis older than the age limit was kept")
+            return False
+        print("✅ Analyses past the age limit are deleted")
+        
+        return True
+    
+    except Exception as e:
+        print(f"❌ Result store failed: {e}")
+        return False
+
+def test_failed_step_not_cached():
+    """Test that a failed LLM call is reported and never cached"""
+    print("\n🚫 Testing failed analysis steps...")
+    
+    try:
+        import tempfile
+        from agents.cv_evaluator import CVEvaluatorAgent
+        from agents.pipeline import AnalysisPipeline
+        from utils.result_store import AnalysisResultStore
+        from utils.structured_output import AgentFailure
+        
+        class UnreachableLLM:
+            def invoke(self, prompt):
+                raise ConnectionError("Ollama is not running")
+        
+        evaluator = CVEvaluatorAgent.__new__(CVEvaluatorAgent)
+        evaluator.llm, evaluator.system_prompt = UnreachableLLM(), "Evaluate: {cv_text}"
+        pipeline = AnalysisPipeline.__new__(AnalysisPipeline)
+        pipeline.structured, pipeline.model_key, pipeline.prompt_version = False, 'model', 'v1'
+        pipeline.agents = {'evaluator': evaluator}
+        
+        cache = AnalysisResultStore(os.path.join(tempfile.mkdtemp(), 'results.db'))
+        cv_text, job_description = "Jane Doe\nSKILLS\nPython, SQL", "Backend Developer"
+        reported = {}
+        done = {'improvement': '', 'skills': '', 'jobs': ''}
+        results = pipeline.run(cv_text, job_description, done=done, cache=cache,
+                               on_result=lambda name, result, metrics: reported.update({name: metrics}))
+        
+        if not isinstance(results['evaluation'], AgentFailure) or not reported['evaluation']['error']:
+            print(f"❌ Failed LLM call was not reported as an error: {results['evaluation']!r}")
+            return False
+        print("✅ Failed LLM call reported as an error")
+        
+        if pipeline.cached_results(cv_text, job_description, cache):
+            print("❌ Failed step was cached")
+            return False
+        print("✅ Failed step not cached")
+        
+        return True
+    
+    except Exception as e:
+        print(f"❌ Failed step handling failed: {e}")
+        return False
+
+def test_cv_sections():
+    """Test CV parsing and per-section hashing"""
+    print("\n🧩 Testing CV sections...")
+    
+    try:
+        from utils.cv_parser import parse_cv
+        from utils.cv_sections import cv_fingerprint, section_hash
+        from utils.text_cleaner import TextCleaner
+        
+        if section_hash("Python,  SQL\nDocker") != section_hash("Python, SQL Docker"):
+            print("❌ Section hash should ignore whitespace")
+            return False
+        if section_hash("Python, SQL") == section_hash("python, sql"):
+            print("❌ Section hash should change when the case changes")
+            return False
+        
+        cv = "JANE DOE\njane.doe@example.com\n\nSKILLS\nPython, SQL\n\nEXPERIENCE\nAcme Corp 2020-2024\n"
+        edited = cv.replace("Acme Corp", "Globex Inc")
+        before = {section.name: section.hash for section in parse_cv(cv).sections}
+        after = {section.name: section.hash for section in parse_cv(edited).sections}
+        if list(before) != ['header', 'skills', 'experience']:
+            print(f"❌ Unexpected sections: {list(before)}")
+            return False
+        print(f"✅ Parsed sections: {list(before)}")
+        
+        changed = [name for name in before if before[name] != after.get(name)]
+        same_fingerprint = cv_fingerprint(parse_cv(cv).sections) == cv_fingerprint(parse_cv(edited).sections)
+        if changed != ['experience'] or same_fingerprint:
+            print(f"❌ Only the edited section should change, changed: {changed}")
+            return False
+        print("✅ Editing one section changes only its hash")
+        
+        if TextCleaner.extract_contact_info(cv).get('email') != 'jane.doe@example.com':
+            print("❌ Contact details not found in the header")
+            return False
+        print("✅ Contact details found in the header")
+        
+        return True
+    
+    except Exception as e:
+        print(f"❌ CV sections failed: {e}")
+        return False
+
+def test_job_store():
+    """Test full-text search over stored job postings"""
+    print("\n🗂️ Testing job store search...")
+    
+    try:
+        import tempfile
+        from tools.job_store import JobStore
+        
+        store = JobStore(os.path.join(tempfile.mkdtemp(), 'jobs.db'))
+        store.upsert_many([
+            {'posting_id': '1', 'title': 'Senior Backend Developer', 'company': 'Acme',
+             'description': 'Python services and PostgreSQL', 'link': 'https://example.com/1'},
+            {'posting_id': '2', 'title': 'Frontend Developer', 'company': 'Globex',
+             'description': 'React and TypeScript', 'link': 'https://example.com/2'},
+            {'posting_id': '3', 'title': 'Backend Engineer', 'company': 'Initech',
+             'description': 'Go microservices', 'link': 'https://example.com/3'}
+        ])
+        
+        titles = [posting['title'] for posting in store.search('backend developer')]
+        if titles != ['Senior Backend Developer']:
+            print(f"❌ Every query term should be required, got {titles}")
+            return False
+        print(f"✅ Search matched all terms: {titles} (FTS5: {store.fts_enabled})")
+        
+        if len(store.search('backend developer', match_all=False)) != 3:
+            print("❌ Any-term search should match every posting with either term")
+            return False
+        print("✅ Any-term search still available")
+        
+        return True
+    
+    except Exception as e:
+        print(f"❌ Job store failed: {e}")
+        return False
+
+def test_http_cache():
+    """Test the persistent page cache against a local server"""
+    print("\n💾 Testing HTTP cache...")
+    
+    try:
+        import tempfile
+        import threading
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        import requests
+        from tools.http_cache import CachingAdapter
+        
+        hits = []
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                hits.append(self.headers.get('Accept-Language'))
+                body = b"<html><body>Python course, 10 hours</body></html>"
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html')
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('Cache-Control', 'max-age=60')
+                self.send_header('Vary', 'Accept-Language')
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, *args):
+                pass
+        
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}/course"
+        try:
+            adapter = CachingAdapter(cache_dir=tempfile.mkdtemp())
+            session = requests.Session()
+            session.mount('http://', adapter)
+            
+            first = session.get(url, headers={'Accept-Language': 'en'})
+            second = session.get(url, headers={'Accept-Language': 'en'})
+            if first.from_cache or not second.from_cache or second.text != first.text or len(hits) != 1:
+                print(f"❌ Fresh page was not served from the cache ({len(hits)} server hits)")
+                return False
+            if second.headers['Content-Length'] != str(len(second.content)):
+                print("❌ Cached Content-Length does not describe the stored body")
+                return False
+            print("✅ Fresh page served from the cache")
+            
+            english, german = {'Accept-Language': 'en'}, {'Accept-Language': 'de'}
+            if not adapter.has_fresh(url, english) or adapter.has_fresh(url, german):
+                print("❌ Freshness check ignores the Vary header")
+                return False
+            session.get(url, headers={'Accept-Language': 'de'})
+            if hits != ['en', 'de']:
+                print(f"❌ A different Vary header value should miss the cache: {hits}")
+                return False
+            print("✅ Requests with other Vary header values miss the cache")
+        finally:
+            server.shutdown()
+        
+        return True
+    
+    except Exception as e:
+        print(f"❌ HTTP cache failed: {e}")
+        return False
+
+def test_crawl_scheduler():
+    """Test per-domain crawl pacing"""
+    print("\n🐢 Testing crawl scheduler...")
+    
+    try:
+        from tools.crawl_scheduler import CrawlScheduler
+        
+        scheduler = CrawlScheduler(robots_fetcher=lambda url: "User-agent: *\nCrawl-delay: 1\n", base_delay=0.01)
+        started = time.monotonic()
+        scheduler.wait("https://jobs.example.com/1")
+        scheduler.wait("https://jobs.example.com/2")
+        if time.monotonic() - started < 1.0:
+            print("❌ robots.txt Crawl-delay was not honoured")
+            return False
+        print("✅ robots.txt Crawl-delay honoured")
+        
+        scheduler.record("https://jobs.example.com/3", 429)
+        domain = scheduler.metrics()['jobs.example.com']
+        if domain['throttled'] != 1 or domain['delay'] < 1.0:
+            print(f"❌ No backoff after a 429: {domain}")
+            return False
+        print(f"✅ Backed off to {domain['delay']:.1f}s after a 429")
+        
+        started = time.monotonic()
+        scheduler.wait("https://courses.example.org/1")
+        if time.monotonic() - started > 0.1:
+            print("❌ Another domain waited on the throttled one")
+            return False
+        print("✅ Other domains are paced independently")
+        
+        return True
+    
+    except Exception as e:
+        print(f"❌ Crawl scheduler failed: {e}")
+        return False
+
+def test_dedup():
+    """Test near-duplicate job posting collapse"""
+    print("\n👯 Testing job deduplication...")
+    
+    try:
+        from tools.dedup import NearDuplicateIndex
+        
+        index = NearDuplicateIndex(path=None)
+        posting = {'title': 'Senior Python Developer', 'company': 'Acme',
+                   'description': 'Build REST APIs with Python, Django and PostgreSQL in a remote friendly team.',
+                   'link': 'https://boards.example.com/1'}
+        postings = [
+            posting,
+            dict(posting, title='Senior Python Developer - LinkedIn', link='https://boards.example.org/2'),
+            {'title': 'Data Analyst', 'company': 'Globex', 'description': 'SQL dashboards and weekly reporting.',
+             'link': 'https://boards.example.com/3'}
+        ]
+        
+        unique = index.collapse(postings)
+        if len(unique) != 2 or unique[0]['duplicates'] != 1:
+            print(f"❌ Expected 2 unique postings, got {[(p['title'], p['duplicates']) for p in unique]}")
+            return False
+        if index.collapse([posting])[0]['posting_id'] != unique[0]['posting_id']:
+            print("❌ A posting seen before should keep its id")
+            return False
+        print("✅ Board copies collapsed into one posting with a stable id")
+        
+        return True
+    
+    except Exception as e:
+        print(f"❌ Deduplication failed: {e}")
+        return False
+
+def test_cassette_replay():
+    """Test recording and replaying LLM traffic"""
+    print("\n📼 Testing cassette record/replay...")
+    
+    try:
+        import tempfile
+        from utils.cassette import Cassette, CassetteMiss
+        
+        path = os.path.join(tempfile.mkdtemp(), 'run.jsonl')
+        recorder = Cassette(path, mode='record', speed=0)
+        recorder.call('llm', 'evaluator', {'prompt': 'Score this CV'}, lambda: "Score: 80/100")
+        
+        def offline():
+            raise AssertionError("Replay must not call the live service")
+        
+        player = Cassette(path, mode='replay', speed=0)
+        if player.call('llm', 'evaluator', {'prompt': 'Score this CV'}, offline) != "Score: 80/100":
+            print("❌ Recorded response was not replayed")
+            return False
+        print("✅ Recorded response replayed without calling the service")
+        
+        strict = Cassette(path, mode='replay', speed=0, strict=True)
+        try:
+            strict.call('llm', 'evaluator', {'prompt': 'A different CV'}, offline)
+            print("❌ Strict replay served an unrecorded request")
+            return False
+        except CassetteMiss:
+            print("✅ Strict replay rejects unrecorded requests")
+        
+        return True
+    
+    except Exception as e:
+        print(f"❌ Cassette replay failed: {e}")
+        return False
+
 def test_search_tools():
     """Test search tool functionality"""
     print("\n🔍 Testing search tools...")
@@ -158,6 +650,17 @@ def main():
         ("Imports", test_imports),
         ("Ollama Connection", test_ollama_connection),
         ("Text Processing", test_text_processing),
+        ("Query Planner", test_query_planner),
+        ("Structured Output", test_structured_output),
+        ("LLM Scheduler", test_llm_scheduler),
+        ("Result Store", test_result_store),
+        ("Failed Step Caching", test_failed_step_not_cached),
+        ("CV Sections", test_cv_sections),
+        ("Job Store", test_job_store),
+        ("HTTP Cache", test_http_cache),
+        ("Crawl Scheduler", test_crawl_scheduler),
+        ("Deduplication", test_dedup),
+        ("Cassette Replay", test_cassette_replay),
         ("Search Tools", test_search_tools),
         ("Sample Data", test_sample_data),
         ("Agent Initialization", test_agent_initialization)
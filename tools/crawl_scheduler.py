@@ -0,0 +1,158 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+
+class _DomainState:
+    """Pacing state for a single domain"""
+
+    def __init__(self, base_delay: float):
+        self.delay = base_delay
+        self.crawl_delay: Optional[float] = None
+        self.robots_checked = False
+        self.next_allowed = 0.0
+        self.queue_depth = 0
+        self.requests = 0
+        self.throttled = 0
+        self.lock = threading.Lock()   # protects counters and delays
+        self.turn = threading.Lock()   # serializes pacing within the domain
+
+
+class CrawlScheduler:
+    """
+    Adaptive per-domain request pacing
+
+    Each domain gets its own delay between request starts. The delay never
+    drops below the domain's robots.txt Crawl-delay, doubles on 429/503
+    responses (or follows Retry-After), and shrinks again after successes.
+    Domains are paced independently, so requests to different hosts proceed
+    in parallel.
+    """
+
+    BASE_DELAY = 0.25
+    MAX_DELAY = 60.0
+    BACKOFF_FACTOR = 2.0
+    RECOVERY_FACTOR = 0.8
+    THROTTLE_STATUSES = (429, 503)
+
+    def __init__(self, robots_fetcher: Optional[Callable[[str], Optional[str]]] = None,
+                 user_agent: str = '*', base_delay: float = BASE_DELAY, max_delay: float = MAX_DELAY):
+        """
+        Args:
+            robots_fetcher: Function returning robots.txt text for a URL (None to skip robots)
+            user_agent: User agent matched against robots.txt groups
+            base_delay: Minimum delay between requests to one domain, in seconds
+            max_delay: Upper bound for backed-off delays, in seconds
+        """
+        self.robots_fetcher = robots_fetcher
+        self.user_agent = user_agent
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._domains: Dict[str, _DomainState] = {}
+        self._domains_lock = threading.Lock()
+
+    def _state(self, url: str) -> _DomainState:
+        domain = urlparse(url).netloc.lower()
+        with self._domains_lock:
+            if domain not in self._domains:
+                self._domains[domain] = _DomainState(self.base_delay)
+            return self._domains[domain]
+
+    def _ensure_robots(self, state: _DomainState, url: str):
+        """Load the domain's robots.txt Crawl-delay once"""
+        if state.robots_checked or self.robots_fetcher is None:
+            return
+
+        parsed = urlparse(url)
+        robots_url = f"{parsed.scheme}://{parsed.netloc}/robots.txt"
+        try:
+            robots_text = self.robots_fetcher(robots_url)
+        except Exception:
+            robots_text = None
+
+        if robots_text:
+            parser = RobotFileParser()
+            parser.parse(robots_text.splitlines())
+            parser.modified()  # crawl_delay() ignores parsers that were never marked as read
+            crawl_delay = parser.crawl_delay(self.user_agent)
+            if crawl_delay is not None:
+                state.crawl_delay = min(float(crawl_delay), self.max_delay)
+        state.robots_checked = True
+
+    @contextmanager
+    def slot(self, url: str):
+        """
+        Wait until a request to the URL's domain may start
+
+        Usage:
+            with scheduler.slot(url):
+                response = session.get(url)
+            scheduler.record(url, response.status_code, response.headers.get('Retry-After'))
+        """
+        state = self._state(url)
+        with state.lock:
+            state.queue_depth += 1
+
+        try:
+            with state.turn:
+                self._ensure_robots(state, url)
+
+                wait = state.next_allowed - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+
+                with state.lock:
+                    delay = max(state.delay, state.crawl_delay or 0.0)
+                    state.next_allowed = time.monotonic() + delay
+                    state.requests += 1
+        finally:
+            with state.lock:
+                state.queue_depth -= 1
+
+        yield
+
+    def record(self, url: str, status_code: int, retry_after: Optional[str] = None):
+        """
+        Adapt a domain's delay to a response
+
+        Args:
+            url: Requested URL
+            status_code: HTTP status of the response
+            retry_after: Raw Retry-After header value, if any
+        """
+        state = self._state(url)
+        with state.lock:
+            if status_code in self.THROTTLE_STATUSES:
+                state.throttled += 1
+                state.delay = min(self.max_delay, max(state.delay * self.BACKOFF_FACTOR, 1.0))
+
+                if retry_after and retry_after.strip().isdigit():
+                    pause = min(float(retry_after), self.max_delay)
+                    state.next_allowed = max(state.next_allowed, time.monotonic() + pause)
+            elif status_code < 400:
+                state.delay = max(self.base_delay, state.delay * self.RECOVERY_FACTOR)
+
+    def wait(self, url: str):
+        """Block until a request to the URL's domain may start"""
+        with self.slot(url):
+            pass
+
+    def metrics(self) -> Dict[str, Dict[str, float]]:
+        """Per-domain queue depth, delays and request counts"""
+        with self._domains_lock:
+            domains = dict(self._domains)
+
+        metrics = {}
+        for domain, state in domains.items():
+            with state.lock:
+                metrics[domain] = {
+                    'queue_depth': state.queue_depth,
+                    'delay': state.delay,
+                    'crawl_delay': state.crawl_delay or 0.0,
+                    'requests': state.requests,
+                    'throttled': state.throttled
+                }
+        return metrics
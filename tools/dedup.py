@@ -0,0 +1,256 @@
+import atexit
+import base64
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+# Default location of the persistent near-duplicate index
+DEDUP_INDEX_PATH = os.getenv("DEDUP_INDEX_PATH", "data/job_dedup_index.json")
+
+# Job board decorations that differ between copies of the same posting
+_BOARD_NOISE = re.compile(
+    r'\b(?:linkedin|indeed(?:\.com)?|glassdoor|jobs?|hiring|now|apply|remote\s+jobs)\b',
+    re.IGNORECASE
+)
+
+
+class MinHasher:
+    """MinHash signatures over posting titles, companies and descriptions"""
+
+    NUM_PERM = 32
+    _PRIME = (1 << 61) - 1
+    _MASK = (1 << 32) - 1
+
+    def __init__(self, num_perm: int = NUM_PERM, seed: int = 1):
+        rng = random.Random(seed)
+        self.num_perm = num_perm
+        self._permutations = [
+            (rng.randrange(1, self._PRIME), rng.randrange(0, self._PRIME)) for _ in range(num_perm)
+        ]
+
+    @staticmethod
+    def features(posting: Dict[str, str]) -> set:
+        """Feature set: title and company tokens plus description word bigrams"""
+        def tokens(text: str) -> List[str]:
+            text = _BOARD_NOISE.sub(' ', (text or '').lower())
+            return re.findall(r'[a-z0-9+#]+', text)
+
+        features = {f"t:{token}" for token in tokens(posting.get('title', ''))}
+        features.update(f"c:{token}" for token in tokens(posting.get('company', '')))
+
+        words = tokens(posting.get('description', ''))
+        features.update(' '.join(words[i:i + 2]) for i in range(len(words) - 1))
+        if len(words) == 1:
+            features.add(words[0])
+        return features
+
+    def signature(self, posting: Dict[str, str]) -> Tuple[int, ...]:
+        """Compute the MinHash signature of a posting"""
+        hashes = [
+            int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'big')
+            for feature in self.features(posting)
+        ]
+        if not hashes:
+            return tuple([self._MASK] * self.num_perm)
+        return tuple(
+            min((a * value + b) % self._PRIME for value in hashes) & self._MASK
+            for a, b in self._permutations
+        )
+
+    @staticmethod
+    def similarity(first: Tuple[int, ...], second: Tuple[int, ...]) -> float:
+        """Estimated Jaccard similarity of two signatures"""
+        return sum(1 for x, y in zip(first, second) if x == y) / len(first)
+
+
+class NearDuplicateIndex:
+    """
+    Incremental, persistent MinHash/LSH index for job postings
+
+    Signatures are split into bands and each band is a hash bucket, so
+    candidate duplicates are found with a few dictionary lookups instead of
+    comparing against every indexed posting. Candidates are confirmed by
+    their estimated Jaccard similarity. New postings mark the index dirty;
+    it is written from a timer thread at most every SAVE_INTERVAL seconds
+    and at exit, never in the search path.
+    """
+
+    BANDS = 8
+    THRESHOLD = 0.6
+    MAX_ENTRIES = 20000
+    SAVE_INTERVAL = 30.0
+
+    def __init__(self, path: Optional[str] = DEDUP_INDEX_PATH, threshold: float = THRESHOLD):
+        self.path = path
+        self.threshold = threshold
+        self.hasher = MinHasher()
+        self._rows = self.hasher.num_perm // self.BANDS
+        self._signatures: "OrderedDict[str, Tuple[int, ...]]" = OrderedDict()
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], List[str]] = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._dirty = False
+        self._save_timer: Optional[threading.Timer] = None
+        atexit.register(self.save)
+
+    def _bands(self, signature: Tuple[int, ...]) -> List[Tuple[int, Tuple[int, ...]]]:
+        return [(band, signature[band * self._rows:(band + 1) * self._rows]) for band in range(self.BANDS)]
+
+    @staticmethod
+    def _encode(signature: Tuple[int, ...]) -> str:
+        return base64.b64encode(array('I', signature).tobytes()).decode('ascii')
+
+    @staticmethod
+    def _decode(encoded: str) -> Tuple[int, ...]:
+        values = array('I')
+        values.frombytes(base64.b64decode(encoded))
+        return tuple(values)
+
+    def _ensure_loaded(self):
+        """Load the persisted index on first use"""
+        if self._loaded:
+            return
+        self._loaded = True
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('num_perm') != self.hasher.num_perm:
+                return  # Signatures from a different configuration are not comparable
+            for posting_id, encoded in data.get('signatures', {}).items():
+                self._insert(posting_id, self._decode(encoded))
+        except (OSError, ValueError):
+            pass  # A corrupt index is rebuilt from scratch
+
+    def _insert(self, posting_id: str, signature: Tuple[int, ...]):
+        self._signatures[posting_id] = signature
+        for band in self._bands(signature):
+            self._buckets.setdefault(band, []).append(posting_id)
+
+        # Evict the oldest postings once the index is full
+        while len(self._signatures) > self.MAX_ENTRIES:
+            old_id, old_signature = self._signatures.popitem(last=False)
+            for band in self._bands(old_signature):
+                bucket = self._buckets.get(band, [])
+                if old_id in bucket:
+                    bucket.remove(old_id)
+                if not bucket:
+                    self._buckets.pop(band, None)
+
+    def _find(self, signature: Tuple[int, ...]) -> Optional[str]:
+        """Return the id of the most similar indexed near-duplicate, if any"""
+        best_id, best_similarity = None, self.threshold
+        for band in self._bands(signature):
+            for posting_id in self._buckets.get(band, ()):
+                similarity = MinHasher.similarity(self._signatures[posting_id], signature)
+                if similarity >= best_similarity:
+                    best_id, best_similarity = posting_id, similarity
+        return best_id
+
+    def add(self, posting: Dict[str, str]) -> Tuple[str, bool]:
+        """
+        Add a posting to the index
+
+        Args:
+            posting: Dict with 'title', 'company' and 'description'
+
+        Returns:
+            (posting_id, is_new) where posting_id is shared by near-duplicates
+        """
+        signature = self.hasher.signature(posting)
+        with self._lock:
+            self._ensure_loaded()
+            existing_id = self._find(signature)
+            if existing_id is not None:
+                return existing_id, False
+            posting_id = hashlib.sha1(self._encode(signature).encode('ascii')).hexdigest()[:16]
+            self._insert(posting_id, signature)
+            self._dirty = True
+            self._schedule_save()
+            return posting_id, True
+
+    def _schedule_save(self):
+        """Start the save timer unless one is pending (called with the lock held)"""
+        if not self.path or self._save_timer is not None:
+            return
+        self._save_timer = threading.Timer(self.SAVE_INTERVAL, self.save)
+        self._save_timer.daemon = True
+        self._save_timer.start()
+
+    def collapse(self, postings: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """
+        Collapse near-duplicate postings, keeping the first copy of each
+
+        Each kept posting gets a stable 'posting_id' and a 'duplicates' count.
+        Postings already seen in earlier runs are kept (with their old id);
+        only copies within this batch are dropped.
+
+        Args:
+            postings: Postings in priority order
+
+        Returns:
+            Unique postings
+        """
+        unique: "OrderedDict[str, Dict[str, str]]" = OrderedDict()
+        seen_links = set()
+
+        for posting in postings:
+            link = posting.get('link')
+            if link and link in seen_links:
+                continue
+            if link:
+                seen_links.add(link)
+
+            posting_id, _ = self.add(posting)
+            if posting_id in unique:
+                unique[posting_id]['duplicates'] += 1
+            else:
+                unique[posting_id] = dict(posting, posting_id=posting_id, duplicates=0)
+
+        return list(unique.values())
+
+    def save(self):
+        """Persist the index atomically if it changed since the last save"""
+        if not self.path:
+            return
+        with self._lock:
+            self._save_timer = None
+            if not self._dirty:
+                return
+            # Cleared before writing so changes made during the write mark it dirty again
+            self._dirty = False
+            data = {
+                'version': 1,
+                'num_perm': self.hasher.num_perm,
+                'signatures': {posting_id: self._encode(signature)
+                               for posting_id, signature in self._signatures.items()}
+            }
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            temp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(temp_path, self.path)
+        except OSError:
+            # Persistence is best effort; keep the changes and try again later
+            with self._lock:
+                self._dirty = True
+                self._schedule_save()
+
+    def __len__(self):
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._signatures)
+
+
+# Global index shared by all search tools
+job_dedup_index = NearDuplicateIndex()
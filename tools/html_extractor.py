@@ -0,0 +1,208 @@
+from bs4 import BeautifulSoup, Tag
+from typing import Dict, List, Optional, Tuple
+import re
+
+# Prefer the C-accelerated lxml parser when it is installed
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+
+# Subtrees that never hold job or course fields; dropped before parsing
+_IRRELEVANT_MARKUP = re.compile(
+    rb'<(script|style|noscript|svg|template|iframe|nav|footer)\b[^>]*>.*?</\1\s*>|<!--.*?-->',
+    re.IGNORECASE | re.DOTALL
+)
+
+
+def strip_irrelevant_markup(content: bytes) -> bytes:
+    """
+    Remove scripts, styles, navigation, footers and comments from raw HTML
+    
+    These subtrees are often the bulk of a job board page, so cutting them
+    before parsing keeps the tree builder's work to the relevant content.
+    
+    Args:
+        content: Raw page bytes
+        
+    Returns:
+        Page bytes without the irrelevant subtrees
+    """
+    if isinstance(content, str):
+        content = content.encode('utf-8')
+    return _IRRELEVANT_MARKUP.sub(b'', content)
+
+
+class SimpleSelector:
+    """
+    Compiled form of the simple CSS selectors used by the scrapers
+
+    Supports a tag name, classes, an id and attribute equality, optionally
+    combined (e.g. 'h1.jobTitle', '[data-testid="salary"]', '#job-description').
+    Descendant combinators and pseudo-classes are not supported.
+    """
+
+    _TOKEN_PATTERN = re.compile(r'''([.#]?[\w-]+)|\[([\w-]+)(?:=["']?([^"'\]]*)["']?)?\]''')
+
+    def __init__(self, selector: str):
+        self.selector = selector
+        self.tag: Optional[str] = None
+        self.element_id: Optional[str] = None
+        self.classes: List[str] = []
+        self.attributes: List[Tuple[str, Optional[str]]] = []
+
+        position = 0
+        for match in self._TOKEN_PATTERN.finditer(selector):
+            if match.start() != position:
+                raise ValueError(f"Unsupported selector: {selector}")
+            position = match.end()
+
+            simple, attr_name, attr_value = match.groups()
+            if attr_name:
+                self.attributes.append((attr_name, attr_value))
+            elif simple.startswith('.'):
+                self.classes.append(simple[1:])
+            elif simple.startswith('#'):
+                self.element_id = simple[1:]
+            else:
+                self.tag = simple.lower()
+
+        if position != len(selector) or position == 0:
+            raise ValueError(f"Unsupported selector: {selector}")
+
+    def index_key(self) -> Tuple[str, str]:
+        """Most selective key used to index this selector for traversal"""
+        if self.element_id:
+            return ('id', self.element_id)
+        if self.classes:
+            return ('class', self.classes[0])
+        if self.attributes:
+            return ('attr', self.attributes[0][0])
+        return ('tag', self.tag or '*')
+
+    def matches(self, element: Tag) -> bool:
+        """Check whether an element matches this selector"""
+        if self.tag and element.name != self.tag:
+            return False
+        if self.element_id and element.get('id') != self.element_id:
+            return False
+        if self.classes:
+            element_classes = element.get('class') or []
+            if any(cls not in element_classes for cls in self.classes):
+                return False
+        for attr_name, attr_value in self.attributes:
+            value = element.get(attr_name)
+            if value is None:
+                return False
+            if attr_value is not None:
+                if isinstance(value, list):
+                    if attr_value not in value and ' '.join(value) != attr_value:
+                        return False
+                elif value != attr_value:
+                    return False
+        return True
+
+
+class ParsedPage:
+    """A page parsed once, with its text and field matches computed once"""
+
+    def __init__(self, soup: BeautifulSoup, matches: Dict[str, Tag], headings: List[Tag]):
+        self.soup = soup
+        self._matches = matches
+        self.headings = headings
+        self._text: Optional[str] = None
+
+    @property
+    def text(self) -> str:
+        """Full page text, computed on first use and reused afterwards"""
+        if self._text is None:
+            self._text = self.soup.get_text()
+        return self._text
+
+    def first(self, field: str) -> Optional[Tag]:
+        """First element for a field, honouring the field's selector priority"""
+        return self._matches.get(field)
+
+    def first_text(self, field: str) -> Optional[str]:
+        """Stripped text of the first element for a field"""
+        element = self.first(field)
+        return element.get_text(strip=True) if element is not None else None
+
+
+class ExtractionEngine:
+    """
+    Resolves every field's selectors in a single traversal of the document
+
+    Each field maps to an ordered list of selectors. The result for a field is
+    the first element (in document order) matching the highest-priority
+    selector that matches anything, i.e. the same answer as probing
+    soup.select_one() for each selector in turn.
+    """
+
+    def __init__(self, field_selectors: Dict[str, List[str]], heading_tags: Tuple[str, ...] = ()):
+        self.field_selectors = field_selectors
+        self.heading_tags = frozenset(heading_tags)
+
+        # Deduplicated selectors, indexed by their most selective key
+        self._selectors: Dict[str, SimpleSelector] = {}
+        self._index: Dict[Tuple[str, str], List[SimpleSelector]] = {}
+        for selectors in field_selectors.values():
+            for selector in selectors:
+                if selector not in self._selectors:
+                    compiled = SimpleSelector(selector)
+                    self._selectors[selector] = compiled
+                    self._index.setdefault(compiled.index_key(), []).append(compiled)
+
+        self._attr_keys = [key for key in self._index if key[0] == 'attr']
+
+    def parse(self, content, parser: str = HTML_PARSER) -> ParsedPage:
+        """
+        Parse a page and resolve all field selectors
+
+        Args:
+            content: Page bytes or text
+            parser: BeautifulSoup parser backend (lxml when available)
+
+        Returns:
+            ParsedPage with field matches resolved
+        """
+        soup = BeautifulSoup(content, parser)
+        return self.extract(soup)
+
+    def extract(self, soup: BeautifulSoup) -> ParsedPage:
+        """Resolve all field selectors against an already parsed document"""
+        found: Dict[str, Tag] = {}
+        headings: List[Tag] = []
+        remaining = len(self._selectors)
+
+        for element in soup.find_all(True):
+            if element.name in self.heading_tags:
+                headings.append(element)
+            if not remaining:
+                continue
+
+            candidates = list(self._index.get(('tag', element.name), ()))
+            element_id = element.get('id')
+            if element_id:
+                candidates.extend(self._index.get(('id', element_id), ()))
+            for cls in element.get('class') or ():
+                candidates.extend(self._index.get(('class', cls), ()))
+            for key in self._attr_keys:
+                if element.has_attr(key[1]):
+                    candidates.extend(self._index[key])
+
+            for selector in candidates:
+                if selector.selector not in found and selector.matches(element):
+                    found[selector.selector] = element
+                    remaining -= 1
+
+        matches = {}
+        for field, selectors in self.field_selectors.items():
+            for selector in selectors:
+                if selector in found:
+                    matches[field] = found[selector]
+                    break
+
+        return ParsedPage(soup, matches, headings)
@@ -0,0 +1,324 @@
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+# Default location of the persistent page cache
+HTTP_CACHE_DIR = os.getenv("HTTP_CACHE_DIR", "data/http_cache")
+
+# The cache is pruned to this size, least recently used entries first, and entries unused this long are dropped
+HTTP_CACHE_MAX_BYTES = int(os.getenv("HTTP_CACHE_MAX_BYTES", str(100 * 1024 * 1024)))
+HTTP_CACHE_MAX_AGE_DAYS = float(os.getenv("HTTP_CACHE_MAX_AGE_DAYS", "30"))
+
+# Headers that describe the wire body rather than the stored (decoded, possibly truncated) one
+_WIRE_HEADERS = ('content-encoding', 'transfer-encoding', 'content-length')
+
+
+class CachingAdapter(HTTPAdapter):
+    """
+    Transport adapter adding a persistent HTTP cache to a requests session
+
+    GET responses are stored on disk with their validators. Fresh entries
+    (within Cache-Control max-age) are served locally; stale entries are
+    revalidated with If-None-Match / If-Modified-Since and reused on a 304.
+    An entry only answers requests with the same values for the headers
+    its response Varies on. The directory is pruned by age and total size.
+
+    Responses carry `from_cache` (True for hits and 304 revalidations),
+    `revalidated` (True only when a 304 came back over the network) and,
+    for downloads, `download_info` with the bytes read off the wire, the
+    original Content-Length and whether the body was cut at max_body_bytes.
+    """
+
+    PRUNE_EVERY = 50
+
+    def __init__(self, cache_dir: str = HTTP_CACHE_DIR,
+                 cacheable_types: Tuple[str, ...] = ('text/html',),
+                 max_body_bytes: Optional[int] = None, max_cache_bytes: int = HTTP_CACHE_MAX_BYTES,
+                 max_age_days: float = HTTP_CACHE_MAX_AGE_DAYS, **kwargs):
+        super().__init__(**kwargs)
+        self.cache_dir = cache_dir
+        self.cacheable_types = cacheable_types
+        self.max_body_bytes = max_body_bytes
+        self.max_cache_bytes = max_cache_bytes
+        self.max_age_days = max_age_days
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self.stats = {'hits': 0, 'revalidated': 0, 'misses': 0}
+        self._stats_lock = threading.Lock()
+        self._stores_since_prune = 0
+        self.prune()
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        """Serve GET requests from the cache when possible"""
+        if request.method != 'GET':
+            return super().send(request, stream=stream, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+
+        key = hashlib.sha256(request.url.encode('utf-8')).hexdigest()
+        entry = self._load(key)
+        if entry is not None and not self._vary_matches(entry[0], request):
+            entry = None  # Stored for a different variant; replaced by this request's
+
+        if entry is not None:
+            metadata, body = entry
+            if self._is_fresh(metadata):
+                self._count('hits')
+                self._touch(key)
+                return self._build_response(request, metadata, body, from_cache=True)
+
+            # Stale: revalidate with whatever validators we have
+            if metadata.get('etag'):
+                request.headers['If-None-Match'] = metadata['etag']
+            if metadata.get('last_modified'):
+                request.headers['If-Modified-Since'] = metadata['last_modified']
+
+        response = super().send(request, stream=True, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+
+        if entry is not None and response.status_code == 304:
+            response.close()
+            metadata, body = entry
+            # A 304 may carry refreshed freshness information
+            metadata['headers'].update({k: v for k, v in response.headers.items() if k.lower() in
+                                        ('cache-control', 'expires', 'etag', 'last-modified', 'date')})
+            metadata.update(self._validators(response.headers), stored_at=time.time())
+            self._store(key, metadata, body)
+            self._count('revalidated')
+            revalidated = self._build_response(request, metadata, body, from_cache=True)
+            revalidated.revalidated = True
+            return revalidated
+
+        self._count('misses')
+        if not self._is_cacheable(response):
+            return response
+
+        content_length = response.headers.get('Content-Length', '')
+        body, truncated = self._read_body(response)
+        metadata = {
+            'url': request.url,
+            'status_code': response.status_code,
+            'reason': response.reason,
+            'headers': {k: v for k, v in response.headers.items() if k.lower() not in _WIRE_HEADERS},
+            'vary': {name: request.headers.get(name) for name in self._vary_names(response.headers)},
+            'truncated': truncated,
+            'stored_at': time.time()
+        }
+        metadata.update(self._validators(response.headers))
+        self._store(key, metadata, body)
+        cached = self._build_response(request, metadata, body, from_cache=False)
+        cached.download_info = {
+            'wire_bytes': response.raw.tell() if hasattr(response.raw, 'tell') else len(body),
+            'content_length': int(content_length) if content_length.isdigit() else None,
+            'truncated': truncated
+        }
+        return cached
+
+    def has_fresh(self, url: str, headers) -> bool:
+        """
+        Whether a GET of url with these request headers would be answered without touching the network
+
+        Reads only the entry's metadata; the body is just checked for existence.
+        """
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        metadata = self._load_metadata(key)
+        if metadata is None or not os.path.exists(self._paths(key)[1]):
+            return False
+        headers = CaseInsensitiveDict(headers or {})
+        stored = (metadata.get('vary') or {}).items()
+        return all(headers.get(name) == value for name, value in stored) and self._is_fresh(metadata)
+
+    def _is_cacheable(self, response: requests.Response) -> bool:
+        """Only successful, storable responses of the configured types are cached"""
+        if response.status_code != 200:
+            return False
+        if 'no-store' in self._cache_control(response.headers) or response.headers.get('Vary', '').strip() == '*':
+            return False
+        content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+        return content_type in self.cacheable_types
+
+    def _read_body(self, response: requests.Response) -> Tuple[bytes, bool]:
+        """Read a (decoded) body, honouring the configured size ceiling; returns it and whether it was cut"""
+        chunks = []
+        received = 0
+        truncated = False
+        for chunk in response.iter_content(chunk_size=16 * 1024):
+            chunks.append(chunk)
+            received += len(chunk)
+            if self.max_body_bytes and received >= self.max_body_bytes:
+                truncated = True
+                break
+        response.close()
+        body = b''.join(chunks)
+        return (body[:self.max_body_bytes] if self.max_body_bytes else body), truncated
+
+    @staticmethod
+    def _vary_names(headers) -> Tuple[str, ...]:
+        return tuple(name.strip().lower() for name in headers.get('Vary', '').split(',') if name.strip())
+
+    @staticmethod
+    def _vary_matches(metadata: dict, request) -> bool:
+        """Whether the request has the header values the stored response was selected by"""
+        return all(request.headers.get(name) == value for name, value in (metadata.get('vary') or {}).items())
+
+    @staticmethod
+    def _cache_control(headers) -> Dict[str, Optional[str]]:
+        """Parse a Cache-Control header into directives"""
+        directives = {}
+        for part in headers.get('Cache-Control', '').split(','):
+            name, _, value = part.strip().partition('=')
+            if name:
+                directives[name.lower()] = value.strip('"') or None
+        return directives
+
+    @staticmethod
+    def _validators(headers) -> Dict[str, Optional[str]]:
+        """Extract ETag and Last-Modified validators"""
+        return {'etag': headers.get('ETag'), 'last_modified': headers.get('Last-Modified')}
+
+    def _is_fresh(self, metadata: dict) -> bool:
+        """Check whether a stored entry is still within its freshness lifetime"""
+        directives = self._cache_control(metadata.get('headers', {}))
+        if 'no-cache' in directives:
+            return False
+
+        max_age = directives.get('max-age')
+        if max_age and re.fullmatch(r'\d+', max_age):
+            lifetime = int(max_age)
+        elif metadata['headers'].get('Expires'):
+            try:
+                lifetime = parsedate_to_datetime(metadata['headers']['Expires']).timestamp() - metadata['stored_at']
+            except (TypeError, ValueError):
+                lifetime = 0
+        else:
+            lifetime = 0
+
+        return time.time() - metadata['stored_at'] < lifetime
+
+    def _paths(self, key: str) -> Tuple[str, str]:
+        return os.path.join(self.cache_dir, f"{key}.json"), os.path.join(self.cache_dir, f"{key}.body")
+
+    def _load_metadata(self, key: str) -> Optional[dict]:
+        """Load an entry's metadata, or None if missing/corrupt"""
+        try:
+            with open(self._paths(key)[0], 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _load(self, key: str) -> Optional[Tuple[dict, bytes]]:
+        """Load an entry's metadata and body, or None if missing/corrupt"""
+        metadata = self._load_metadata(key)
+        if metadata is None:
+            return None
+        try:
+            with open(self._paths(key)[1], 'rb') as f:
+                return metadata, f.read()
+        except OSError:
+            return None
+
+    def _store(self, key: str, metadata: dict, body: bytes):
+        """Atomically write an entry so concurrent readers never see partial files"""
+        meta_path, body_path = self._paths(key)
+        suffix = f".{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(body_path + suffix, 'wb') as f:
+                f.write(body)
+            os.replace(body_path + suffix, body_path)
+            with open(meta_path + suffix, 'w', encoding='utf-8') as f:
+                json.dump(metadata, f)
+            os.replace(meta_path + suffix, meta_path)
+        except OSError:
+            pass  # Caching is best effort
+
+        with self._stats_lock:
+            self._stores_since_prune += 1
+            should_prune = self._stores_since_prune >= self.PRUNE_EVERY
+            if should_prune:
+                self._stores_since_prune = 0
+        if should_prune:
+            self.prune()
+
+    def _touch(self, key: str):
+        """Mark an entry as recently used (pruning drops the least recently used first)"""
+        try:
+            os.utime(self._paths(key)[0])
+        except OSError:
+            pass
+
+    def prune(self):
+        """Drop entries unused for max_age_days, then the least recently used until under max_cache_bytes"""
+        entries = []
+        try:
+            names = os.listdir(self.cache_dir)
+        except OSError:
+            return
+        for name in names:
+            if not name.endswith('.json'):
+                continue
+            meta_path, body_path = self._paths(name[:-len('.json')])
+            try:
+                size = os.path.getsize(meta_path) + os.path.getsize(body_path)
+                entries.append((os.path.getmtime(meta_path), size, meta_path, body_path))
+            except OSError:
+                continue
+
+        cutoff = time.time() - self.max_age_days * 86400
+        total = sum(size for _, size, _, _ in entries)
+        for used_at, size, meta_path, body_path in sorted(entries):
+            if used_at >= cutoff and total <= self.max_cache_bytes:
+                break
+            for path in (meta_path, body_path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= size
+
+    def _build_response(self, request, metadata: dict, body: bytes, from_cache: bool) -> requests.Response:
+        """Create a Response served from the stored body"""
+        response = requests.Response()
+        response.status_code = metadata.get('status_code', 200)
+        response.reason = metadata.get('reason', 'OK')
+        response.headers = CaseInsensitiveDict(metadata.get('headers', {}))
+        # The stored body is decoded (and possibly truncated); describe it, not the original transfer
+        response.headers['Content-Length'] = str(len(body))
+        response.from_cache = from_cache
+        response.revalidated = False
+        response.raw = io.BytesIO(body)
+        response.url = request.url
+        response.request = request
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.connection = self
+        return response
+
+    def _count(self, outcome: str):
+        with self._stats_lock:
+            self.stats[outcome] += 1
+
+    def get_stats(self) -> Dict[str, float]:
+        """Return hit/revalidate/miss counts and ratios"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        total = sum(stats.values())
+        for outcome in ('hits', 'revalidated', 'misses'):
+            stats[f"{outcome}_ratio"] = stats[outcome] / total if total else 0.0
+        stats['requests'] = total
+        return stats
+
+    def clear(self):
+        """Remove all cached entries"""
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(('.json', '.body')):
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
@@ -0,0 +1,211 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from tools.job_store import JobStore, job_store
+from utils.cv_parser import parse_cv
+from utils.embeddings import Embedder, HashingEmbedder, OllamaEmbedder, get_default_embedder
+from utils.llm_scheduler import BATCH, llm_scheduler
+from utils.logger import app_logger
+from utils.vector_index import VectorIndex
+
+# Default location of the vector index files
+VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", "data/vectors")
+
+
+def _embedder_tag(embedder: Embedder) -> str:
+    """Identify the embedder so indexes built by another one are not mixed in"""
+    if isinstance(embedder, OllamaEmbedder):
+        return f"ollama:{embedder.model}"
+    if isinstance(embedder, HashingEmbedder):
+        return f"hashing:{embedder.dimensions}"
+    return type(embedder).__name__
+
+
+class JobMatcher:
+    """
+    Ranks stored job postings against a CV and job description by embedding similarity
+
+    Postings from the job store are embedded once and kept in a memory-mapped
+    vector index; ranking is then a nearest-neighbour search that runs before
+    any text generation. New postings are indexed by a background thread at
+    batch priority in the LLM queue, started by a ranking call at most once
+    per SYNC_INTERVAL seconds, so rankings use the postings indexed so far
+    and never wait for indexing. CV section vectors are kept in a bounded
+    in-memory LRU.
+    """
+
+    JD_WEIGHT = 0.5
+    SYNC_BATCH = 64
+    SYNC_INTERVAL = 60
+    MAX_SECTION_WORDS = 120
+    MAX_CV_SECTIONS = 2048
+
+    def __init__(self, store: JobStore = job_store, embedder: Optional[Embedder] = None,
+                 index_dir: str = VECTOR_INDEX_DIR):
+        self.store = store
+        self.index_dir = index_dir
+        self._embedder = embedder
+        self._jobs_index: Optional[VectorIndex] = None
+        self._section_vectors: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._sync_thread: Optional[threading.Thread] = None
+        self._sync_started = 0.0
+
+    def _ensure_ready(self):
+        """Pick the embedder and open the index on first use (call without the lock; picking probes Ollama)"""
+        if self._jobs_index is not None:
+            return
+        embedder = self._embedder or get_default_embedder()
+        with self._lock:
+            if self._jobs_index is None:
+                self._embedder = embedder
+                self._jobs_index = VectorIndex(os.path.join(self.index_dir, 'jobs'), model=_embedder_tag(embedder))
+
+    @staticmethod
+    def _posting_text(posting: Dict[str, str]) -> str:
+        return ' '.join(posting.get(field) or '' for field in ('title', 'company', 'requirements', 'description'))
+
+    def sync(self, limit: int = 5000, max_new: Optional[int] = None) -> int:
+        """
+        Embed stored postings that are not indexed yet
+
+        Args:
+            limit: Most recent postings considered
+            max_new: Index at most this many postings (all when None)
+
+        Returns:
+            Number of newly indexed postings
+        """
+        self._ensure_ready()
+        with self._lock:
+            new_ids = [posting_id for posting_id in self.store.recent_ids(limit=limit)
+                       if posting_id not in self._jobs_index][:max_new]
+
+        indexed = 0
+        for start in range(0, len(new_ids), self.SYNC_BATCH):
+            postings = self.store.get_many(new_ids[start:start + self.SYNC_BATCH])
+            if not postings:
+                continue
+            # Embed outside the lock so rankings keep running during a long sync
+            with llm_scheduler.context('job-index', BATCH):
+                vectors = self._embedder([self._posting_text(posting) for posting in postings.values()])
+            with self._lock:
+                self._jobs_index.add(list(postings), vectors)
+            indexed += len(postings)
+
+        with self._lock:
+            self._jobs_index.save()
+        return indexed
+
+    def sync_in_background(self, **kwargs) -> bool:
+        """
+        Start a sync thread unless one is running
+
+        Returns:
+            True if a sync was started
+        """
+        with self._lock:
+            if self._sync_thread is not None and self._sync_thread.is_alive():
+                return False
+
+            def run():
+                try:
+                    self.sync(**kwargs)
+                except Exception as e:
+                    app_logger.warning(f"Job index sync failed: {e}")
+
+            self._sync_thread = threading.Thread(target=run, name='job-index-sync', daemon=True)
+            self._sync_thread.start()
+            self._sync_started = time.time()
+            return True
+
+    @classmethod
+    def split_cv_sections(cls, cv_text: str) -> List[str]:
+        """Split a CV into its parsed sections, then blank-line blocks, then fixed-size word chunks"""
+        sections = [f"{section.heading}\n{section.text}".strip() for section in parse_cv(cv_text).sections]
+        sections = [section for section in sections if section]
+        if len(sections) <= 1:
+            sections = [section.strip() for section in re.split(r'\n\s*\n', cv_text) if section.strip()]
+        if len(sections) <= 1:
+            words = cv_text.split()
+            sections = [' '.join(words[i:i + cls.MAX_SECTION_WORDS])
+                        for i in range(0, len(words), cls.MAX_SECTION_WORDS)]
+        return sections
+
+    def _embed_sections(self, sections: List[str]) -> np.ndarray:
+        """Embed CV sections, reusing vectors of recently seen sections (the lock is held only for the LRU)"""
+        keys = [hashlib.sha256(section.encode('utf-8')).hexdigest() for section in sections]
+        with self._lock:
+            known = {key: self._section_vectors[key] for key in keys if key in self._section_vectors}
+        missing = {key: section for key, section in zip(keys, sections) if key not in known}
+        if missing:
+            known.update(zip(missing, VectorIndex.normalise(self._embedder(list(missing.values())))))
+        with self._lock:
+            for key in keys:
+                self._section_vectors[key] = known[key]
+                self._section_vectors.move_to_end(key)
+            while len(self._section_vectors) > self.MAX_CV_SECTIONS:
+                self._section_vectors.popitem(last=False)
+        return np.vstack([known[key] for key in keys])
+
+    def rank(self, cv_text: str, job_description: str, k: int = 5,
+             candidates: int = 50) -> List[Tuple[Dict[str, str], float]]:
+        """
+        Rank stored postings for a candidate
+
+        A posting's score blends its similarity to the target JD with its
+        best similarity to any CV section.
+
+        Args:
+            cv_text: The candidate's CV text
+            job_description: The target job description
+            k: Number of postings to return
+            candidates: Nearest neighbours of the JD re-scored against the CV
+
+        Returns:
+            (posting, score) pairs, best match first
+        """
+        try:
+            if time.time() - self._sync_started >= self.SYNC_INTERVAL:
+                self.sync_in_background()
+            self._ensure_ready()
+            with self._lock:
+                if not len(self._jobs_index):
+                    return []
+
+            # Embedding calls Ollama, so it runs without the lock
+            jd_vector = VectorIndex.normalise(self._embedder([job_description]))[0]
+            sections = self.split_cv_sections(cv_text)
+            section_vectors = self._embed_sections(sections) if sections else None
+
+            with self._lock:
+                neighbours = self._jobs_index.search(jd_vector, k=candidates)
+                ids = [posting_id for posting_id, _ in neighbours]
+                candidate_vectors = self._jobs_index.vectors_for(ids) if ids else None
+            jd_scores = np.array([score for _, score in neighbours], dtype=np.float32)
+
+            if section_vectors is not None and candidate_vectors is not None:
+                cv_scores = (candidate_vectors @ section_vectors.T).max(axis=1)
+                scores = self.JD_WEIGHT * jd_scores + (1 - self.JD_WEIGHT) * cv_scores
+            else:
+                scores = jd_scores
+
+            postings = self.store.get_many(ids)
+            ranked = sorted(zip(ids, scores), key=lambda item: -item[1])
+            return [(postings[posting_id], float(score)) for posting_id, score in ranked
+                    if posting_id in postings][:k]
+
+        except Exception as e:
+            app_logger.warning(f"Job ranking failed: {e}")
+            return []
+
+
+# Global matcher shared by the agents
+job_matcher = JobMatcher()
@@ -0,0 +1,211 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+# Default location of the local job posting database
+JOB_STORE_PATH = os.getenv("JOB_STORE_PATH", "data/jobs.db")
+
+# Structured fields kept for each posting
+POSTING_FIELDS = ('title', 'company', 'location', 'description', 'requirements', 'salary', 'link')
+
+
+class JobStore:
+    """
+    Local SQLite store of job postings with full-text search
+
+    Postings come from the search tools and WebScraper and are keyed by the
+    near-duplicate index's posting_id, so copies of one posting merge into a
+    single row. Text fields are indexed with FTS5 (falling back to LIKE
+    queries when the SQLite build lacks FTS5) so lookups stay local and fast.
+    """
+
+    # bm25 column weights: title, company, location, description, requirements
+    BM25_WEIGHTS = (8.0, 4.0, 1.0, 1.0, 2.0)
+
+    def __init__(self, path: str = JOB_STORE_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self.fts_enabled = self._create_schema()
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread; SQLite connections are not shareable"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _create_schema(self) -> bool:
+        """Create tables; returns whether FTS5 is available"""
+        connection = self._connection()
+        with connection:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS postings (
+                    posting_id TEXT PRIMARY KEY,
+                    title TEXT, company TEXT, location TEXT, description TEXT,
+                    requirements TEXT, salary TEXT, link TEXT,
+                    source TEXT, first_seen REAL, last_seen REAL
+                )
+            """)
+            connection.execute("CREATE INDEX IF NOT EXISTS postings_last_seen ON postings(last_seen)")
+
+        try:
+            with connection:
+                connection.execute("""
+                    CREATE VIRTUAL TABLE IF NOT EXISTS postings_fts USING fts5(
+                        title, company, location, description, requirements,
+                        content='postings', content_rowid='rowid'
+                    )
+                """)
+                # Keep the external-content index in sync with the table
+                connection.execute("""
+                    CREATE TRIGGER IF NOT EXISTS postings_ai AFTER INSERT ON postings BEGIN
+                        INSERT INTO postings_fts(rowid, title, company, location, description, requirements)
+                        VALUES (new.rowid, new.title, new.company, new.location, new.description, new.requirements);
+                    END
+                """)
+                connection.execute("""
+                    CREATE TRIGGER IF NOT EXISTS postings_ad AFTER DELETE ON postings BEGIN
+                        INSERT INTO postings_fts(postings_fts, rowid, title, company, location, description, requirements)
+                        VALUES ('delete', old.rowid, old.title, old.company, old.location, old.description, old.requirements);
+                    END
+                """)
+                connection.execute("""
+                    CREATE TRIGGER IF NOT EXISTS postings_au AFTER UPDATE ON postings BEGIN
+                        INSERT INTO postings_fts(postings_fts, rowid, title, company, location, description, requirements)
+                        VALUES ('delete', old.rowid, old.title, old.company, old.location, old.description, old.requirements);
+                        INSERT INTO postings_fts(rowid, title, company, location, description, requirements)
+                        VALUES (new.rowid, new.title, new.company, new.location, new.description, new.requirements);
+                    END
+                """)
+            return True
+        except sqlite3.OperationalError:
+            return False
+
+    def upsert_many(self, postings: Iterable[Dict[str, str]], source: str = 'search') -> int:
+        """
+        Insert or merge postings; non-empty new fields win over stored ones
+
+        Args:
+            postings: Postings with a 'posting_id' and any of POSTING_FIELDS
+            source: Where the postings came from ('search', 'scrape', ...)
+
+        Returns:
+            Number of postings written
+        """
+        now = time.time()
+        rows = [
+            (posting['posting_id'], *[(posting.get(field) or '') for field in POSTING_FIELDS], source, now, now)
+            for posting in postings if posting.get('posting_id')
+        ]
+        if not rows:
+            return 0
+
+        merge = ', '.join(f"{field} = COALESCE(NULLIF(excluded.{field}, ''), postings.{field})"
+                          for field in POSTING_FIELDS)
+        connection = self._connection()
+        with connection:
+            connection.executemany(f"""
+                INSERT INTO postings (posting_id, {', '.join(POSTING_FIELDS)}, source, first_seen, last_seen)
+                VALUES ({', '.join('?' * (len(POSTING_FIELDS) + 4))})
+                ON CONFLICT(posting_id) DO UPDATE SET {merge}, source = excluded.source, last_seen = excluded.last_seen
+            """, rows)
+        return len(rows)
+
+    def upsert(self, posting: Dict[str, str], source: str = 'search') -> int:
+        """Insert or merge a single posting"""
+        return self.upsert_many([posting], source)
+
+    def search(self, query: str, limit: int = 5, max_age_days: Optional[float] = 30,
+               match_all: bool = True) -> List[Dict[str, str]]:
+        """
+        Full-text search over stored postings
+
+        Args:
+            query: Free-text query, e.g. a job title
+            limit: Maximum number of postings
+            max_age_days: Ignore postings not seen within this many days
+            match_all: Require every query term (otherwise any term matches)
+
+        Returns:
+            Postings ordered by relevance
+        """
+        terms = re.findall(r'[\w+#]+', query.lower())
+        if not terms:
+            return []
+        min_last_seen = time.time() - max_age_days * 86400 if max_age_days else 0
+
+        connection = self._connection()
+        if self.fts_enabled:
+            # Every term must match by default, so "senior backend developer" doesn't count every
+            # "developer" posting; bm25 ranks postings matching in the title first
+            match = (' AND ' if match_all else ' OR ').join(f'"{term}"' for term in terms)
+            rows = connection.execute(f"""
+                SELECT p.* FROM postings_fts
+                JOIN postings p ON p.rowid = postings_fts.rowid
+                WHERE postings_fts MATCH ? AND p.last_seen >= ?
+                ORDER BY bm25(postings_fts, {', '.join(map(str, self.BM25_WEIGHTS))})
+                LIMIT ?
+            """, (match, min_last_seen, limit)).fetchall()
+        else:
+            conditions = (' AND ' if match_all else ' OR ').join("(title LIKE ? OR description LIKE ?)" for _ in terms)
+            parameters = [value for term in terms for value in (f"%{term}%", f"%{term}%")]
+            rows = connection.execute(f"""
+                SELECT * FROM postings WHERE ({conditions}) AND last_seen >= ?
+                ORDER BY last_seen DESC LIMIT ?
+            """, (*parameters, min_last_seen, limit)).fetchall()
+
+        return [dict(row) for row in rows]
+
+    def get_many(self, posting_ids: List[str]) -> Dict[str, Dict[str, str]]:
+        """Fetch postings by id"""
+        if not posting_ids:
+            return {}
+        placeholders = ', '.join('?' * len(posting_ids))
+        rows = self._connection().execute(
+            f"SELECT * FROM postings WHERE posting_id IN ({placeholders})", list(posting_ids)
+        ).fetchall()
+        return {row['posting_id']: dict(row) for row in rows}
+
+    def recent(self, limit: int = 5000, max_age_days: Optional[float] = 30) -> List[Dict[str, str]]:
+        """Most recently seen postings"""
+        min_last_seen = time.time() - max_age_days * 86400 if max_age_days else 0
+        rows = self._connection().execute(
+            "SELECT * FROM postings WHERE last_seen >= ? ORDER BY last_seen DESC LIMIT ?",
+            (min_last_seen, limit)
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def recent_ids(self, limit: int = 5000, max_age_days: Optional[float] = 30) -> List[str]:
+        """Ids of the most recently seen postings, without loading their text"""
+        min_last_seen = time.time() - max_age_days * 86400 if max_age_days else 0
+        rows = self._connection().execute(
+            "SELECT posting_id FROM postings WHERE last_seen >= ? ORDER BY last_seen DESC LIMIT ?",
+            (min_last_seen, limit)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def count(self) -> int:
+        """Number of stored postings"""
+        return self._connection().execute("SELECT COUNT(*) FROM postings").fetchone()[0]
+
+    def prune(self, max_age_days: float = 90) -> int:
+        """Delete postings not seen within max_age_days"""
+        connection = self._connection()
+        with connection:
+            cursor = connection.execute("DELETE FROM postings WHERE last_seen < ?",
+                                        (time.time() - max_age_days * 86400,))
+        return cursor.rowcount
+
+
+# Global store shared by the search tools, WebScraper and JobFinderAgent
+job_store = JobStore()
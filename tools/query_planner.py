@@ -0,0 +1,222 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, List, Tuple
+
+from utils.logger import app_logger
+from utils.text_cleaner import TextCleaner
+from utils.metrics import metrics
+from utils.tracing import tracer
+
+# Seconds a search result is reused before the search runs again (live postings go stale)
+SEARCH_RESULT_TTL = float(os.getenv("SEARCH_RESULT_TTL", "900"))
+
+
+class SearchFailure(str):
+    """Search output that reports a failed (or partly failed) search; shown like any result but never cached"""
+
+
+@dataclass
+class SearchPlan:
+    """Minimal set of searches derived from a CV and job description"""
+    job_queries: List[str] = field(default_factory=list)
+    skill_queries: List[str] = field(default_factory=list)
+    missing_skills: List[str] = field(default_factory=list)
+    matched_skills: List[str] = field(default_factory=list)
+
+
+class QueryPlanner:
+    """Derives search queries from the CV and JD and deduplicates them across agents"""
+
+    # Limits per analysis, matching the number of searches the agents used to run
+    MAX_JOB_QUERIES = 1
+    MAX_SKILL_QUERIES = 2
+    DEFAULT_JOB_QUERY = "software engineer"
+
+    # Token aliases applied when canonicalizing queries
+    ALIASES = {
+        'js': 'javascript',
+        'ts': 'typescript',
+        'reactjs': 'react',
+        'react.js': 'react',
+        'nodejs': 'node.js',
+        'node': 'node.js',
+        'postgres': 'postgresql',
+        'mongo': 'mongodb',
+        'golang': 'go',
+        'k8s': 'kubernetes',
+        'sr': 'senior',
+        'sr.': 'senior',
+        'jr': 'junior',
+        'jr.': 'junior',
+        'fullstack': 'full stack',
+        'full-stack': 'full stack',
+        'frontend': 'front end',
+        'front-end': 'front end',
+        'backend': 'back end',
+        'back-end': 'back end',
+        'developer': 'engineer',
+    }
+
+    def __init__(self, max_cached_plans: int = 32, max_cached_results: int = 128,
+                 result_ttl: float = SEARCH_RESULT_TTL):
+        self.max_cached_plans = max_cached_plans
+        self.max_cached_results = max_cached_results
+        self.result_ttl = result_ttl
+        self._plans: "OrderedDict[str, SearchPlan]" = OrderedDict()
+        self._results: "OrderedDict[Tuple[str, str], Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'executed': 0, 'deduplicated': 0, 'expired': 0, 'failed': 0}
+
+    @classmethod
+    def canonicalize(cls, query: str) -> str:
+        """
+        Canonicalize a search query so equivalent queries share one key
+
+        Args:
+            query: Raw search query
+
+        Returns:
+            Lowercased query with aliases applied and tokens sorted
+        """
+        tokens = re.findall(r'[a-z0-9+#.\-]+', query.lower())
+        canonical_tokens = set()
+        for token in tokens:
+            token = token.strip('.-')
+            if not token:
+                continue
+            canonical_tokens.update(cls.ALIASES.get(token, token).split())
+        return ' '.join(sorted(canonical_tokens))
+
+    def plan(self, cv_text: str, job_description: str) -> SearchPlan:
+        """
+        Build (or reuse) the search plan for a CV/JD pair
+
+        Args:
+            cv_text: The candidate's CV text
+            job_description: The target job description
+
+        Returns:
+            SearchPlan with job and skill queries
+        """
+        plan_key = hashlib.sha256(f"{cv_text}\x00{job_description}".encode('utf-8')).hexdigest()
+        with self._lock:
+            if plan_key in self._plans:
+                self._plans.move_to_end(plan_key)
+                return self._plans[plan_key]
+
+        search_plan = self._build_plan(cv_text, job_description)
+
+        with self._lock:
+            self._plans[plan_key] = search_plan
+            while len(self._plans) > self.max_cached_plans:
+                self._plans.popitem(last=False)
+
+        app_logger.debug(
+            f"Search plan: jobs={search_plan.job_queries} skills={search_plan.skill_queries}"
+        )
+        return search_plan
+
+    def _build_plan(self, cv_text: str, job_description: str) -> SearchPlan:
+        """Derive titles and missing skills with the TextCleaner extractors"""
+        # Titles: prefer the JD, fall back to the CV, then to a generic query
+        titles = TextCleaner.extract_job_titles(job_description) or TextCleaner.extract_job_titles(cv_text)
+        job_queries = self._unique(titles, self.MAX_JOB_QUERIES) or [self.DEFAULT_JOB_QUERY]
+
+        # Skills: keep JD order so the most prominent requirements come first
+        jd_skills = self._ordered_skills(job_description)
+        cv_keys = {self.canonicalize(skill) for skill in TextCleaner.extract_skills_from_text(cv_text)}
+
+        missing_skills = [skill for skill in jd_skills if self.canonicalize(skill) not in cv_keys]
+        matched_skills = [skill for skill in jd_skills if self.canonicalize(skill) in cv_keys]
+
+        return SearchPlan(
+            job_queries=job_queries,
+            skill_queries=self._unique(missing_skills, self.MAX_SKILL_QUERIES),
+            missing_skills=missing_skills,
+            matched_skills=matched_skills
+        )
+
+    @staticmethod
+    def _ordered_skills(text: str) -> List[str]:
+        """Return extracted skills ordered by first appearance in the text (ties by name)"""
+        skills = TextCleaner.extract_skills_from_text(text)
+
+        def first_position(skill: str) -> int:
+            # Whole-word match, so "Java" isn't placed at the first "JavaScript"
+            match = re.search(r'(?<![\w+#.])' + re.escape(skill) + r'(?![\w+#])', text, re.IGNORECASE)
+            return match.start() if match else len(text)
+
+        return sorted(skills, key=lambda skill: (first_position(skill), skill))
+
+    def _unique(self, queries: List[str], limit: int) -> List[str]:
+        """Deduplicate queries by canonical form and cap the result"""
+        unique_queries = []
+        seen = set()
+        for query in queries:
+            key = self.canonicalize(query)
+            if key and key not in seen:
+                seen.add(key)
+                unique_queries.append(query)
+            if len(unique_queries) >= limit:
+                break
+        return unique_queries
+
+    def execute(self, tool_name: str, query: str, search_func: Callable[[str], str]) -> str:
+        """
+        Run a search once per canonical query, sharing results across agents
+
+        Args:
+            tool_name: Name of the search tool (part of the dedup key)
+            query: The query to run
+            search_func: Function that performs the actual search
+
+        Returns:
+            Search results, possibly served from an earlier identical successful query
+        """
+        key = (tool_name, self.canonicalize(query))
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None and time.time() - cached[0] > self.result_ttl:
+                del self._results[key]
+                self.stats['expired'] += 1
+                cached = None
+            if cached is not None:
+                self._results.move_to_end(key)
+                self.stats['deduplicated'] += 1
+                app_logger.debug(f"Search tool '{tool_name}' reused results for query: {query}")
+                return cached[1]
+
+        app_logger.log_search_query(tool_name, query)
+        with tracer.span('search.execute', tool=tool_name, query=query):
+            results = search_func(query)
+
+        with self._lock:
+            self.stats['executed'] += 1
+            # Failures are returned but not cached, so the next request searches again
+            if not isinstance(results, SearchFailure):
+                self._results[key] = (time.time(), results)
+                while len(self._results) > self.max_cached_results:
+                    self._results.popitem(last=False)
+            else:
+                self.stats['failed'] += 1
+
+        app_logger.log_search_results(tool_name, query, len(results.split('\n')))
+        return results
+
+    def clear(self, plans: bool = True, results: bool = True):
+        """Drop cached plans and/or search results"""
+        with self._lock:
+            if plans:
+                self._plans.clear()
+            if results:
+                self._results.clear()
+
+
+# Global planner shared by all agents
+query_planner = QueryPlanner()
+metrics.register_collector('search_planner', lambda: dict(query_planner.stats))
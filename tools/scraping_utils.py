@@ -1,15 +1,68 @@
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
-import time
-import random
-from typing import List, Dict, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+from typing import List, Dict, Optional, Iterator, Iterable, Tuple
 from urllib.parse import urljoin, urlparse
 import re
 
+from tools.html_extractor import ExtractionEngine, ParsedPage, strip_irrelevant_markup
+from tools.http_cache import CachingAdapter, HTTP_CACHE_DIR
+from tools.crawl_scheduler import CrawlScheduler
+from tools.dedup import job_dedup_index
+from tools.job_store import JobStore, job_store
+from utils.tracing import tracer
+
+# Patterns searched in the page text computed once per page
+SALARY_PATTERN = re.compile(r'\$[\d,]+(?:\s*-\s*\$[\d,]+)?(?:\s*per\s+year|/year|annually)?', re.IGNORECASE)
+DURATION_PATTERN = re.compile(r'(\d+(?:\.\d+)?)\s*(hour|hr|minute|min|week|month|day)s?', re.IGNORECASE)
+PRICE_PATTERN = re.compile(r'\$\d+(?:\.\d{2})?|free|Free', re.IGNORECASE)
+
 class WebScraper:
     """Utility class for web scraping job-related content"""
     
-    def __init__(self):
+    # Connection pool and concurrency defaults for bulk fetching
+    POOL_SIZE = 20
+    MAX_WORKERS = 8
+    PER_HOST_LIMIT = 2
+    REQUEST_TIMEOUT = 10
+    BATCH_TIMEOUT = 30
+    MAX_RETRIES = 2
+    ROBOTS_TIMEOUT = 5
+    
+    # Download limits: bodies are streamed and cut off at MAX_PAGE_BYTES
+    MAX_PAGE_BYTES = 512 * 1024
+    CHUNK_SIZE = 16 * 1024
+    ALLOWED_CONTENT_TYPES = ('text/html', 'application/xhtml+xml', 'application/xml', 'text/xml')
+    
+    # Field selectors in priority order, resolved in one document traversal
+    JOB_FIELD_SELECTORS = {
+        'title': ['h1', '[data-testid="job-title"]', '.job-title', '.jobTitle', 'h1.jobTitle', '.title'],
+        'company': ['[data-testid="company-name"]', '.company-name', '.companyName', '.employer',
+                    '[data-testid="employer-name"]'],
+        'location': ['[data-testid="job-location"]', '.location', '.jobLocation', '[data-testid="location"]'],
+        'description': ['[data-testid="job-description"]', '.job-description', '.jobDescription',
+                        '.description', '#job-description'],
+        'salary': ['[data-testid="salary"]', '.salary', '.compensation', '.pay']
+    }
+    COURSE_FIELD_SELECTORS = {
+        'title': ['h1', '.course-title', '.title', 'h1.course-title'],
+        'canonical': ['link[rel="canonical"]'],
+        'rating': ['.rating', '.stars', '.score'],
+        'description': ['.description', '.course-description', '.about', '.overview']
+    }
+    
+    _job_engine = ExtractionEngine(JOB_FIELD_SELECTORS, heading_tags=('h2', 'h3', 'h4', 'strong'))
+    _course_engine = ExtractionEngine(dict(
+        COURSE_FIELD_SELECTORS,
+        # Every rating selector is resolved so later ones can be tried as fallbacks
+        **{f'rating:{selector}': [selector] for selector in COURSE_FIELD_SELECTORS['rating']}
+    ))
+    
+    def __init__(self, pool_size: int = POOL_SIZE, per_host_limit: int = PER_HOST_LIMIT,
+                 max_page_bytes: int = MAX_PAGE_BYTES, cache_dir: Optional[str] = HTTP_CACHE_DIR,
+                 store: Optional[JobStore] = job_store):
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
@@ -19,107 +72,283 @@ class WebScraper:
         }
         self.session = requests.Session()
         self.session.headers.update(self.headers)
+        
+        # Pooled keep-alive connections shared by all fetches, including bulk ones.
+        # With a cache_dir, pages are also cached on disk and revalidated.
+        if cache_dir:
+            adapter = CachingAdapter(
+                cache_dir=cache_dir,
+                cacheable_types=self.ALLOWED_CONTENT_TYPES,
+                max_body_bytes=max_page_bytes,
+                pool_connections=pool_size,
+                pool_maxsize=pool_size
+            )
+        else:
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.http_cache = adapter if cache_dir else None
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
+        self.per_host_limit = per_host_limit
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._host_slots_lock = threading.Lock()
+        
+        # Scraped job postings are kept in the local job store (None to disable)
+        self.store = store
+        
+        # Per-domain pacing that honours robots.txt and backs off on 429/503
+        self.scheduler = CrawlScheduler(robots_fetcher=self._fetch_robots)
+        
+        self.max_page_bytes = max_page_bytes
+        self.stats = {
+            'pages_fetched': 0,
+            'pages_truncated': 0,
+            'pages_rejected': 0,
+            'pages_from_cache': 0,
+            'bytes_downloaded': 0,
+            'bytes_from_cache': 0,
+            'bytes_saved': 0,
+            'bytes_trimmed': 0
+        }
+        self._stats_lock = threading.Lock()
+    
+    def _count(self, **increments):
+        """Increment download counters"""
+        with self._stats_lock:
+            for key, value in increments.items():
+                self.stats[key] += value
+    
+    def get_stats(self) -> Dict[str, float]:
+        """Return a snapshot of the download and cache counters"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        if self.http_cache is not None:
+            stats.update({f"cache_{k}": v for k, v in self.http_cache.get_stats().items()})
+        return stats
     
-    def extract_job_details(self, url: str) -> Dict[str, str]:
+    def _host_slot(self, url: str) -> threading.BoundedSemaphore:
+        """Return the semaphore capping concurrent requests to the URL's host"""
+        host = urlparse(url).netloc.lower()
+        with self._host_slots_lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._host_slots[host]
+    
+    def _fetch_robots(self, robots_url: str) -> Optional[str]:
+        """Fetch robots.txt for the crawl scheduler"""
+        response = self.session.get(robots_url, timeout=self.ROBOTS_TIMEOUT)
+        return response.text if response.status_code == 200 else None
+    
+    def _fetch(self, url: str, timeout: float = REQUEST_TIMEOUT) -> bytes:
+        """Fetch a page body, holding one of its host's concurrency slots"""
+        with tracer.span('scrape.fetch', url=url) as span, self._host_slot(url):
+            span.set(slot_wait_seconds=round(span.elapsed(), 4))
+            for attempt in range(self.MAX_RETRIES + 1):
+                # Fresh cached pages never reach the site, so they skip robots.txt, crawl-delay and backoff
+                if self.http_cache is not None and self.http_cache.has_fresh(url, self.session.headers):
+                    response = self.session.get(url, timeout=timeout, stream=True)
+                else:
+                    with self.scheduler.slot(url):
+                        response = self.session.get(url, timeout=timeout, stream=True)
+                
+                with response:
+                    # Everything that reached the site adapts its crawl delay, 304 revalidations included
+                    if getattr(response, 'revalidated', False):
+                        self.scheduler.record(url, 304)
+                    elif not getattr(response, 'from_cache', False):
+                        self.scheduler.record(url, response.status_code, response.headers.get('Retry-After'))
+                    if response.status_code in CrawlScheduler.THROTTLE_STATUSES and attempt < self.MAX_RETRIES:
+                        continue  # The scheduler has backed off; try again
+                    response.raise_for_status()
+                    
+                    # Check the content type before any of the body is read
+                    content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+                    if content_type and content_type not in self.ALLOWED_CONTENT_TYPES:
+                        self._count(pages_rejected=1)
+                        raise ValueError(f"Unsupported content type '{content_type}'")
+                    
+                    content = self._read_bounded(response)
+                    span.set(status=response.status_code, attempts=attempt + 1, bytes=len(content))
+                    return content
+    
+    def _read_bounded(self, response: requests.Response) -> bytes:
+        """
+        Stream a response body, stopping once max_page_bytes have been read
+        
+        Bodies served by the HTTP cache count as bytes_from_cache; downloads
+        count as bytes_downloaded, with bytes_saved being the part of a
+        truncated page's Content-Length that never crossed the wire.
+        """
+        chunks = []
+        received = 0
+        truncated = False
+        
+        for chunk in response.iter_content(chunk_size=self.CHUNK_SIZE):
+            chunks.append(chunk)
+            received += len(chunk)
+            if received >= self.max_page_bytes:
+                truncated = True
+                break
+        
+        content = b''.join(chunks)[:self.max_page_bytes]
+        
+        if getattr(response, 'from_cache', False):
+            self._count(pages_fetched=1, pages_from_cache=1, bytes_from_cache=len(content))
+            return content
+        
+        # Savings are measured on the wire, where the original Content-Length applies.
+        # Downloads through the cache adapter report the wire figures of their (already cut) transfer.
+        info = getattr(response, 'download_info', None)
+        if info is not None:
+            truncated = truncated or info['truncated']
+            wire_bytes, content_length = info['wire_bytes'], info['content_length']
+        else:
+            length_header = response.headers.get('Content-Length', '')
+            wire_bytes = response.raw.tell() if hasattr(response.raw, 'tell') else received
+            content_length = int(length_header) if length_header.isdigit() else None
+        saved = max(0, content_length - wire_bytes) if truncated and content_length is not None else 0
+        
+        self._count(
+            pages_fetched=1,
+            pages_truncated=int(truncated),
+            bytes_downloaded=len(content),
+            bytes_saved=saved
+        )
+        return content
+    
+    def _trim(self, content: bytes) -> bytes:
+        """Drop irrelevant subtrees so parsing is limited to the useful content"""
+        trimmed = strip_irrelevant_markup(content)
+        self._count(bytes_trimmed=len(content) - len(trimmed))
+        return trimmed
+    
+    @tracer.traced('scrape.page', kind='job')
+    def extract_job_details(self, url: str, timeout: float = REQUEST_TIMEOUT) -> Dict[str, str]:
         """Extract job details from a job posting URL"""
         try:
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Generic job detail extraction
-            job_details = {
-                'title': self._extract_title(soup),
-                'company': self._extract_company(soup),
-                'location': self._extract_location(soup),
-                'description': self._extract_description(soup),
-                'requirements': self._extract_requirements(soup),
-                'salary': self._extract_salary(soup)
-            }
-            
-            return {k: v for k, v in job_details.items() if v}
+            content = self._fetch(url, timeout=timeout)
+            with tracer.span('scrape.parse', bytes=len(content)):
+                job_details = self._parse_job_details(content)
+            self._store_job(url, job_details)
+            return job_details
             
         except Exception as e:
             return {'error': f"Failed to scrape {url}: {str(e)}"}
     
-    def _extract_title(self, soup: BeautifulSoup) -> Optional[str]:
+    def _store_job(self, url: str, job_details: Dict[str, str]):
+        """Add a scraped posting to the local job store"""
+        if self.store is None or not job_details.get('title'):
+            return
+        try:
+            posting = dict(job_details, link=url)
+            posting['posting_id'], _ = job_dedup_index.add(posting)
+            self.store.upsert(posting, source='scrape')
+        except Exception:
+            pass  # The store is an optimisation; scraping still succeeds
+    
+    def _parse_job_details(self, content: bytes) -> Dict[str, str]:
+        """Parse job details from a downloaded job posting page"""
+        page = self._job_engine.parse(self._trim(content))
+        
+        # Generic job detail extraction
+        job_details = {
+            'title': self._extract_title(page),
+            'company': self._extract_company(page),
+            'location': self._extract_location(page),
+            'description': self._extract_description(page),
+            'requirements': self._extract_requirements(page),
+            'salary': self._extract_salary(page)
+        }
+        
+        return {k: v for k, v in job_details.items() if v}
+    
+    def extract_many(self, urls: Iterable[str], kind: str = 'job',
+                     max_workers: int = MAX_WORKERS,
+                     timeout: float = REQUEST_TIMEOUT,
+                     batch_timeout: float = BATCH_TIMEOUT) -> Iterator[Tuple[str, Dict[str, str]]]:
+        """
+        Scrape many job or learning resource URLs concurrently
+        
+        Requests share the session's connection pool and are capped per host.
+        Results are yielded as soon as each page is parsed, so a batch takes
+        roughly as long as its slowest fetch rather than the sum of all fetches.
+        
+        Args:
+            urls: URLs to scrape (duplicates are fetched once)
+            kind: 'job' for job postings or 'learning' for learning resources
+            max_workers: Maximum number of concurrent requests overall
+            timeout: Timeout in seconds for each individual request
+            batch_timeout: Timeout in seconds for the whole batch
+            
+        Yields:
+            (url, details) tuples in completion order; failures and batch
+            timeouts are reported as {'error': ...} like the single-URL methods
+        """
+        extractors = {
+            'job': self.extract_job_details,
+            'learning': self.extract_learning_resource_info
+        }
+        if kind not in extractors:
+            raise ValueError(f"Unknown scrape kind '{kind}', expected one of {list(extractors)}")
+        extract = extractors[kind]
+        
+        unique_urls = list(dict.fromkeys(urls))
+        if not unique_urls:
+            return
+        
+        executor = ThreadPoolExecutor(max_workers=min(max_workers, len(unique_urls)))
+        # Each fetch's spans nest under the caller's span
+        futures = {executor.submit(tracer.wrap(extract), url, timeout): url for url in unique_urls}
+        pending = set(futures.values())
+        
+        try:
+            for future in as_completed(futures, timeout=batch_timeout):
+                url = futures[future]
+                pending.discard(url)
+                yield url, future.result()
+        except FuturesTimeoutError:
+            for url in unique_urls:
+                if url in pending:
+                    yield url, {'error': f"Failed to scrape {url}: batch timed out after {batch_timeout}s"}
+        finally:
+            # Don't block on stragglers; queued fetches are dropped (cancel_futures needs Python 3.9)
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+    
+    def _extract_title(self, page: ParsedPage) -> Optional[str]:
         """Extract job title from various possible selectors"""
-        selectors = [
-            'h1',
-            '[data-testid="job-title"]',
-            '.job-title',
-            '.jobTitle',
-            'h1.jobTitle',
-            '.title'
-        ]
-        
-        for selector in selectors:
-            element = soup.select_one(selector)
-            if element:
-                return element.get_text(strip=True)
-        return None
+        return page.first_text('title')
     
-    def _extract_company(self, soup: BeautifulSoup) -> Optional[str]:
+    def _extract_company(self, page: ParsedPage) -> Optional[str]:
         """Extract company name"""
-        selectors = [
-            '[data-testid="company-name"]',
-            '.company-name',
-            '.companyName',
-            '.employer',
-            '[data-testid="employer-name"]'
-        ]
-        
-        for selector in selectors:
-            element = soup.select_one(selector)
-            if element:
-                return element.get_text(strip=True)
-        return None
+        return page.first_text('company')
     
-    def _extract_location(self, soup: BeautifulSoup) -> Optional[str]:
+    def _extract_location(self, page: ParsedPage) -> Optional[str]:
         """Extract job location"""
-        selectors = [
-            '[data-testid="job-location"]',
-            '.location',
-            '.jobLocation',
-            '[data-testid="location"]'
-        ]
-        
-        for selector in selectors:
-            element = soup.select_one(selector)
-            if element:
-                return element.get_text(strip=True)
-        return None
+        return page.first_text('location')
     
-    def _extract_description(self, soup: BeautifulSoup) -> Optional[str]:
+    def _extract_description(self, page: ParsedPage) -> Optional[str]:
         """Extract job description"""
-        selectors = [
-            '[data-testid="job-description"]',
-            '.job-description',
-            '.jobDescription',
-            '.description',
-            '#job-description'
-        ]
-        
-        for selector in selectors:
-            element = soup.select_one(selector)
-            if element:
-                # Get text and clean it up
-                text = element.get_text(separator='\n', strip=True)
-                return ' '.join(text.split())[:1000]  # Limit length
+        element = page.first('description')
+        if element is not None:
+            # Get text and clean it up
+            text = element.get_text(separator='\n', strip=True)
+            return ' '.join(text.split())[:1000]  # Limit length
         return None
     
-    def _extract_requirements(self, soup: BeautifulSoup) -> Optional[str]:
+    def _extract_requirements(self, page: ParsedPage) -> Optional[str]:
         """Extract job requirements"""
         # Look for common requirement section keywords
         requirement_keywords = ['requirements', 'qualifications', 'skills', 'experience']
         
         for keyword in requirement_keywords:
-            # Find headings containing the keyword
-            headings = soup.find_all(['h2', 'h3', 'h4', 'strong'], 
-                                   string=re.compile(keyword, re.IGNORECASE))
-            
-            for heading in headings:
+            # Headings were collected during the extraction traversal
+            keyword_pattern = re.compile(keyword, re.IGNORECASE)
+            for heading in page.headings:
+                if heading.string is None or not keyword_pattern.search(heading.string):
+                    continue
+                
                 # Get the next sibling elements (usually ul, ol, or div)
                 next_element = heading.find_next_sibling(['ul', 'ol', 'div', 'p'])
                 if next_element:
@@ -128,64 +357,54 @@ class WebScraper:
         
         return None
     
-    def _extract_salary(self, soup: BeautifulSoup) -> Optional[str]:
+    def _extract_salary(self, page: ParsedPage) -> Optional[str]:
         """Extract salary information"""
-        selectors = [
-            '[data-testid="salary"]',
-            '.salary',
-            '.compensation',
-            '.pay'
-        ]
-        
-        for selector in selectors:
-            element = soup.select_one(selector)
-            if element:
-                return element.get_text(strip=True)
+        salary = page.first_text('salary')
+        if salary:
+            return salary
         
         # Look for salary patterns in text
-        salary_pattern = r'\$[\d,]+(?:\s*-\s*\$[\d,]+)?(?:\s*per\s+year|/year|annually)?'
-        text = soup.get_text()
-        salary_match = re.search(salary_pattern, text, re.IGNORECASE)
+        salary_match = SALARY_PATTERN.search(page.text)
         if salary_match:
             return salary_match.group()
         
         return None
     
-    def extract_learning_resource_info(self, url: str) -> Dict[str, str]:
+    @tracer.traced('scrape.page', kind='learning')
+    def extract_learning_resource_info(self, url: str, timeout: float = REQUEST_TIMEOUT) -> Dict[str, str]:
         """Extract information from learning resource URLs"""
         try:
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            resource_info = {
-                'title': self._extract_course_title(soup),
-                'provider': self._extract_provider(soup),
-                'duration': self._extract_duration(soup),
-                'rating': self._extract_rating(soup),
-                'price': self._extract_price(soup),
-                'description': self._extract_course_description(soup)
-            }
-            
-            return {k: v for k, v in resource_info.items() if v}
+            content = self._fetch(url, timeout=timeout)
+            with tracer.span('scrape.parse', bytes=len(content)):
+                return self._parse_learning_resource(content)
             
         except Exception as e:
             return {'error': f"Failed to scrape learning resource {url}: {str(e)}"}
     
-    def _extract_course_title(self, soup: BeautifulSoup) -> Optional[str]:
+    def _parse_learning_resource(self, content: bytes) -> Dict[str, str]:
+        """Parse learning resource details from a downloaded page"""
+        page = self._course_engine.parse(self._trim(content))
+        
+        resource_info = {
+            'title': self._extract_course_title(page),
+            'provider': self._extract_provider(page),
+            'duration': self._extract_duration(page),
+            'rating': self._extract_rating(page),
+            'price': self._extract_price(page),
+            'description': self._extract_course_description(page)
+        }
+        
+        return {k: v for k, v in resource_info.items() if v}
+    
+    def _extract_course_title(self, page: ParsedPage) -> Optional[str]:
         """Extract course title"""
-        selectors = ['h1', '.course-title', '.title', 'h1.course-title']
-        for selector in selectors:
-            element = soup.select_one(selector)
-            if element:
-                return element.get_text(strip=True)
-        return None
+        return page.first_text('title')
     
-    def _extract_provider(self, soup: BeautifulSoup) -> Optional[str]:
+    def _extract_provider(self, page: ParsedPage) -> Optional[str]:
         """Extract course provider"""
         # Check URL for known providers
-        domain = urlparse(soup.find('link', {'rel': 'canonical'})['href'] if soup.find('link', {'rel': 'canonical'}) else '').netloc
+        canonical = page.first('canonical')
+        domain = urlparse(canonical.get('href', '') if canonical is not None else '').netloc
         
         providers = {
             'coursera.org': 'Coursera',
@@ -202,46 +421,44 @@ class WebScraper:
         
         return None
     
-    def _extract_duration(self, soup: BeautifulSoup) -> Optional[str]:
+    def _extract_duration(self, page: ParsedPage) -> Optional[str]:
         """Extract course duration"""
-        duration_pattern = r'(\d+(?:\.\d+)?)\s*(hour|hr|minute|min|week|month|day)s?'
-        text = soup.get_text()
-        duration_match = re.search(duration_pattern, text, re.IGNORECASE)
+        duration_match = DURATION_PATTERN.search(page.text)
         if duration_match:
             return duration_match.group()
         return None
     
-    def _extract_rating(self, soup: BeautifulSoup) -> Optional[str]:
+    def _extract_rating(self, page: ParsedPage) -> Optional[str]:
         """Extract course rating"""
-        rating_selectors = ['.rating', '.stars', '.score']
-        for selector in rating_selectors:
-            element = soup.select_one(selector)
-            if element:
+        # Unlike other fields, a later selector is tried if the first match has no number
+        for selector in self.COURSE_FIELD_SELECTORS['rating']:
+            element = page.first(f'rating:{selector}')
+            if element is not None:
                 rating_text = element.get_text(strip=True)
                 rating_match = re.search(r'(\d+(?:\.\d+)?)', rating_text)
                 if rating_match:
                     return rating_match.group()
         return None
     
-    def _extract_price(self, soup: BeautifulSoup) -> Optional[str]:
+    def _extract_price(self, page: ParsedPage) -> Optional[str]:
         """Extract course price"""
-        price_pattern = r'\$\d+(?:\.\d{2})?|free|Free'
-        text = soup.get_text()
-        price_match = re.search(price_pattern, text, re.IGNORECASE)
+        price_match = PRICE_PATTERN.search(page.text)
         if price_match:
             return price_match.group()
         return None
     
-    def _extract_course_description(self, soup: BeautifulSoup) -> Optional[str]:
+    def _extract_course_description(self, page: ParsedPage) -> Optional[str]:
         """Extract course description"""
-        selectors = ['.description', '.course-description', '.about', '.overview']
-        for selector in selectors:
-            element = soup.select_one(selector)
-            if element:
-                text = element.get_text(separator=' ', strip=True)
-                return ' '.join(text.split())[:300]  # Limit length
+        element = page.first('description')
+        if element is not None:
+            text = element.get_text(separator=' ', strip=True)
+            return ' '.join(text.split())[:300]  # Limit length
         return None
     
-    def rate_limit_delay(self):
-        """Add random delay to avoid rate limiting"""
-        time.sleep(random.uniform(1, 3))
+    def rate_limit_delay(self, url: str):
+        """Wait for the URL's domain according to the adaptive crawl scheduler"""
+        self.scheduler.wait(url)
+    
+    def get_domain_metrics(self) -> Dict[str, Dict[str, float]]:
+        """Per-domain queue depth and delay metrics from the crawl scheduler"""
+        return self.scheduler.metrics()
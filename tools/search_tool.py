@@ -7,6 +7,12 @@ import random
 from typing import List, Dict
 import re
 
+from tools.dedup import job_dedup_index
+from tools.job_store import job_store
+from tools.query_planner import SearchFailure
+from utils.cassette import cassette
+from utils.tracing import tracer
+
 class SearchTool:
     """Enhanced search tool for job hunting and learning resources"""
     
@@ -16,6 +22,21 @@ class SearchTool:
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
     
+    def _results(self, query: str, max_results: int) -> List[Dict[str, str]]:
+        """Structured DuckDuckGo hits for a query, traced as one search"""
+        with tracer.span('search.query', query=query, kind='results') as span:
+            results = cassette.call('search', 'results', {'query': query, 'max_results': max_results},
+                                    lambda: self.ddg_search.api_wrapper.results(query, max_results))
+            span.set(results=len(results))
+            return results
+    
+    def _run(self, query: str) -> str:
+        """DuckDuckGo result text for a query, traced as one search"""
+        with tracer.span('search.query', query=query, kind='text') as span:
+            results = cassette.call('search', 'text', {'query': query}, lambda: self.ddg_search.run(query))
+            span.set(result_chars=len(results))
+            return results
+    
     def search_jobs(self, query: str, max_results: int = 5) -> str:
         """Search for job opportunities using multiple strategies"""
         try:
@@ -28,20 +49,56 @@ class SearchTool:
                 f'"{query}" hiring now'
             ]
             
-            all_results = []
+            postings = []
+            failures = []
             
             for job_query in job_queries[:3]:  # Limit to avoid rate limiting
                 try:
-                    results = self.ddg_search.run(job_query)
-                    all_results.append(f"Search: {job_query}\nResults: {results}\n")
+                    results = self._results(job_query, max_results)
+                    postings.extend(self._parse_job_result(result) for result in results)
                     time.sleep(1)  # Rate limiting
                 except Exception as e:
-                    all_results.append(f"Search failed for {job_query}: {str(e)}\n")
+                    failures.append(f"Search failed for {job_query}: {str(e)}\n")
+            
+            # The boards return the same posting several times; keep one copy
+            unique_postings = job_dedup_index.collapse(postings)
             
-            return "\n".join(all_results)
+            # Feed the local store so later lookups can be answered offline
+            try:
+                job_store.upsert_many(unique_postings, source='search')
+            except Exception:
+                pass
+            
+            results = self._format_job_postings(unique_postings, len(postings)) + "\n".join(failures)
+            return SearchFailure(results) if failures else results
             
         except Exception as e:
-            return f"Job search failed: {str(e)}"
+            return SearchFailure(f"Job search failed: {str(e)}")
+    
+    @staticmethod
+    def _parse_job_result(result: Dict[str, str]) -> Dict[str, str]:
+        """Turn a raw search hit into a posting with title, company and description"""
+        # Board titles usually look like "Role - Company - LinkedIn" or "Role | Company"
+        parts = [part.strip() for part in re.split(r'\s+[-|–]\s+', result.get('title', '')) if part.strip()]
+        return {
+            'title': parts[0] if parts else '',
+            'company': parts[1] if len(parts) > 1 else '',
+            'description': result.get('snippet', ''),
+            'link': result.get('link', '')
+        }
+    
+    @staticmethod
+    def _format_job_postings(postings: List[Dict[str, str]], total_hits: int) -> str:
+        """Format unique postings for the agents"""
+        lines = [f"Found {len(postings)} unique postings ({total_hits - len(postings)} duplicates removed)\n"]
+        for posting in postings:
+            title = posting['title'] + (f" - {posting['company']}" if posting['company'] else "")
+            lines.append(f"- {title}")
+            if posting['description']:
+                lines.append(f"  {posting['description']}")
+            if posting['link']:
+                lines.append(f"  Link: {posting['link']}")
+        return "\n".join(lines) + "\n"
     
     def search_learning_resources(self, skill: str) -> str:
         """Search for learning resources for a specific skill"""
@@ -55,37 +112,47 @@ class SearchTool:
             ]
             
             all_results = []
+            failed = False
             
             for query in learning_queries[:3]:  # Limit queries
                 try:
-                    results = self.ddg_search.run(query)
+                    results = self._run(query)
                     all_results.append(f"Learning search: {query}\nResults: {results}\n")
                     time.sleep(1)  # Rate limiting
                 except Exception as e:
                     all_results.append(f"Learning search failed for {query}: {str(e)}\n")
+                    failed = True
             
-            return "\n".join(all_results)
+            return SearchFailure("\n".join(all_results)) if failed else "\n".join(all_results)
             
         except Exception as e:
-            return f"Learning resource search failed: {str(e)}"
+            return SearchFailure(f"Learning resource search failed: {str(e)}")
+    
+    def find_learning_resources(self, skill: str, max_results: int = 5) -> List[Dict[str, str]]:
+        """Return structured course and tutorial hits for a skill (used to grow the skill catalog)"""
+        results = self._results(f"{skill} tutorial course", max_results)
+        return [
+            {'title': result.get('title', ''), 'link': result['link'], 'description': result.get('snippet', '')}
+            for result in results if result.get('link')
+        ]
     
     def search_company_info(self, company: str) -> str:
         """Search for company information and current openings"""
         try:
             company_query = f"{company} careers jobs hiring 2024"
-            results = self.ddg_search.run(company_query)
+            results = self._run(company_query)
             return f"Company search for {company}:\n{results}"
         except Exception as e:
-            return f"Company search failed: {str(e)}"
+            return SearchFailure(f"Company search failed: {str(e)}")
     
     def search_salary_info(self, job_title: str, location: str = "") -> str:
         """Search for salary information"""
         try:
             salary_query = f"{job_title} salary {location} 2024 glassdoor"
-            results = self.ddg_search.run(salary_query)
+            results = self._run(salary_query)
             return f"Salary search for {job_title} {location}:\n{results}"
         except Exception as e:
-            return f"Salary search failed: {str(e)}"
+            return SearchFailure(f"Salary search failed: {str(e)}")
 
 def create_search_tools():
     """Create search tools for CrewAI agents"""
@@ -0,0 +1,261 @@
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+from tools.query_planner import QueryPlanner
+from tools.scraping_utils import DURATION_PATTERN, PRICE_PATTERN
+from utils.cassette import cassette
+from utils.logger import app_logger
+
+# Curated skill -> resource mapping shipped with the app
+SKILL_CATALOG_SEED_PATH = os.getenv("SKILL_CATALOG_SEED_PATH", "data/skill_catalog_seed.json")
+
+# Enriched catalog written by background refreshes
+SKILL_CATALOG_PATH = os.getenv("SKILL_CATALOG_PATH", "data/skill_catalog.json")
+
+# Metadata fields merged from WebScraper.extract_learning_resource_info
+RESOURCE_FIELDS = ('title', 'provider', 'duration', 'rating', 'price', 'description')
+
+
+class SkillCatalog:
+    """
+    Offline catalog mapping canonical skills to learning resources
+
+    Lookups are in-memory dictionary reads keyed by QueryPlanner.canonicalize,
+    so equivalent spellings ("JS", "javascript") share an entry. The curated
+    seed is enriched with page metadata scraped in a background thread, which
+    also discovers resources for skills the catalog did not know yet. Seed
+    entries count as refreshed on the seed's "generated" date (the file's
+    modification time if it has none), so they are enriched once that is
+    refresh_interval old, and a curated field is only replaced by a scraped
+    value that passes validation.
+    """
+
+    REFRESH_INTERVAL = 7 * 86400
+    MAX_RESOURCES = 5
+    DISCOVER_RESULTS = 5
+    MIN_DESCRIPTION_CHARS = 40
+
+    def __init__(self, path: Optional[str] = SKILL_CATALOG_PATH, seed_path: Optional[str] = SKILL_CATALOG_SEED_PATH,
+                 refresh_interval: float = REFRESH_INTERVAL):
+        self.path = path
+        self.seed_path = seed_path
+        self.refresh_interval = refresh_interval
+        self._entries: Dict[str, Dict] = {}
+        self._requested: Dict[str, str] = {}
+        self._curated: Dict[str, Dict[str, str]] = {}
+        self._lock = threading.Lock()
+        self._refresh_thread: Optional[threading.Thread] = None
+        self._loaded = False
+
+    def _ensure_loaded(self):
+        """Load the seed, then overlay the enriched catalog"""
+        if self._loaded:
+            return
+        self._loaded = True
+        for source in (self.seed_path, self.path):
+            if not source or not os.path.exists(source):
+                continue
+            try:
+                with open(source, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue  # A corrupt catalog is rebuilt from the seed
+            skills = data.get('skills', data)
+            for skill, entry in skills.items():
+                if isinstance(entry, list):
+                    entry = {'skill': skill, 'resources': entry}
+                if source == self.seed_path:
+                    # The seed is as fresh as the day it was generated, not a backlog to scrape
+                    entry.setdefault('refreshed', self._seed_time(data, source))
+                    for resource in entry['resources']:
+                        if resource.get('link'):
+                            self._curated[resource['link']] = {field: resource[field] for field in RESOURCE_FIELDS
+                                                               if resource.get(field)}
+                self._entries[QueryPlanner.canonicalize(skill)] = entry
+
+    @staticmethod
+    def _seed_time(data: Dict, path: str) -> float:
+        """When the seed was generated: its "generated" ISO date, else the file's modification time"""
+        try:
+            generated = datetime.fromisoformat(data['generated'])
+            if generated.tzinfo is None:
+                generated = generated.replace(tzinfo=timezone.utc)
+            return generated.timestamp()
+        except (KeyError, TypeError, ValueError):
+            return os.path.getmtime(path)
+
+    def lookup(self, skill: str) -> Optional[List[Dict[str, str]]]:
+        """
+        Resources for a skill, or None if the catalog does not know it
+
+        Unknown skills are remembered so the next refresh discovers resources for them.
+        """
+        key = QueryPlanner.canonicalize(skill)
+        with self._lock:
+            self._ensure_loaded()
+            entry = self._entries.get(key)
+            if entry is None:
+                self._requested.setdefault(key, skill)
+                return None
+            return entry['resources']
+
+    def __contains__(self, skill: str) -> bool:
+        with self._lock:
+            self._ensure_loaded()
+            return QueryPlanner.canonicalize(skill) in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._entries)
+
+    @staticmethod
+    def format_resources(skill: str, resources: List[Dict[str, str]], limit: int = 3) -> str:
+        """Format catalog resources for the report"""
+        lines = [f"\n### {skill} Learning Resources:"]
+        for resource in resources[:limit]:
+            title = resource.get('title') or resource['link']
+            details = ", ".join(resource[field] for field in ('provider', 'duration', 'rating', 'price')
+                                if resource.get(field))
+            lines.append(f"- **{title}**" + (f" ({details})" if details else ""))
+            lines.append(f"  Link: {resource['link']}")
+        return "\n".join(lines) + "\n"
+
+    def _stale_entries(self) -> List[Dict]:
+        cutoff = time.time() - self.refresh_interval
+        return [entry for entry in self._entries.values() if entry.get('refreshed', 0) < cutoff]
+
+    @classmethod
+    def _is_valid(cls, field: str, value: str, curated: Optional[str] = None) -> bool:
+        """Whether a scraped value is plausible enough to store (and to replace a curated one)"""
+        if field in ('title', 'provider'):
+            return curated is None  # Curated titles and providers always win
+        if field == 'duration':
+            match = DURATION_PATTERN.fullmatch(value.strip())
+            return bool(match) and float(match.group(1)) > 0
+        if field == 'rating':
+            return bool(re.fullmatch(r'\d+(?:\.\d+)?', value)) and 0 < float(value) <= 5
+        if field == 'price':
+            if not PRICE_PATTERN.fullmatch(value.strip()):
+                return False
+            # The first price on a page is often an unrelated offer; never flip a curated free/paid status
+            return curated is None or ('free' in curated.lower()) == (value.strip().lower() == 'free')
+        if field == 'description':
+            return len(value) >= cls.MIN_DESCRIPTION_CHARS
+        return True
+
+    def needs_refresh(self) -> bool:
+        """Whether any entry is stale or any unknown skill was requested"""
+        with self._lock:
+            self._ensure_loaded()
+            return bool(self._requested) or bool(self._stale_entries())
+
+    def refresh(self, scraper=None, discover: Optional[Callable[[str], List[Dict[str, str]]]] = None) -> int:
+        """
+        Discover resources for requested skills and re-scrape stale entries
+
+        Args:
+            scraper: WebScraper used to enrich resources (created if omitted)
+            discover: Returns candidate resources ({'title', 'link', ...}) for a skill;
+                defaults to a structured learning search
+
+        Returns:
+            Number of catalog entries updated
+        """
+        if scraper is None:
+            from tools.scraping_utils import WebScraper
+            scraper = WebScraper(store=None)
+        if discover is None:
+            from tools.search_tool import SearchTool
+            discover = SearchTool().find_learning_resources
+
+        with self._lock:
+            self._ensure_loaded()
+            requested = dict(self._requested)
+            self._requested.clear()
+            stale = [dict(entry, resources=[dict(r) for r in entry['resources']]) for entry in self._stale_entries()]
+
+        for key, skill in requested.items():
+            try:
+                resources = discover(skill)[:self.MAX_RESOURCES]
+            except Exception as e:
+                app_logger.warning(f"Learning resource discovery failed for {skill}: {e}")
+                continue
+            if resources:
+                stale.append({'skill': skill, 'resources': resources, 'refreshed': 0})
+
+        # Enrich every resource link in one concurrent batch
+        by_link = {resource['link']: resource for entry in stale for resource in entry['resources']
+                   if resource.get('link')}
+        for link, details in scraper.extract_many(by_link, kind='learning'):
+            if 'error' in details:
+                continue
+            curated = self._curated.get(link, {})
+            for field in RESOURCE_FIELDS:
+                value = details.get(field)
+                if value and self._is_valid(field, value, curated.get(field)):
+                    by_link[link][field] = value
+                elif field in curated:
+                    by_link[link][field] = curated[field]  # Also undoes bad values saved by older refreshes
+
+        now = time.time()
+        with self._lock:
+            for entry in stale:
+                for resource in entry['resources']:
+                    if resource.get('link') in by_link:
+                        resource.update(by_link[resource['link']])
+                entry['refreshed'] = now
+                self._entries[QueryPlanner.canonicalize(entry['skill'])] = entry
+        self.save()
+        app_logger.info(f"Skill catalog refreshed {len(stale)} entries ({len(requested)} newly requested)")
+        return len(stale)
+
+    def refresh_in_background(self, **kwargs) -> bool:
+        """
+        Start a refresh thread unless one is running or nothing is stale
+
+        Returns:
+            True if a refresh was started
+        """
+        # Recorded and replayed runs see the catalog as it is, without background web traffic
+        if cassette.mode != 'off' or not self.needs_refresh():
+            return False
+        with self._lock:
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return False
+
+            def run():
+                try:
+                    self.refresh(**kwargs)
+                except Exception as e:
+                    app_logger.warning(f"Skill catalog refresh failed: {e}")
+
+            self._refresh_thread = threading.Thread(target=run, name='skill-catalog-refresh', daemon=True)
+            self._refresh_thread.start()
+            return True
+
+    def save(self):
+        """Persist the enriched catalog atomically"""
+        if not self.path:
+            return
+        with self._lock:
+            data = {'version': 1, 'skills': {entry['skill']: entry for entry in self._entries.values()}}
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            temp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=1)
+            os.replace(temp_path, self.path)
+        except OSError:
+            pass  # Persistence is best effort
+
+
+# Global catalog shared by SkillRecommenderAgent
+skill_catalog = SkillCatalog()
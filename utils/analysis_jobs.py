@@ -0,0 +1,334 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from utils.llm_scheduler import INTERACTIVE, RequestCancelled, llm_scheduler
+from utils.logger import app_logger
+from utils.metrics import metrics
+from utils.result_store import AnalysisResultStore, result_store
+from utils.structured_output import result_from_record, result_to_record
+
+# Default location of the analysis job database
+ANALYSIS_JOBS_PATH = os.getenv("ANALYSIS_JOBS_PATH", "data/analysis_jobs.db")
+
+# Analyses run concurrently in the background (LLM calls are still capped by the scheduler)
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "2"))
+
+# Job states
+QUEUED = 'queued'
+RUNNING = 'running'
+PARTIAL = 'partial'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+
+@dataclass
+class AnalysisJob:
+    """Snapshot of a background analysis"""
+    job_id: str
+    state: str
+    owner: str = ''
+    results: Dict[str, Any] = field(default_factory=dict)
+    current_step: str = ''
+    error: str = ''
+    created: float = 0.0
+    updated: float = 0.0
+    steps_total: int = 4
+
+    @property
+    def finished(self) -> bool:
+        return self.state in FINISHED_STATES
+
+    @property
+    def progress(self) -> float:
+        """Fraction of agent steps completed"""
+        return len(self.results) / self.steps_total if self.steps_total else 0.0
+
+
+class AnalysisJobManager:
+    """
+    Runs full analyses as background jobs that outlive the Streamlit script
+
+    Each job moves through queued -> running -> partial (some agents done)
+    -> done, or ends failed or cancelled. State and per-agent results are
+    written to SQLite after every step, so a page refresh can reconnect to a
+    job by id and unfinished jobs resume from their last completed step
+    after a restart. Finished steps are recorded in the result store's
+    history, and steps the pipeline's step cache already answers (same CV
+    sections, job description, models and prompts) are not run again. Jobs
+    record the owner (browser session or API client) that submitted them so
+    an owner only lists its own, and the owner is the scheduler session of
+    the job's LLM calls so the queue is shared fairly between owners.
+    """
+
+    def __init__(self, path: str = ANALYSIS_JOBS_PATH, max_workers: int = ANALYSIS_WORKERS,
+                 pipeline_factory: Optional[Callable[[], Any]] = None, retention_days: float = 7,
+                 store: Optional[AnalysisResultStore] = result_store):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.max_workers = max_workers
+        self.retention_days = retention_days
+        self._pipeline_factory = pipeline_factory
+        self.store = store
+        self._local = threading.local()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._start_lock = threading.Lock()
+        # job id -> queue position of its waiting LLM call, for jobs running in this process
+        self._positions: Dict[str, int] = {}
+        self._create_schema()
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread; SQLite connections are not shareable"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+    def _create_schema(self):
+        connection = self._connection()
+        with connection:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS analysis_jobs (
+                    job_id TEXT PRIMARY KEY,
+                    state TEXT NOT NULL,
+                    priority INTEGER,
+                    cv_text TEXT,
+                    job_description TEXT,
+                    results TEXT,
+                    current_step TEXT,
+                    error TEXT,
+                    created REAL,
+                    updated REAL,
+                    result_key TEXT,
+                    cv_raw TEXT,
+                    owner TEXT
+                )
+            """)
+            # Databases from older versions lack the newer columns
+            columns = {row['name'] for row in connection.execute("PRAGMA table_info(analysis_jobs)")}
+            for column in ('result_key', 'cv_raw', 'owner'):
+                if column not in columns:
+                    connection.execute(f"ALTER TABLE analysis_jobs ADD COLUMN {column} TEXT")
+            connection.execute("CREATE INDEX IF NOT EXISTS analysis_jobs_created ON analysis_jobs(created)")
+
+    def _pipeline(self):
+        if self._pipeline_factory is None:
+            from agents.pipeline import get_pipeline
+            self._pipeline_factory = get_pipeline
+        return self._pipeline_factory()
+
+    def _ensure_started(self):
+        """Start the workers and resume jobs a previous process left unfinished"""
+        with self._start_lock:
+            if self._executor is not None:
+                return
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='analysis-job')
+            rows = self._connection().execute(
+                "SELECT job_id FROM analysis_jobs WHERE state IN (?, ?, ?) ORDER BY created",
+                (QUEUED, RUNNING, PARTIAL)
+            ).fetchall()
+        for row in rows:
+            app_logger.info(f"Resuming analysis job {row['job_id']}")
+            self._executor.submit(self._run, row['job_id'])
+        self.prune()
+
+    def _update(self, job_id: str, **values):
+        """Update a job's columns; a cancelled job only accepts its final cleanup"""
+        values['updated'] = time.time()
+        assignments = ', '.join(f"{column} = ?" for column in values)
+        connection = self._connection()
+        with connection:
+            connection.execute(f"UPDATE analysis_jobs SET {assignments} WHERE job_id = ? AND state != ?",
+                               (*values.values(), job_id, CANCELLED))
+
+    def submit(self, cv_text: str, job_description: str, priority: int = INTERACTIVE,
+               results: Optional[Dict[str, Any]] = None, cv_raw: Optional[str] = None,
+               owner: Optional[str] = None) -> str:
+        """
+        Queue a full analysis
+
+        Args:
+            cv_text: The candidate's CV text
+            job_description: The target job description
+            priority: Scheduler lane for the job's LLM calls
+            results: Results already known for some steps (they are not rerun)
+            cv_raw: The CV as entered (with line breaks), so unchanged sections reuse cached work
+            owner: Browser session or API client that submits the job; recent() and the result store
+                list it only for this owner
+
+        Returns:
+            The job id; a job fully answered from the step cache is done at once
+        """
+        self._ensure_started()
+        job_id = uuid.uuid4().hex[:12]
+        now = time.time()
+        results = dict(results or {})
+        result_key = None
+        state = QUEUED
+        if self.store is not None:
+            pipeline = self._pipeline()
+            result_key = self.store.key(cv_text, job_description, pipeline.model_key, pipeline.prompt_version)
+            # Registers the history entry if it is new, and its owner either way
+            self.store.create(result_key, cv_text, job_description, pipeline.model_key, pipeline.prompt_version,
+                              owner=owner)
+            for name, (value, step_metrics) in pipeline.cached_results(cv_text, job_description, self.store,
+                                                                        cv_raw=cv_raw).items():
+                if name not in results:
+                    results[name] = value
+                    self.store.save_step(result_key, name, value, step_metrics)
+            if {step.name for step in pipeline.steps} <= results.keys():
+                state = DONE
+            metrics.cache_requests.inc(cache='result_store', result='hit' if state == DONE else 'miss')
+
+        records = json.dumps({name: result_to_record(value) for name, value in results.items()})
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                "INSERT INTO analysis_jobs (job_id, state, priority, cv_text, job_description, results, "
+                "current_step, error, created, updated, result_key, cv_raw, owner) "
+                "VALUES (?, ?, ?, ?, ?, ?, '', '', ?, ?, ?, ?, ?)",
+                (job_id, state, priority, cv_text, job_description, records, now, now, result_key, cv_raw, owner)
+            )
+        if state == DONE:
+            app_logger.info(f"Analysis job {job_id} answered from the step cache")
+        else:
+            self._executor.submit(self._run, job_id)
+            app_logger.info(f"Analysis job {job_id} queued")
+        return job_id
+
+    def _run(self, job_id: str):
+        """Run the remaining steps of a job, persisting after each one"""
+        with app_logger.context(request_id=job_id):
+            self._run_job(job_id)
+
+    def _run_job(self, job_id: str):
+        row = self._connection().execute("SELECT * FROM analysis_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None or row['state'] in FINISHED_STATES:
+            return
+
+        records = json.loads(row['results'] or '{}')
+        done = {name: result_from_record(record) for name, record in records.items()}
+        self._update(job_id, state=PARTIAL if done else RUNNING)
+        started = time.time()
+
+        def on_step(step):
+            if self._state(job_id) == CANCELLED:
+                raise RequestCancelled(f"Analysis job {job_id} was cancelled")
+            self._update(job_id, current_step=step.name)
+
+        def on_result(name: str, value: Any, metrics: Dict[str, Any]):
+            records[name] = result_to_record(value)
+            self._update(job_id, state=PARTIAL, results=json.dumps(records))
+            # Failed steps are shown but not stored, so they are retried next time
+            if self.store is not None and row['result_key'] and not metrics.get('error'):
+                try:
+                    self.store.save_step(row['result_key'], name, value, metrics)
+                except sqlite3.Error as e:
+                    app_logger.warning(f"Could not store result of step '{name}': {e}")
+
+        def on_wait(position: int):
+            self._positions[job_id] = position
+
+        try:
+            # Jobs of one owner share a scheduler session, so owners (not jobs) take turns in the queue;
+            # a cancelled job's waiting call is dropped without touching the owner's other jobs
+            with llm_scheduler.context(row['owner'] or f"job:{job_id}", row['priority'] or INTERACTIVE,
+                                       on_wait=on_wait, is_alive=lambda: self._state(job_id) != CANCELLED):
+                self._pipeline().run(row['cv_text'], row['job_description'], done=done,
+                                     on_step=on_step, on_result=on_result,
+                                     cv_raw=row['cv_raw'], cache=self.store)
+            self._update(job_id, state=DONE, current_step='')
+            app_logger.log_crew_execution(len(records), time.time() - started)
+        except RequestCancelled:
+            app_logger.info(f"Analysis job {job_id} cancelled")
+        except Exception as e:
+            app_logger.error(f"Analysis job {job_id} failed: {e}")
+            self._update(job_id, state=FAILED, error=str(e), current_step='')
+        finally:
+            self._positions.pop(job_id, None)
+
+    def _state(self, job_id: str) -> Optional[str]:
+        row = self._connection().execute("SELECT state FROM analysis_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return row['state'] if row else None
+
+    def get(self, job_id: str) -> Optional[AnalysisJob]:
+        """Current state and (partial) results of a job"""
+        self._ensure_started()
+        row = self._connection().execute("SELECT * FROM analysis_jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        records = json.loads(row['results'] or '{}')
+        return AnalysisJob(
+            job_id=row['job_id'],
+            state=row['state'],
+            owner=row['owner'] or '',
+            results={name: result_from_record(record) for name, record in records.items()},
+            current_step=row['current_step'] or '',
+            error=row['error'] or '',
+            created=row['created'],
+            updated=row['updated']
+        )
+
+    def recent(self, limit: int = 10, owner: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Latest jobs (id, state, timestamps) for reconnecting; only the owner's when owner is given"""
+        if owner is None:
+            rows = self._connection().execute(
+                "SELECT job_id, state, created, updated FROM analysis_jobs ORDER BY created DESC LIMIT ?", (limit,)
+            ).fetchall()
+        else:
+            rows = self._connection().execute(
+                "SELECT job_id, state, created, updated FROM analysis_jobs WHERE owner = ? "
+                "ORDER BY created DESC LIMIT ?", (owner, limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def queue_position(self, job_id: str) -> int:
+        """Position of the job's next LLM call in the shared queue (0 if not waiting)"""
+        return self._positions.get(job_id, 0)
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job; no further steps start and the running step's result is dropped"""
+        state = self._state(job_id)
+        if state is None or state in FINISHED_STATES:
+            return False
+        connection = self._connection()
+        with connection:
+            connection.execute("UPDATE analysis_jobs SET state = ?, current_step = '', updated = ? WHERE job_id = ?",
+                               (CANCELLED, time.time(), job_id))
+        # The job's waiting LLM call notices within LLMScheduler.POLL_INTERVAL
+        return True
+
+    def prune(self) -> int:
+        """Delete finished jobs older than the retention period"""
+        connection = self._connection()
+        with connection:
+            cursor = connection.execute(
+                f"DELETE FROM analysis_jobs WHERE state IN ({', '.join('?' * len(FINISHED_STATES))}) AND created < ?",
+                (*FINISHED_STATES, time.time() - self.retention_days * 86400)
+            )
+        return cursor.rowcount
+
+    def get_stats(self) -> Dict[str, int]:
+        """Number of jobs in each state"""
+        rows = self._connection().execute("SELECT state, COUNT(*) FROM analysis_jobs GROUP BY state").fetchall()
+        stats = {state: 0 for state in (QUEUED, RUNNING, PARTIAL, DONE, FAILED, CANCELLED)}
+        stats.update({state: count for state, count in rows})
+        return stats
+
+
+# Global job manager shared by all sessions
+analysis_jobs = AnalysisJobManager()
+metrics.register_collector('analysis_jobs', analysis_jobs.get_stats)
@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from utils.metrics import metrics
+
+# off, record (call live services and save every exchange) or replay (serve saved exchanges)
+CASSETTE_MODE = os.getenv("CASSETTE_MODE", "off").lower()
+
+# Cassette file, one JSON exchange per line
+CASSETTE_PATH = os.getenv("CASSETTE_PATH", "data/cassettes/default.jsonl")
+
+# Replay speed relative to the recording: 1 waits as long as the live call took, 10 is ten times faster, 0 is instant
+CASSETTE_SPEED = float(os.getenv("CASSETTE_SPEED", "1"))
+
+# Fail replayed requests that were not recorded instead of serving the next recording for the same scope
+CASSETTE_STRICT = os.getenv("CASSETTE_STRICT", "false").lower() == "true"
+
+
+class CassetteMiss(Exception):
+    """A replayed request has no recording"""
+
+
+def request_key(kind: str, scope: str, request: Dict[str, Any]) -> str:
+    """Key of an exchange: its kind, scope and request fields"""
+    payload = json.dumps([kind, scope, request], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+
+class Cassette:
+    """
+    Record and replay of LLM, search and embedding traffic
+
+    In record mode every call made through `call` goes to the live service
+    and the request, response and duration are appended to the cassette.
+    In replay mode the saved response is returned after the recorded
+    duration scaled by the speed, without touching Ollama or the web, so
+    performance runs are reproducible. A request that was not recorded
+    (e.g. after a prompt or cleaner change) gets the next recording of the
+    same scope (the same agent or search method), so timings stay
+    comparable; such approximate matches are counted, and strict mode
+    raises CassetteMiss instead.
+    """
+
+    MODES = ('off', 'record', 'replay')
+
+    def __init__(self, path: str = CASSETTE_PATH, mode: str = CASSETTE_MODE, speed: float = CASSETTE_SPEED,
+                 strict: bool = CASSETTE_STRICT):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown cassette mode '{mode}', expected one of {self.MODES}")
+        self.path = path
+        self.mode = mode
+        self.speed = speed
+        self.strict = strict
+        self.stats = {'recorded': 0, 'replayed': 0, 'approximate': 0, 'missed': 0}
+        self._lock = threading.Lock()
+        self._truncated = False
+        self._by_key: Optional[Dict[str, Deque[Dict[str, Any]]]] = None
+        self._by_scope: Dict[str, List[Dict[str, Any]]] = {}
+        self._scope_position: Dict[str, int] = {}
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == 'replay'
+
+    def call(self, kind: str, scope: str, request: Dict[str, Any], live: Callable[[], Any]) -> Any:
+        """
+        Run a live call, recording or replaying it according to the mode
+
+        Args:
+            kind: Traffic type ('llm', 'search', 'embedding')
+            scope: Who makes the call (agent, search method or model)
+            request: Fields that identify the request; must be JSON-serializable
+            live: Makes the real call; its result must be JSON-serializable
+
+        Returns:
+            The live or recorded response
+        """
+        if self.mode == 'off':
+            return live()
+        if self.mode == 'replay':
+            return self._replay(kind, scope, request)
+
+        started = time.perf_counter()
+        response = live()
+        self._append({'kind': kind, 'scope': scope, 'key': request_key(kind, scope, request), 'request': request,
+                      'response': response, 'seconds': round(time.perf_counter() - started, 4),
+                      'recorded_at': time.time()})
+        return response
+
+    def _append(self, entry: Dict[str, Any]):
+        line = json.dumps(entry, ensure_ascii=False, default=str) + '\n'
+        with self._lock:
+            try:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                # A recording session starts a fresh cassette
+                with open(self.path, 'a' if self._truncated else 'w', encoding='utf-8') as f:
+                    f.write(line)
+                self._truncated = True
+                self.stats['recorded'] += 1
+            except OSError:
+                pass  # Recording is best effort; the live response is still returned
+
+    def _load(self):
+        """Index the cassette by request key and by scope, in recorded order"""
+        self._by_key = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+        except OSError:
+            lines = []
+        for line in lines:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # A partly written last line
+            self._by_key.setdefault(entry['key'], deque()).append(entry)
+            self._by_scope.setdefault(f"{entry['kind']}:{entry['scope']}", []).append(entry)
+
+    def _replay(self, kind: str, scope: str, request: Dict[str, Any]) -> Any:
+        key = request_key(kind, scope, request)
+        with self._lock:
+            if self._by_key is None:
+                self._load()
+            recordings = self._by_key.get(key)
+            if recordings:
+                # Identical requests get their recordings in order; the last one repeats
+                entry = recordings.popleft() if len(recordings) > 1 else recordings[0]
+                self.stats['replayed'] += 1
+            else:
+                candidates = self._by_scope.get(f"{kind}:{scope}")
+                if self.strict or not candidates:
+                    self.stats['missed'] += 1
+                    raise CassetteMiss(f"No recorded {kind} request for '{scope}' in {self.path}")
+                position = self._scope_position.get(f"{kind}:{scope}", 0)
+                self._scope_position[f"{kind}:{scope}"] = position + 1
+                entry = candidates[position % len(candidates)]
+                self.stats['approximate'] += 1
+
+        if self.speed > 0:
+            time.sleep(entry.get('seconds', 0) / self.speed)
+        return entry['response']
+
+    def get_stats(self) -> Dict[str, int]:
+        """Exchanges recorded, replayed exactly, replayed approximately and missed"""
+        with self._lock:
+            return dict(self.stats)
+
+
+# Global cassette shared by the LLM client, search tool and embedder
+cassette = Cassette()
+metrics.register_collector('cassette', cassette.get_stats)
@@ -0,0 +1,140 @@
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Iterator, List, Match, Optional, Pattern, Tuple
+
+from utils.cv_sections import HEADER_SECTION, SECTION_ALIASES, CVSection, detect_heading, section_hash
+from utils.tracing import tracer
+
+# Lines this long without a break are likely flattened text (e.g. cleaned or PDF-extracted)
+FLATTENED_LINE_LENGTH = 300
+
+# Upper-case known headings inside flattened text ("... 2021 EDUCATION Bachelor of ...")
+_INLINE_HEADING = re.compile(
+    r'(?<![\w&])(' + '|'.join(sorted((re.escape(alias.upper()) for aliases in SECTION_ALIASES.values()
+                                      for alias in aliases), key=len, reverse=True)) + r')(?=[\s:]|$)'
+)
+
+_BULLET = re.compile(r'^\s*(?:[•·‣▪◦*\-–]|\d+[.)])\s+')
+
+
+@dataclass(frozen=True)
+class CVLine:
+    """One non-blank line of a CV with its position in the text"""
+    text: str
+    start: int
+    end: int
+    section: str
+    is_heading: bool = False
+    is_bullet: bool = False
+
+
+@dataclass
+class CVDocument:
+    """A CV tokenized once into lines and sections"""
+    text: str
+    lines: List[CVLine] = field(default_factory=list)
+    sections: List[CVSection] = field(default_factory=list)
+
+    def section_names(self) -> List[str]:
+        return [section.name for section in self.sections]
+
+    def has_section(self, name: str) -> bool:
+        return any(self._in_section(section.name, (name,)) for section in self.sections)
+
+    def search(self, pattern: Pattern, *names: str) -> Optional[Match]:
+        """First match of pattern within the named sections, else anywhere in the text (one scan)"""
+        spans = [(section.start, section.end) for section in self.sections if self._in_section(section.name, names)]
+        first = None
+        for match in pattern.finditer(self.text):
+            if any(start <= match.start() < end for start, end in spans):
+                return match
+            first = first or match
+        return first
+
+    def section_lines(self, *names: str) -> List[CVLine]:
+        """Content lines (no headings) of the named sections, e.g. 'education' or 'experience'"""
+        return [line for line in self.lines if not line.is_heading and self._in_section(line.section, names)]
+
+    @staticmethod
+    def _in_section(section: str, names: Tuple[str, ...]) -> bool:
+        # Repeated sections are named "experience_2", "experience_3", ...
+        for name in names:
+            if section == name or (section.startswith(name) and section[len(name):len(name) + 1] == '_'
+                                   and section[len(name) + 1:].isdigit()):
+                return True
+        return False
+
+
+def _line_spans(text: str) -> Iterator[Tuple[int, int]]:
+    """(start, end) of each line, splitting flattened lines at inline headings"""
+    position = 0
+    for raw_line in text.splitlines(keepends=True):
+        start, end = position, position + len(raw_line.rstrip('\r\n'))
+        position += len(raw_line)
+        if end - start < FLATTENED_LINE_LENGTH:
+            yield start, end
+            continue
+        cut = start
+        for match in _INLINE_HEADING.finditer(text, start, end):
+            yield cut, match.start()
+            yield match.start(), match.end()
+            cut = match.end()
+        yield cut, end
+
+
+@lru_cache(maxsize=64)
+@tracer.traced('cv.parse')
+def parse_cv(text: str) -> CVDocument:
+    """
+    Tokenize a CV once into lines and sections
+
+    Every line is classified (heading, bullet, text) and assigned to its
+    section in a single pass; sections carry the same names and hashes as
+    the incremental re-analysis uses. Results are memoized per text, so the
+    extractors share one parse. Flattened text without line breaks is split
+    at upper-case section headings.
+    """
+    document = CVDocument(text=text or '')
+    seen = {}
+    name, heading, body, body_start = HEADER_SECTION, '', [], 0
+
+    def close(end: int):
+        section_text = '\n'.join(body).strip()
+        if section_text or heading:
+            count = seen.get(name, 0)
+            seen[name] = count + 1
+            unique = name if count == 0 else f"{name}_{count + 1}"
+            document.sections.append(CVSection(unique, heading, section_text,
+                                               section_hash(f"{heading}\n{section_text}"), body_start, end))
+            return unique
+        return None
+
+    pending: List[CVLine] = []
+    for start, end in _line_spans(document.text):
+        raw_line = document.text[start:end]
+        stripped = raw_line.strip()
+        # Unknown all-caps lines only start sections after the first real heading; before it they are
+        # the header's name and title lines
+        detected = detect_heading(raw_line, known_only=name == HEADER_SECTION) if stripped else None
+        if detected:
+            _assign(pending, close(start), document)
+            pending = []
+            name, heading, body, body_start = detected, stripped, [], start
+            pending.append(CVLine(stripped, start, end, detected, is_heading=True))
+            continue
+        body.append(raw_line)
+        if stripped:
+            offset = len(raw_line) - len(raw_line.lstrip())
+            pending.append(CVLine(stripped, start + offset, start + offset + len(stripped), name,
+                                  is_bullet=bool(_BULLET.match(raw_line))))
+    _assign(pending, close(len(document.text)), document)
+    return document
+
+
+def _assign(lines: List[CVLine], section_name, document: CVDocument):
+    """Add a section's lines under the section's final (unique) name"""
+    for line in lines:
+        if section_name and line.section != section_name:
+            line = CVLine(line.text, line.start, line.end, section_name, line.is_heading, line.is_bullet)
+        document.lines.append(line)
@@ -0,0 +1,107 @@
+import hashlib
+import re
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+
+# Canonical section names and the headings that introduce them
+SECTION_ALIASES = {
+    'contact': ['contact', 'contact information', 'contact details', 'personal information', 'personal details'],
+    'summary': ['summary', 'professional summary', 'profile', 'professional profile', 'about me', 'objective',
+                'career objective', 'personal statement'],
+    'experience': ['experience', 'work experience', 'professional experience', 'employment history',
+                   'work history', 'career history', 'employment'],
+    'education': ['education', 'academic background', 'qualifications', 'education and training'],
+    'skills': ['skills', 'technical skills', 'core competencies', 'key skills', 'competencies', 'technologies',
+               'skills and competencies'],
+    'projects': ['projects', 'key projects', 'personal projects', 'selected projects'],
+    'certifications': ['certifications', 'certificates', 'licenses', 'licenses and certifications',
+                       'courses and certifications'],
+    'languages': ['languages'],
+    'awards': ['awards', 'honors', 'honours', 'achievements', 'awards and achievements'],
+    'publications': ['publications'],
+    'volunteering': ['volunteer', 'volunteering', 'volunteer experience'],
+    'interests': ['interests', 'hobbies', 'hobbies and interests'],
+    'references': ['references'],
+}
+
+_HEADINGS = {alias: name for name, aliases in SECTION_ALIASES.items() for alias in aliases}
+
+# The lines before the first heading (name, title, contact details)
+HEADER_SECTION = 'header'
+
+
+@dataclass(frozen=True)
+class CVSection:
+    """One section of a CV and the hash of its normalized text"""
+    name: str
+    heading: str
+    text: str
+    hash: str
+    start: int = 0
+    end: int = 0
+
+
+def section_hash(text: str) -> str:
+    """Hash of a section that ignores whitespace changes (a change of case is an edit)"""
+    normalized = re.sub(r'\s+', ' ', text).strip()
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()[:16]
+
+
+def detect_heading(line: str, known_only: bool = False) -> Optional[str]:
+    """
+    Canonical section name if a line is a section heading
+
+    Known headings ("Work Experience:", "## SKILLS") map to their canonical
+    name; other short all-caps lines become headings named after themselves
+    unless known_only is set (e.g. in a CV's header, where "JOHN DOE" is a
+    name rather than a section).
+    """
+    stripped = line.strip().strip('#*=_-:| ').strip()
+    if not stripped or len(stripped) > 40:
+        return None
+    key = re.sub(r'\s+', ' ', stripped.lower().replace('&', 'and'))
+    if key in _HEADINGS:
+        return _HEADINGS[key]
+    letters = [char for char in stripped if char.isalpha()]
+    if not known_only and len(stripped.split()) <= 4 and len(letters) >= 4 and all(char.isupper() for char in letters):
+        return re.sub(r'[^a-z0-9]+', '_', key).strip('_')
+    return None
+
+
+def cv_fingerprint(sections: Iterable[CVSection]) -> str:
+    """Hash of the whole CV built from its section hashes"""
+    return hashlib.sha256('|'.join(section.hash for section in sections).encode('utf-8')).hexdigest()[:16]
+
+
+def match_section(label: str, passage: str, sections: List[CVSection]) -> Optional[CVSection]:
+    """
+    Section a piece of agent output refers to
+
+    Args:
+        label: Section label the agent gave (e.g. "Work Experience")
+        passage: Quoted CV text, if any
+        sections: The CV's sections
+
+    Returns:
+        The section matched by label, then by containing the passage, then
+        by word overlap; None if the CV has no sections
+    """
+    if not sections:
+        return None
+    lowered = (label or '').lower().replace('&', 'and')
+    canonical = detect_heading(label) or next(
+        (_HEADINGS[alias] for alias in sorted(_HEADINGS, key=len, reverse=True) if re.search(rf'\b{alias}\b', lowered)),
+        re.sub(r'[^a-z0-9]+', '_', lowered).strip('_')
+    )
+    for section in sections:
+        if canonical and (section.name == canonical or section.name.startswith(f"{canonical}_")):
+            return section
+
+    normalized = re.sub(r'\s+', ' ', passage or '').strip().lower()
+    if normalized:
+        for section in sections:
+            if normalized in re.sub(r'\s+', ' ', section.text).lower():
+                return section
+
+    words = set(re.findall(r'\w+', f"{label} {passage}".lower()))
+    return max(sections, key=lambda section: len(words & set(re.findall(r'\w+', section.text.lower()))))
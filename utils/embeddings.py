@@ -0,0 +1,102 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+import numpy as np
+import requests
+
+from config.ollama_config import OllamaConfig
+from utils.cassette import cassette
+from utils.llm_scheduler import llm_scheduler
+
+
+class OllamaEmbedder:
+    """Text embeddings from the local Ollama embeddings endpoint"""
+
+    def __init__(self, model: str = OllamaConfig.EMBEDDING_MODEL, base_url: str = OllamaConfig.BASE_URL,
+                 timeout: float = 30, cache_size: int = 1024):
+        self.model = model
+        self.url = f"{base_url.rstrip('/')}/api/embeddings"
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _embed_one(self, text: str) -> np.ndarray:
+        key = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        vector = np.asarray(cassette.call('embedding', self.model, {'text': text}, lambda: self._request(text)),
+                            dtype=np.float32)
+
+        with self._lock:
+            self._cache[key] = vector
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return vector
+
+    def _request(self, text: str) -> List[float]:
+        # Embeddings run on the same Ollama server, so they wait for a slot like generations do
+        with llm_scheduler.slot():
+            response = self.session.post(self.url, json={'model': self.model, 'prompt': text}, timeout=self.timeout)
+            response.raise_for_status()
+        return response.json()['embedding']
+
+    def __call__(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            float32 matrix with one row per text
+        """
+        return np.vstack([self._embed_one(text) for text in texts]).astype(np.float32)
+
+
+class HashingEmbedder:
+    """
+    Dependency-free embedder based on hashed word and bigram counts
+
+    Useful offline or when no embedding model is pulled; captures lexical
+    rather than semantic similarity.
+    """
+
+    def __init__(self, dimensions: int = 512):
+        self.dimensions = dimensions
+
+    def __call__(self, texts: List[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = re.findall(r'[a-z0-9+#]+', text.lower())
+            for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+                digest = hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest()
+                bucket = int.from_bytes(digest[:4], 'big') % self.dimensions
+                matrix[row, bucket] += 1.0 if digest[4] & 1 else -1.0
+        return matrix
+
+
+# An embedder is any callable mapping a list of texts to a float32 matrix
+Embedder = Callable[[List[str]], np.ndarray]
+
+
+def get_default_embedder(fallback: bool = True) -> Optional[Embedder]:
+    """
+    Return the Ollama embedder, or the hashing embedder if Ollama can't embed
+
+    Args:
+        fallback: Whether to fall back to HashingEmbedder instead of returning None
+    """
+    embedder = OllamaEmbedder()
+    try:
+        embedder(["ping"])
+        return embedder
+    except Exception:
+        return HashingEmbedder() if fallback else None
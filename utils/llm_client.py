@@ -0,0 +1,261 @@
+import contextvars
+import json
+import math
+import os
+import threading
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Deque, Dict, Iterator, Optional, Tuple
+
+from utils.cassette import cassette
+from utils.llm_scheduler import LLMScheduler, llm_scheduler
+from utils.model_router import ModelRouter, model_router
+from utils.tracing import tracer
+
+# Default location of the persisted output-length samples
+GENERATION_STATS_PATH = os.getenv("GENERATION_STATS_PATH", "data/generation_stats.json")
+
+
+class OutputLengthStats:
+    """
+    Rolling output-length samples per agent, used to size token budgets
+
+    Each agent's budget is the 95th percentile of its recent output lengths
+    plus headroom, clamped to the profile's floor and the model's ceiling.
+    When too many recent generations hit the budget, it is raised instead.
+    """
+
+    WINDOW = 200
+    MIN_SAMPLES = 10
+    PERCENTILE = 0.95
+    HEADROOM = 1.25
+    MAX_TRUNCATION_RATE = 0.1
+    SAVE_EVERY = 10
+
+    def __init__(self, path: Optional[str] = GENERATION_STATS_PATH):
+        self.path = path
+        self._samples: Dict[str, Deque[Tuple[int, bool]]] = {}
+        self._lock = threading.Lock()
+        self._unsaved = 0
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            for key, samples in data.get('samples', {}).items():
+                self._samples[key] = deque(((int(tokens), bool(truncated)) for tokens, truncated in samples),
+                                           maxlen=self.WINDOW)
+        except (OSError, ValueError, TypeError):
+            pass  # Start over from the profile defaults
+
+    def record(self, key: str, tokens: int, truncated: bool):
+        """Record one generation's output length"""
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.WINDOW)).append((int(tokens), bool(truncated)))
+            self._unsaved += 1
+            should_save = self._unsaved >= self.SAVE_EVERY
+        if should_save:
+            self.save()
+
+    def budget(self, key: str, default: int, floor: int, ceiling: int) -> int:
+        """
+        Token budget for the next generation
+
+        Args:
+            key: Agent (and output mode) the budget is for
+            default: Budget used until enough samples exist
+            floor: Smallest budget ever returned
+            ceiling: Largest budget ever returned (the model's limit)
+        """
+        with self._lock:
+            samples = list(self._samples.get(key, ()))
+        if len(samples) < self.MIN_SAMPLES:
+            return default
+
+        lengths = sorted(tokens for tokens, _ in samples)
+        percentile = lengths[min(len(lengths) - 1, int(math.ceil(self.PERCENTILE * len(lengths))) - 1)]
+        budget = int(percentile * self.HEADROOM)
+
+        # Outputs that hit the budget were cut short; grow past the longest one
+        truncation_rate = sum(1 for _, truncated in samples if truncated) / len(samples)
+        if truncation_rate > self.MAX_TRUNCATION_RATE:
+            budget = max(budget, int(lengths[-1] * 1.5))
+        return max(floor, min(ceiling, budget))
+
+    def median(self, key: str, default: int) -> int:
+        """Median recent output length, or default without samples"""
+        with self._lock:
+            lengths = sorted(tokens for tokens, _ in self._samples.get(key, ()))
+        return lengths[len(lengths) // 2] if lengths else default
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Per-key sample count, p50/p95 output tokens and truncation rate"""
+        with self._lock:
+            items = {key: list(samples) for key, samples in self._samples.items()}
+        summary = {}
+        for key, samples in items.items():
+            if not samples:
+                continue
+            lengths = sorted(tokens for tokens, _ in samples)
+            summary[key] = {
+                'samples': len(samples),
+                'p50_tokens': lengths[len(lengths) // 2],
+                'p95_tokens': lengths[min(len(lengths) - 1, int(math.ceil(0.95 * len(lengths))) - 1)],
+                'truncation_rate': sum(1 for _, truncated in samples if truncated) / len(samples)
+            }
+        return summary
+
+    def save(self):
+        """Persist the samples atomically"""
+        if not self.path:
+            return
+        with self._lock:
+            data = {'samples': {key: list(samples) for key, samples in self._samples.items()}}
+            self._unsaved = 0
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            temp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(temp_path, self.path)
+        except OSError:
+            pass  # Persistence is best effort
+
+
+# Global samples shared by all agents
+generation_stats = OutputLengthStats()
+
+# Token usage of the LLM calls made in the current context; set by track_usage
+_usage: contextvars.ContextVar = contextvars.ContextVar('llm_usage', default=None)
+
+
+@contextmanager
+def track_usage() -> Iterator[Dict[str, Any]]:
+    """Count the calls, tokens and models of ManagedLLM calls made in this block"""
+    usage = {'calls': 0, 'prompt_tokens': 0, 'output_tokens': 0, 'models': []}
+    token = _usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _usage.reset(token)
+
+
+def ollama_timings(info: Dict[str, Any]) -> Dict[str, float]:
+    """
+    Time to first token and generation throughput from Ollama's response
+
+    Ollama reports nanosecond durations for model loading, prompt
+    evaluation and generation; the first token follows loading and prompt
+    evaluation. Empty if the response has no timings.
+    """
+    timings = {}
+    if info.get('prompt_eval_duration') is not None:
+        timings['ttft_seconds'] = round(((info.get('load_duration') or 0) + info['prompt_eval_duration']) / 1e9, 4)
+    if info.get('eval_duration') and info.get('eval_count'):
+        timings['tokens_per_second'] = round(info['eval_count'] / (info['eval_duration'] / 1e9), 2)
+    if info.get('total_duration'):
+        timings['ollama_seconds'] = round(info['total_duration'] / 1e9, 4)
+    return timings
+
+
+class ManagedLLM:
+    """
+    LLM handle for one agent that applies its generation profile
+
+    Every call gets a token budget sized from the agent's recent output
+    lengths and a model picked by the router, and waits for a slot from the
+    process-wide scheduler before reaching Ollama. The actual output length
+    (Ollama's eval_count) is recorded afterwards. Underlying clients are
+    created per (model, budget) by the factory.
+    """
+
+    BUDGET_STEP = 64
+
+    def __init__(self, agent_name: str, factory: Callable[[int, Optional[str]], Any], profile: Dict[str, Any],
+                 ceiling: int, stats_key: Optional[str] = None, stats: OutputLengthStats = generation_stats,
+                 router: Optional[ModelRouter] = model_router, scheduler: LLMScheduler = llm_scheduler):
+        """
+        Args:
+            agent_name: Agent the profile belongs to
+            factory: Creates an LLM client for a given num_predict and model (None for the default)
+            profile: Generation profile from OllamaConfig.get_agent_profile
+            ceiling: Largest token budget the model allows
+            stats_key: Key for output-length samples (defaults to agent_name)
+            stats: Output-length samples to tune from
+            router: Picks the model per request (None always uses the default model)
+            scheduler: Admission control shared by all sessions
+        """
+        self.agent_name = agent_name
+        self.factory = factory
+        self.profile = profile
+        self.ceiling = ceiling
+        self.stats_key = stats_key or agent_name
+        self.stats = stats
+        self.router = router
+        self.scheduler = scheduler
+        self._clients: Dict[Tuple[Optional[str], int], Any] = {}
+        self._lock = threading.Lock()
+
+    def current_budget(self) -> int:
+        """Token budget for the next call, rounded so clients are reused"""
+        budget = self.stats.budget(self.stats_key, self.profile['max_tokens'],
+                                   self.profile['min_tokens'], self.ceiling)
+        return min(self.ceiling, int(math.ceil(budget / self.BUDGET_STEP)) * self.BUDGET_STEP)
+
+    def _client(self, budget: int, model: Optional[str] = None):
+        with self._lock:
+            if (model, budget) not in self._clients:
+                self._clients[(model, budget)] = self.factory(budget, model)
+            return self._clients[(model, budget)]
+
+    def _generate(self, budget: int, model: Optional[str], prompt: str, **kwargs) -> Tuple[str, Dict[str, Any]]:
+        """Text and Ollama generation info of one completion"""
+        generation = self._client(budget, model).generate([prompt], **kwargs).generations[0][0]
+        info = generation.generation_info or {}
+        # The KV context token list is large and unused
+        return generation.text, {key: value for key, value in info.items() if key != 'context'}
+
+    def invoke(self, prompt: str, **kwargs) -> str:
+        """Generate a completion within the tuned token budget on the routed model"""
+        with tracer.span('llm.request', agent=self.agent_name) as span, self.scheduler.slot():
+            span.set(queue_seconds=round(span.elapsed(), 4))
+            # Route once admitted so the choice reflects the current load
+            budget = self.current_budget()
+            prompt_tokens = len(prompt) // 4
+            model = None
+            if self.router is not None:
+                expected_tokens = self.stats.median(self.stats_key, budget // 2)
+                model = self.router.choose(self.agent_name, prompt_tokens, expected_tokens,
+                                           queued=self.scheduler.queue_length())
+
+            tracking = self.router.track(self.agent_name, model, prompt_tokens) if model else nullcontext({})
+            with tracking as outcome:
+                # Recorded per agent and prompt: replays match whatever model and budget are chosen
+                text, info = cassette.call('llm', self.stats_key, {'prompt': prompt},
+                                           lambda: self._generate(budget, model, prompt, **kwargs))
+                tokens = info.get('eval_count') or max(1, len(text) // 4)
+                outcome.update(output_tokens=tokens, info=info)
+            span.set(model=model or 'default', budget=budget, output_tokens=tokens,
+                     prompt_tokens=info.get('prompt_eval_count') or prompt_tokens, **ollama_timings(info))
+
+        truncated = info.get('done_reason') == 'length' or tokens >= budget
+        self.stats.record(self.stats_key, tokens, truncated)
+        usage = _usage.get()
+        if usage is not None:
+            usage['calls'] += 1
+            usage['prompt_tokens'] += info.get('prompt_eval_count') or prompt_tokens
+            usage['output_tokens'] += tokens
+            if model and model not in usage['models']:
+                usage['models'].append(model)
+        return text
+
+    def __getattr__(self, name: str):
+        # Anything else (e.g. attributes CrewAI inspects) comes from a default client
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self._client(self.current_budget()), name)
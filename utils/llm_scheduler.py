@@ -0,0 +1,254 @@
+import contextvars
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Callable, Deque, Dict, Iterator, List, Optional
+
+from utils.logger import app_logger
+from utils.metrics import metrics
+
+# Priority lanes, served in this order
+INTERACTIVE = 0
+BATCH = 1
+
+# Maximum LLM calls sent to Ollama at once (match OLLAMA_NUM_PARALLEL on the server)
+MAX_CONCURRENT_LLM_CALLS = int(os.getenv("MAX_CONCURRENT_LLM_CALLS", "2"))
+
+
+class RequestCancelled(Exception):
+    """Raised in a waiting caller whose session went away or was cancelled"""
+
+
+class _Ticket:
+    """One waiting LLM call"""
+
+    _ids = itertools.count()
+
+    def __init__(self, session_id: str, priority: int):
+        self.id = next(self._ids)
+        self.session_id = session_id
+        self.priority = priority
+        self.enqueued = time.monotonic()
+        self.granted = threading.Event()
+        self.cancelled = False
+
+
+# Who the current thread is calling the LLM for; set by LLMScheduler.context
+_session: contextvars.ContextVar = contextvars.ContextVar('llm_session', default=None)
+_priority: contextvars.ContextVar = contextvars.ContextVar('llm_priority', default=INTERACTIVE)
+_on_wait: contextvars.ContextVar = contextvars.ContextVar('llm_on_wait', default=None)
+_is_alive: contextvars.ContextVar = contextvars.ContextVar('llm_is_alive', default=None)
+
+
+class LLMScheduler:
+    """
+    Process-wide admission control for LLM calls
+
+    At most max_concurrent calls run at once. Waiting calls are queued per
+    priority lane (interactive before batch), and within a lane sessions are
+    served round-robin so one session's burst can't starve the others.
+    Callers learn their queue position while waiting, and waiting calls
+    whose caller went away (see context()) are dropped before they reach
+    Ollama.
+    """
+
+    POLL_INTERVAL = 0.5
+
+    def __init__(self, max_concurrent: int = MAX_CONCURRENT_LLM_CALLS):
+        self.max_concurrent = max(1, max_concurrent)
+        self._active = 0
+        # lane -> session -> waiting tickets; session order is the round-robin order
+        self._lanes: Dict[int, "OrderedDict[str, Deque[_Ticket]]"] = {INTERACTIVE: OrderedDict(), BATCH: OrderedDict()}
+        self._cancelled_sessions: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'admitted': 0, 'cancelled': 0, 'max_queue': 0, 'total_wait': 0.0}
+
+    @contextmanager
+    def context(self, session_id: str, priority: int = INTERACTIVE,
+                on_wait: Optional[Callable[[int], None]] = None,
+                is_alive: Optional[Callable[[], bool]] = None) -> Iterator[None]:
+        """
+        Attribute LLM calls made in this block to a session
+
+        Args:
+            session_id: Session the calls belong to; calls of the same session
+                share one round-robin turn
+            priority: INTERACTIVE or BATCH
+            on_wait: Called with the 1-based queue position while a call waits,
+                and with 0 once it is admitted
+            is_alive: Polled while a call waits; once it returns False the call
+                is dropped (other calls of the session keep their place)
+        """
+        tokens = (_session.set(session_id), _priority.set(priority), _on_wait.set(on_wait),
+                  _is_alive.set(is_alive))
+        try:
+            with app_logger.context(session_id=session_id):
+                yield
+        finally:
+            _is_alive.reset(tokens[3])
+            _on_wait.reset(tokens[2])
+            _priority.reset(tokens[1])
+            _session.reset(tokens[0])
+
+    def _waiting_order(self) -> List[_Ticket]:
+        """Waiting tickets in the order they would be admitted"""
+        order = []
+        for lane in sorted(self._lanes):
+            queues = [list(queue) for queue in self._lanes[lane].values()]
+            # Round-robin: first ticket of every session, then the second, ...
+            for round_tickets in itertools.zip_longest(*queues):
+                order.extend(ticket for ticket in round_tickets if ticket is not None)
+        return order
+
+    def _dispatch(self):
+        """Admit waiting tickets while slots are free (lock held)"""
+        while self._active < self.max_concurrent:
+            for lane in sorted(self._lanes):
+                sessions = self._lanes[lane]
+                if sessions:
+                    session_id, queue = next(iter(sessions.items()))
+                    ticket = queue.popleft()
+                    # Move the session to the back of the round-robin order
+                    del sessions[session_id]
+                    if queue:
+                        sessions[session_id] = queue
+                    break
+            else:
+                return
+            self._active += 1
+            self.stats['admitted'] += 1
+            self.stats['total_wait'] += time.monotonic() - ticket.enqueued
+            ticket.granted.set()
+
+    def position(self, session_id: str) -> int:
+        """1-based queue position of a session's next waiting call (0 if none waits)"""
+        return self._position(lambda ticket: ticket.session_id == session_id)
+
+    def _position(self, matches: Callable[[_Ticket], bool]) -> int:
+        with self._lock:
+            for index, ticket in enumerate(self._waiting_order(), 1):
+                if matches(ticket):
+                    return index
+        return 0
+
+    def queue_length(self) -> int:
+        with self._lock:
+            return sum(len(queue) for lane in self._lanes.values() for queue in lane.values())
+
+    def cancel_session(self, session_id: str) -> int:
+        """
+        Cancel all waiting calls of a session
+
+        Returns:
+            Number of cancelled calls
+        """
+        with self._lock:
+            # Later calls from the session are refused too
+            self._cancelled_sessions[session_id] = None
+            while len(self._cancelled_sessions) > 1000:
+                self._cancelled_sessions.popitem(last=False)
+            cancelled = 0
+            for lane in self._lanes.values():
+                for ticket in lane.pop(session_id, ()):
+                    ticket.cancelled = True
+                    ticket.granted.set()
+                    cancelled += 1
+            self.stats['cancelled'] += cancelled
+        if cancelled:
+            app_logger.info(f"Cancelled {cancelled} queued LLM calls for session {session_id}")
+        return cancelled
+
+    @staticmethod
+    def _alive(is_alive: Optional[Callable[[], bool]]) -> bool:
+        if is_alive is None:
+            return True
+        try:
+            return bool(is_alive())
+        except Exception:
+            return True
+
+    def _withdraw(self, ticket: _Ticket):
+        """Drop one waiting ticket unless it was admitted meanwhile"""
+        with self._lock:
+            if ticket.granted.is_set():
+                return
+            sessions = self._lanes[ticket.priority]
+            queue = sessions.get(ticket.session_id)
+            if queue is not None:
+                queue.remove(ticket)
+                if not queue:
+                    del sessions[ticket.session_id]
+            ticket.cancelled = True
+            self.stats['cancelled'] += 1
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """
+        Hold one LLM slot for the duration of a call
+
+        Uses the session, priority and wait callback from the surrounding
+        context(); calls outside any context share an anonymous session.
+
+        Raises:
+            RequestCancelled: The session was cancelled or the caller went away while the call waited
+        """
+        session_id = _session.get() or 'anonymous'
+        ticket = _Ticket(session_id, _priority.get())
+        on_wait = _on_wait.get()
+        is_alive = _is_alive.get()
+
+        with self._lock:
+            if session_id in self._cancelled_sessions:
+                raise RequestCancelled(f"Session {session_id} was cancelled")
+            if not self._alive(is_alive):
+                raise RequestCancelled(f"LLM call for session {session_id} is no longer wanted")
+            self._lanes[ticket.priority].setdefault(session_id, deque()).append(ticket)
+            self.stats['max_queue'] = max(self.stats['max_queue'],
+                                          sum(len(q) for lane in self._lanes.values() for q in lane.values()))
+            self._dispatch()
+
+        last_position = None
+        while not ticket.granted.wait(self.POLL_INTERVAL):
+            if not self._alive(is_alive):
+                self._withdraw(ticket)
+                if ticket.cancelled:
+                    break
+            position = self._position(lambda waiting: waiting is ticket)
+            if on_wait and position != last_position:
+                last_position = position
+                try:
+                    on_wait(position)
+                except Exception:
+                    pass  # Feedback must never break the call
+
+        if ticket.cancelled:
+            raise RequestCancelled(f"LLM call for session {session_id} was cancelled while queued")
+        if on_wait and last_position is not None:
+            try:
+                on_wait(0)
+            except Exception:
+                pass
+
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._dispatch()
+
+    def get_stats(self) -> Dict[str, float]:
+        """Admission counters plus current load"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['active'] = self._active
+            stats['queued'] = sum(len(q) for lane in self._lanes.values() for q in lane.values())
+        stats['avg_wait'] = stats['total_wait'] / stats['admitted'] if stats['admitted'] else 0.0
+        return stats
+
+
+# Global scheduler shared by every session in the process
+llm_scheduler = LLMScheduler()
+metrics.register_collector('llm_scheduler', llm_scheduler.get_stats)
@@ -1,96 +1,237 @@
+import atexit
+import contextvars
+import copy
+import json
 import logging
 import os
-from datetime import datetime
-from typing import Optional
+import queue
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, Iterator, Optional
+
+from utils.tracing import tracer
+
+# Directory and file of the structured (JSON lines) log
+LOG_DIR = os.getenv("LOG_DIR", "logs")
+LOG_FILE = os.getenv("LOG_FILE", "cv_assistant.jsonl")
+
+# Level of the application logger and of the console output
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_CONSOLE_LEVEL = os.getenv("LOG_CONSOLE_LEVEL", "INFO")
+
+# Per-component levels, e.g. "agents=WARNING,search=DEBUG"
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+
+# The log file is rotated at this size, keeping this many old files
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+
+# Request and session the current thread or task is working for; set with Logger.context
+_log_context: contextvars.ContextVar = contextvars.ContextVar('log_context', default={})
+
+# Attributes every LogRecord has; anything else came from `extra`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+def parse_levels(spec: str) -> Dict[str, int]:
+    """Component levels from "component=LEVEL,..." (unknown levels are ignored)"""
+    levels = {}
+    for item in spec.split(','):
+        component, _, level = item.partition('=')
+        level_value = logging.getLevelName(level.strip().upper())
+        if component.strip() and isinstance(level_value, int):
+            levels[component.strip()] = level_value
+    return levels
+
+
+class _ContextFilter(logging.Filter):
+    """Attach the request/session context and current trace to each record when it is logged"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for key, value in _log_context.get().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        span = tracer.current()
+        if span is not None and not hasattr(record, 'trace_id'):
+            record.trace_id = span.trace_id
+        return True
+
+
+class _QueueHandler(QueueHandler):
+    """
+    Queue handler that keeps a record's traceback apart from its message
+
+    The stock prepare() folds the traceback into the message and clears
+    exc_info; this one keeps it as exc_text, so the JSON file gets it in its
+    own 'exception' field and the console still prints it below the message.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        # Arguments and live tracebacks may not outlive the call; the listener gets plain text
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per record: time, level, component, message, context and extra fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES})
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
 
 class Logger:
-    """Centralized logging utility for the CV Assistant application"""
-    
-    def __init__(self, name: str = "cv_assistant", log_level: str = "INFO"):
+    """
+    Centralized logging utility for the CV Assistant application
+
+    Records are put on an in-memory queue and written by a background
+    listener thread, so logging never blocks an agent or request on file
+    or console I/O. The file gets JSON lines (with request, session and
+    trace ids) and rotates by size; the console gets readable lines.
+    Components log through child loggers whose levels are set separately.
+    """
+
+    def __init__(self, name: str = "cv_assistant", log_level: str = LOG_LEVEL,
+                 component_levels: Optional[Dict[str, int]] = None):
         self.logger = logging.getLogger(name)
-        self.logger.setLevel(getattr(logging, log_level.upper()))
-        
+        self.logger.setLevel(getattr(logging, log_level.upper(), logging.INFO))
+        self.component_levels = parse_levels(LOG_LEVELS) if component_levels is None else component_levels
+        self._listener: Optional[QueueListener] = None
+        self._components: Dict[str, "Logger"] = {}
+
         # Prevent duplicate handlers
-        if not self.logger.handlers:
+        if not self.logger.handlers and '.' not in name:
             self._setup_handlers()
-    
+
     def _setup_handlers(self):
-        """Setup logging handlers for console and file output"""
-        
+        """Route records through a queue to the console and the rotating JSON file"""
+
         # Create logs directory if it doesn't exist
-        log_dir = "logs"
-        if not os.path.exists(log_dir):
-            os.makedirs(log_dir)
-        
+        os.makedirs(LOG_DIR, exist_ok=True)
+
         # Console handler
         console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.INFO)
-        
-        # File handler
-        log_filename = f"{log_dir}/cv_assistant_{datetime.now().strftime('%Y%m%d')}.log"
-        file_handler = logging.FileHandler(log_filename)
-        file_handler.setLevel(logging.DEBUG)
-        
-        # Formatter
-        formatter = logging.Formatter(
+        console_handler.setLevel(getattr(logging, LOG_CONSOLE_LEVEL.upper(), logging.INFO))
+        console_handler.setFormatter(logging.Formatter(
             '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
             datefmt='%Y-%m-%d %H:%M:%S'
-        )
-        
-        console_handler.setFormatter(formatter)
-        file_handler.setFormatter(formatter)
-        
-        # Add handlers to logger
-        self.logger.addHandler(console_handler)
-        self.logger.addHandler(file_handler)
-    
+        ))
+
+        # File handler (JSON lines, rotated by size)
+        file_handler = RotatingFileHandler(os.path.join(LOG_DIR, LOG_FILE), maxBytes=LOG_MAX_BYTES,
+                                           backupCount=LOG_BACKUP_COUNT, encoding='utf-8', delay=True)
+        file_handler.setLevel(logging.DEBUG)
+        file_handler.setFormatter(JSONFormatter())
+
+        # The caller only enqueues; the listener thread does the I/O
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        queue_handler = _QueueHandler(log_queue)
+        queue_handler.addFilter(_ContextFilter())
+        self.logger.addHandler(queue_handler)
+        self.logger.propagate = False
+
+        self._listener = QueueListener(log_queue, console_handler, file_handler, respect_handler_level=True)
+        self._listener.start()
+        atexit.register(self.shutdown)
+
+    def shutdown(self):
+        """Write out the queued records and stop the listener thread"""
+        listener, self._listener = self._listener, None
+        if listener is not None:
+            listener.stop()
+
+    def component(self, name: str) -> "Logger":
+        """Logger for one component (e.g. 'agents', 'search'), with its own level from LOG_LEVELS"""
+        if name not in self._components:
+            child = Logger(f"{self.logger.name}.{name}", logging.getLevelName(self.logger.level), {})
+            # Components inherit the application level unless configured
+            child.logger.setLevel(self.component_levels.get(name, logging.NOTSET))
+            self._components[name] = child
+        return self._components[name]
+
+    @staticmethod
+    @contextmanager
+    def context(**fields) -> Iterator[None]:
+        """Tag every record logged in this block (and the tasks it starts) with fields like request_id"""
+        token = _log_context.set({**_log_context.get(), **fields})
+        try:
+            yield
+        finally:
+            _log_context.reset(token)
+
     def info(self, message: str, extra: Optional[dict] = None):
         """Log info message"""
         self.logger.info(message, extra=extra)
-    
+
     def debug(self, message: str, extra: Optional[dict] = None):
         """Log debug message"""
         self.logger.debug(message, extra=extra)
-    
+
     def warning(self, message: str, extra: Optional[dict] = None):
         """Log warning message"""
         self.logger.warning(message, extra=extra)
-    
+
     def error(self, message: str, extra: Optional[dict] = None):
         """Log error message"""
         self.logger.error(message, extra=extra)
-    
+
     def critical(self, message: str, extra: Optional[dict] = None):
         """Log critical message"""
         self.logger.critical(message, extra=extra)
-    
+
     def log_agent_start(self, agent_name: str, task: str):
         """Log when an agent starts a task"""
-        self.info(f"Agent '{agent_name}' started task: {task}")
-    
+        self.component('agents').info(f"Agent '{agent_name}' started task: {task}",
+                                      extra={'agent': agent_name, 'task': task})
+
     def log_agent_complete(self, agent_name: str, task: str, duration: float):
         """Log when an agent completes a task"""
-        self.info(f"Agent '{agent_name}' completed task: {task} (Duration: {duration:.2f}s)")
-    
+        self.component('agents').info(f"Agent '{agent_name}' completed task: {task} (Duration: {duration:.2f}s)",
+                                      extra={'agent': agent_name, 'task': task, 'duration': round(duration, 3)})
+
     def log_agent_error(self, agent_name: str, task: str, error: str):
         """Log when an agent encounters an error"""
-        self.error(f"Agent '{agent_name}' error in task '{task}': {error}")
-    
+        self.component('agents').error(f"Agent '{agent_name}' error in task '{task}': {error}",
+                                       extra={'agent': agent_name, 'task': task})
+
     def log_search_query(self, tool_name: str, query: str):
         """Log search queries"""
-        self.debug(f"Search tool '{tool_name}' executing query: {query}")
-    
+        self.component('search').debug(f"Search tool '{tool_name}' executing query: {query}",
+                                       extra={'tool': tool_name, 'query': query})
+
     def log_search_results(self, tool_name: str, query: str, result_count: int):
         """Log search results"""
-        self.debug(f"Search tool '{tool_name}' returned {result_count} results for query: {query}")
-    
+        self.component('search').debug(
+            f"Search tool '{tool_name}' returned {result_count} results for query: {query}",
+            extra={'tool': tool_name, 'query': query, 'result_count': result_count}
+        )
+
     def log_user_input(self, cv_length: int, jd_length: int):
         """Log user input statistics"""
-        self.info(f"User input received - CV length: {cv_length} chars, JD length: {jd_length} chars")
-    
+        self.info(f"User input received - CV length: {cv_length} chars, JD length: {jd_length} chars",
+                  extra={'cv_length': cv_length, 'jd_length': jd_length})
+
     def log_crew_execution(self, task_count: int, total_duration: float):
         """Log crew execution summary"""
-        self.info(f"Crew execution completed - {task_count} tasks in {total_duration:.2f}s")
+        self.info(f"Crew execution completed - {task_count} tasks in {total_duration:.2f}s",
+                  extra={'task_count': task_count, 'duration': round(total_duration, 3)})
 
 # Global logger instance
 app_logger = Logger()
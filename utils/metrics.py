@@ -0,0 +1,307 @@
+import math
+import os
+import re
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.tracing import tracer
+
+# Port of the standalone Prometheus endpoint (0 disables it; the HTTP API always serves /metrics)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+# Address the standalone metrics server binds to (0.0.0.0 exposes it beyond this machine)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+
+# Prefix of every exported metric name
+METRICS_PREFIX = "cv_assistant"
+
+# Latency buckets in seconds, from cached lookups up to full LLM generations
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# Throughput buckets in tokens per second
+THROUGHPUT_BUCKETS = (1.0, 2.5, 5.0, 10.0, 20.0, 40.0, 80.0, 160.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _percentile(sorted_values: List[float], percentile: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(math.ceil(percentile * len(sorted_values))) - 1)]
+
+
+class Counter:
+    """Monotonic count per label set"""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values: Dict[Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = _labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(_labels(labels), 0)
+
+    def samples(self) -> List[Tuple[str, Labels, float]]:
+        with self._lock:
+            return [(self.name, labels, value) for labels, value in self._values.items()]
+
+
+class Histogram:
+    """
+    Distribution of observations per label set
+
+    Cumulative bucket counts feed the Prometheus export; the most recent
+    observations are kept too so the Performance page can show exact
+    percentiles over the recent window.
+    """
+
+    kind = 'histogram'
+    WINDOW = 500
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Labels, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _labels(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0,
+                                              'recent': deque(maxlen=self.WINDOW)}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['counts'][index] += 1
+            series['sum'] += value
+            series['count'] += 1
+            series['recent'].append(value)
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Count, mean and recent p50/p95/p99 per label set"""
+        with self._lock:
+            items = [(labels, series['count'], series['sum'], sorted(series['recent']))
+                     for labels, series in self._series.items()]
+        rows = []
+        for labels, count, total, recent in items:
+            if not recent:
+                continue
+            rows.append(dict(labels, count=count, mean=total / count, p50=_percentile(recent, 0.5),
+                             p95=_percentile(recent, 0.95), p99=_percentile(recent, 0.99)))
+        return rows
+
+    def samples(self) -> List[Tuple[str, Labels, float]]:
+        with self._lock:
+            items = [(labels, list(series['counts']), series['sum'], series['count'])
+                     for labels, series in self._series.items()]
+        samples = []
+        for labels, counts, total, count in items:
+            for bound, bucket_count in zip(self.buckets, counts):
+                samples.append((f"{self.name}_bucket", labels + (('le', _format_value(bound)),), bucket_count))
+            samples.append((f"{self.name}_bucket", labels + (('le', '+Inf'),), count))
+            samples.append((f"{self.name}_sum", labels, total))
+            samples.append((f"{self.name}_count", labels, count))
+        return samples
+
+
+class MetricsRegistry:
+    """
+    In-process counters, histograms and collected gauges
+
+    Latencies are recorded from finished tracing spans (per agent, tool,
+    LLM model and pipeline step), so instrumented code needs no extra
+    calls. Components with their own counters (the LLM scheduler, model
+    router, search planner, result store) register collectors that are
+    read at export time. Everything renders in the Prometheus text format.
+    """
+
+    def __init__(self, prefix: str = METRICS_PREFIX):
+        self.prefix = prefix
+        self._metrics: Dict[str, Any] = {}
+        self._collectors: Dict[str, Tuple[Callable[[], Dict[str, Any]], Optional[str]]] = {}
+        self._lock = threading.Lock()
+
+        self.span_seconds = self.histogram('span_duration_seconds', "Duration of traced operations")
+        self.span_errors = self.counter('span_errors_total', "Traced operations that raised")
+        self.llm_seconds = self.histogram('llm_request_seconds', "LLM request latency including queue wait")
+        self.llm_queue_seconds = self.histogram('llm_queue_wait_seconds', "Wait for an LLM scheduler slot")
+        self.llm_ttft = self.histogram('llm_time_to_first_token_seconds', "Model load plus prompt evaluation")
+        self.llm_throughput = self.histogram('llm_tokens_per_second', "Ollama generation throughput",
+                                             THROUGHPUT_BUCKETS)
+        self.llm_tokens = self.counter('llm_tokens_total', "Prompt and output tokens")
+        self.cache_requests = self.counter('cache_requests_total', "Cache lookups by cache and outcome")
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        """Counter registered under name (created on first use)"""
+        return self._get_or_create(name, lambda full_name: Counter(full_name, help_text))
+
+    def histogram(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        """Histogram registered under name (created on first use)"""
+        return self._get_or_create(name, lambda full_name: Histogram(full_name, help_text, buckets))
+
+    def _get_or_create(self, name: str, create: Callable[[str], Any]):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = create(f"{self.prefix}_{name}")
+            return self._metrics[name]
+
+    def register_collector(self, name: str, collect: Callable[[], Dict[str, Any]], label: Optional[str] = None):
+        """
+        Export a component's stats as gauges
+
+        Args:
+            name: Component name, used as the metric name prefix
+            collect: Returns {stat: number}, or {label value: {stat: number}} with label
+            label: Label name for the outer keys of nested stats (e.g. 'model')
+        """
+        with self._lock:
+            self._collectors[name] = (collect, label)
+
+    def collect(self) -> Dict[str, List[Tuple[Labels, float]]]:
+        """Current collector values by gauge name; failing collectors are skipped"""
+        with self._lock:
+            collectors = dict(self._collectors)
+        gauges: Dict[str, List[Tuple[Labels, float]]] = {}
+        for name, (collect, label) in collectors.items():
+            try:
+                stats = collect()
+            except Exception:
+                continue
+            groups = stats.items() if label else [(None, stats)]
+            for label_value, values in groups:
+                labels = ((label, str(label_value)),) if label else ()
+                for stat, value in values.items():
+                    if isinstance(value, bool) or not isinstance(value, (int, float)):
+                        continue
+                    metric = re.sub(r'[^a-zA-Z0-9_]', '_', f"{self.prefix}_{name}_{stat}")
+                    gauges.setdefault(metric, []).append((labels, value))
+        return gauges
+
+    def observe_span(self, span: Dict[str, Any]):
+        """Record a finished tracing span"""
+        name, seconds, attributes = span['name'], span['duration'], span['attributes']
+        labels = {'span': name}
+        if 'agent' in attributes:
+            labels['agent'] = attributes['agent']
+        self.span_seconds.observe(seconds, **labels)
+        if span['status'] == 'error':
+            self.span_errors.inc(**labels)
+
+        if name == 'llm.request':
+            llm_labels = {'agent': attributes.get('agent', ''), 'model': attributes.get('model', 'default')}
+            self.llm_seconds.observe(seconds, **llm_labels)
+            if 'queue_seconds' in attributes:
+                self.llm_queue_seconds.observe(attributes['queue_seconds'], agent=llm_labels['agent'])
+            if 'ttft_seconds' in attributes:
+                self.llm_ttft.observe(attributes['ttft_seconds'], **llm_labels)
+            if 'tokens_per_second' in attributes:
+                self.llm_throughput.observe(attributes['tokens_per_second'], model=llm_labels['model'])
+            for kind in ('prompt', 'output'):
+                if attributes.get(f'{kind}_tokens'):
+                    self.llm_tokens.inc(attributes[f'{kind}_tokens'], kind=kind, **llm_labels)
+        elif name == 'pipeline.step' and 'cached' in attributes:
+            self.cache_requests.inc(cache='pipeline_step', result='hit' if attributes['cached'] else 'miss')
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Histogram summaries, counter values and gauges for the Performance page"""
+        with self._lock:
+            metrics = dict(self._metrics)
+        snapshot = {'histograms': {}, 'counters': {}, 'gauges': self.collect()}
+        for name, metric in metrics.items():
+            if isinstance(metric, Histogram):
+                snapshot['histograms'][name] = metric.summary()
+            else:
+                snapshot['counters'][name] = [dict(labels, value=value) for _, labels, value in metric.samples()]
+        return snapshot
+
+    def render_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}"
+                         for name, labels, value in metric.samples())
+        for name, series in self.collect().items():
+            lines.append(f"# TYPE {name} gauge")
+            lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}" for labels, value in series)
+        return '\n'.join(lines) + '\n'
+
+
+# Global registry shared by all components, fed by the tracer's spans
+metrics = MetricsRegistry()
+tracer.add_listener(metrics.observe_span)
+
+_server_lock = threading.Lock()
+_server: Optional[ThreadingHTTPServer] = None
+
+
+def start_metrics_server(port: int = METRICS_PORT, host: str = METRICS_HOST) -> Optional[ThreadingHTTPServer]:
+    """
+    Serve /metrics in the Prometheus format from a background thread
+
+    Used by processes without an HTTP server of their own (the Streamlit
+    app). Started at most once per process; returns None when disabled or
+    the port is taken.
+    """
+    global _server
+    if not port:
+        return None
+    with _server_lock:
+        if _server is not None:
+            return _server
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.render_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Scrapes would flood the application log
+
+        try:
+            _server = ThreadingHTTPServer((host, port), Handler)
+        except OSError:
+            return None
+        threading.Thread(target=_server.serve_forever, name='metrics-server', daemon=True).start()
+        return _server
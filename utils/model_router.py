@@ -0,0 +1,212 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, List, Optional
+
+import requests
+
+from config.ollama_config import OllamaConfig
+from utils.logger import app_logger
+from utils.metrics import metrics
+
+
+class _ModelStats:
+    """Live latency estimates for one model (exponentially weighted)"""
+
+    ALPHA = 0.3
+
+    def __init__(self, size: float):
+        # Priors until the first requests complete: bigger models are slower
+        self.overhead = 1.0
+        self.prompt_seconds_per_token = 0.0005 * size
+        self.output_seconds_per_token = 0.012 * size
+        self.in_flight = 0
+        self.requests = 0
+        self.last_latency = 0.0
+
+    def _blend(self, current: float, observed: float) -> float:
+        return observed if self.requests == 0 else (1 - self.ALPHA) * current + self.ALPHA * observed
+
+    def update(self, latency: float, prompt_tokens: int, output_tokens: int, info: Dict):
+        if info.get('eval_count') and info.get('eval_duration'):
+            # Ollama reports durations in nanoseconds
+            output_rate = info['eval_duration'] / 1e9 / info['eval_count']
+            prompt_rate = (info['prompt_eval_duration'] / 1e9 / info['prompt_eval_count']
+                           if info.get('prompt_eval_count') and info.get('prompt_eval_duration')
+                           else self.prompt_seconds_per_token)
+            overhead = latency - output_rate * info['eval_count'] - prompt_rate * (info.get('prompt_eval_count') or 0)
+        else:
+            # Without server timings, attribute the wall time to output tokens
+            prompt_rate = self.prompt_seconds_per_token
+            overhead = self.overhead
+            output_rate = max(0.0, latency - overhead - prompt_rate * prompt_tokens) / max(1, output_tokens)
+
+        self.prompt_seconds_per_token = self._blend(self.prompt_seconds_per_token, prompt_rate)
+        self.output_seconds_per_token = self._blend(self.output_seconds_per_token, output_rate)
+        self.overhead = self._blend(self.overhead, max(0.0, overhead))
+        self.last_latency = latency
+        self.requests += 1
+
+    def estimate(self, prompt_tokens: int, output_tokens: int, queued: int = 0) -> float:
+        """Expected seconds until this request completes, including in-flight and queued work"""
+        service = (self.overhead + self.prompt_seconds_per_token * prompt_tokens
+                   + self.output_seconds_per_token * output_tokens)
+        # Ollama serves a model's requests largely one after another. in_flight is capped by the
+        # scheduler's slots, so calls still waiting for a slot count as backlog too
+        return service * (1 + self.in_flight + queued)
+
+
+class ModelRouter:
+    """
+    Picks the Ollama model for each agent request
+
+    Candidates are the agent's preferred models (OllamaConfig.AGENT_MODELS)
+    that are installed and whose context window fits the prompt. The first
+    candidate expected to finish within the agent's latency target wins;
+    if none would, the fastest one is used, so requests shift to smaller
+    models as a model's queue (including calls waiting in the LLM scheduler)
+    backs up. Every decision is logged and kept in a short history.
+
+    Routing is off unless MODEL_ROUTING is set; when on, agents may be served
+    by models other than OLLAMA_MODEL, which is logged at startup.
+    """
+
+    AVAILABILITY_TTL = 300
+    HISTORY_SIZE = 200
+
+    def __init__(self, enabled: bool = OllamaConfig.MODEL_ROUTING, base_url: str = OllamaConfig.BASE_URL):
+        self.enabled = enabled
+        self.base_url = base_url.rstrip('/')
+        self._stats: Dict[str, _ModelStats] = {}
+        self._history: Deque[Dict] = deque(maxlen=self.HISTORY_SIZE)
+        self._available: Optional[List[str]] = None
+        self._available_at = 0.0
+        self._lock = threading.Lock()
+        if enabled:
+            app_logger.info(f"Model routing is on: agents may use models from AGENT_MODELS instead of "
+                            f"OLLAMA_MODEL ({OllamaConfig.MODEL}); set MODEL_ROUTING=False to disable")
+
+    def _model_stats(self, model: str) -> _ModelStats:
+        if model not in self._stats:
+            self._stats[model] = _ModelStats(OllamaConfig.get_model_config(model).get('size', 7.0))
+        return self._stats[model]
+
+    def available_models(self) -> List[str]:
+        """Installed models, refreshed from Ollama's /api/tags every few minutes"""
+        if self._available is not None and time.time() - self._available_at < self.AVAILABILITY_TTL:
+            return self._available
+        try:
+            response = requests.get(f"{self.base_url}/api/tags", timeout=2)
+            response.raise_for_status()
+            names = [model['name'] for model in response.json().get('models', [])]
+            # "llama3" matches the installed "llama3:latest"
+            available = names + [name.split(':')[0] for name in names if name.endswith(':latest')]
+        except Exception:
+            available = [OllamaConfig.MODEL]
+        self._available, self._available_at = available, time.time()
+        return available
+
+    def candidates(self, agent_name: str, prompt_tokens: int, output_tokens: int) -> List[str]:
+        """Usable models for an agent, in preference order"""
+        if not self.enabled:
+            return [OllamaConfig.MODEL]
+        available = set(self.available_models())
+        preferred = OllamaConfig.AGENT_MODELS.get(agent_name, []) + [OllamaConfig.MODEL]
+        fitting = [
+            model for model in dict.fromkeys(preferred)
+            if model in available
+            and prompt_tokens + output_tokens <= OllamaConfig.get_model_config(model)['context_window']
+        ]
+        return fitting or [OllamaConfig.MODEL]
+
+    def choose(self, agent_name: str, prompt_tokens: int, output_tokens: int, queued: int = 0) -> str:
+        """
+        Pick the model for one request
+
+        Args:
+            agent_name: Agent making the request
+            prompt_tokens: Estimated prompt length
+            output_tokens: Expected output length
+            queued: Calls waiting for an LLM scheduler slot
+
+        Returns:
+            Model name
+        """
+        candidates = self.candidates(agent_name, prompt_tokens, output_tokens)
+        target = OllamaConfig.LATENCY_TARGETS.get(agent_name)
+        with self._lock:
+            estimates = {model: self._model_stats(model).estimate(prompt_tokens, output_tokens, queued)
+                         for model in candidates}
+            # Idle models without measurements get a chance before priors rule them out
+            untried = {model for model in candidates
+                       if self._stats[model].requests == 0 and self._stats[model].in_flight == 0}
+
+        model = next((model for model in candidates
+                      if target is None or model in untried or estimates[model] <= target), None)
+        reason = 'preferred' if model == candidates[0] else 'latency target'
+        if model is None:
+            model = min(candidates, key=estimates.get)
+            reason = 'fastest (target missed)'
+
+        app_logger.debug(
+            f"Model router: {agent_name} -> {model} ({reason}, est {estimates[model]:.1f}s, target {target}s, "
+            f"{queued} queued)"
+        )
+        return model
+
+    @contextmanager
+    def track(self, agent_name: str, model: str, prompt_tokens: int) -> Iterator[Dict]:
+        """
+        Count a request as in flight on a model and record how it went
+
+        The caller fills the yielded dict with 'output_tokens' and Ollama's
+        generation info once the response arrives.
+        """
+        with self._lock:
+            self._model_stats(model).in_flight += 1
+        outcome: Dict = {}
+        started = time.perf_counter()
+        try:
+            yield outcome
+        finally:
+            latency = time.perf_counter() - started
+            with self._lock:
+                stats = self._model_stats(model)
+                stats.in_flight -= 1
+                if outcome.get('output_tokens'):
+                    stats.update(latency, prompt_tokens, outcome['output_tokens'], outcome.get('info') or {})
+                self._history.append({
+                    'time': time.time(),
+                    'agent': agent_name,
+                    'model': model,
+                    'prompt_tokens': prompt_tokens,
+                    'output_tokens': outcome.get('output_tokens', 0),
+                    'latency': round(latency, 3),
+                    'ok': bool(outcome.get('output_tokens'))
+                })
+            app_logger.info(f"Agent '{agent_name}' served by {model} in {latency:.2f}s")
+
+    def recent_decisions(self, limit: int = 50) -> List[Dict]:
+        """Most recent requests: which model served which agent and how fast"""
+        with self._lock:
+            return list(self._history)[-limit:]
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        """Current latency estimates and queue depth per model"""
+        with self._lock:
+            return {
+                model: {
+                    'requests': stats.requests,
+                    'in_flight': stats.in_flight,
+                    'last_latency': round(stats.last_latency, 3),
+                    'output_seconds_per_token': round(stats.output_seconds_per_token, 5),
+                    'overhead': round(stats.overhead, 3)
+                }
+                for model, stats in self._stats.items()
+            }
+
+
+# Global router shared by all agents
+model_router = ModelRouter()
+metrics.register_collector('model_router', model_router.get_stats, label='model')
@@ -0,0 +1,68 @@
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import requests
+
+from config.ollama_config import OllamaConfig
+from utils.metrics import metrics
+
+# Seconds an Ollama status check is reused (the Streamlit sidebar asks on every rerun)
+OLLAMA_HEALTH_TTL = float(os.getenv("OLLAMA_HEALTH_TTL", "15"))
+
+
+class OllamaHealth:
+    """
+    Cached Ollama reachability and model availability check
+
+    Reads the installed models from /api/tags instead of generating text, so
+    status checks cost neither a model load nor a slot in the LLM queue.
+    """
+
+    def __init__(self, base_url: str = OllamaConfig.BASE_URL, model: str = OllamaConfig.MODEL,
+                 ttl: float = OLLAMA_HEALTH_TTL, timeout: float = 2):
+        self.url = f"{base_url.rstrip('/')}/api/tags"
+        self.model = model
+        self.ttl = ttl
+        self.timeout = timeout
+        self._status: Optional[Dict[str, Any]] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def check(self, force: bool = False) -> Dict[str, Any]:
+        """
+        Current status, refreshed at most once per ttl
+
+        Returns:
+            {'connected': bool, 'model_available': bool, 'models': [...], 'error': str or None}
+        """
+        with self._lock:
+            if not force and self._status is not None and time.time() - self._checked_at < self.ttl:
+                return self._status
+            try:
+                response = requests.get(self.url, timeout=self.timeout)
+                response.raise_for_status()
+                models = [model['name'] for model in response.json().get('models', [])]
+                # "llama3" matches the installed "llama3:latest"
+                installed = set(models) | {name.split(':')[0] for name in models if name.endswith(':latest')}
+                status = {'connected': True, 'model_available': self.model in installed, 'models': models,
+                          'error': None if self.model in installed else f"Model '{self.model}' is not installed"}
+            except Exception as e:
+                status = {'connected': False, 'model_available': False, 'models': [], 'error': str(e)}
+            self._status, self._checked_at = status, time.time()
+            return status
+
+    @property
+    def ok(self) -> bool:
+        status = self.check()
+        return status['connected'] and status['model_available']
+
+    def get_stats(self) -> Dict[str, int]:
+        status = self.check()
+        return {'up': int(status['connected']), 'model_available': int(status['model_available'])}
+
+
+# Global health check shared by the Streamlit app and the API server
+ollama_health = OllamaHealth()
+metrics.register_collector('ollama', ollama_health.get_stats)
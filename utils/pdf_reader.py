@@ -2,10 +2,13 @@ import PyPDF2
 import io
 from typing import Optional
 
+from utils.tracing import tracer
+
 class PDFReader:
     """Utility class for reading PDF files"""
     
     @staticmethod
+    @tracer.traced('pdf.extract')
     def extract_text_from_pdf(pdf_file) -> Optional[str]:
         """
         Extract text from uploaded PDF file
@@ -29,6 +32,7 @@ class PDFReader:
                 page = pdf_reader.pages[page_num]
                 text += page.extract_text() + "\n"
             
+            tracer.current().set(pages=len(pdf_reader.pages), chars=len(text))
             return text.strip()
             
         except Exception as e:
@@ -36,6 +40,7 @@ class PDFReader:
             return None
     
     @staticmethod
+    @tracer.traced('pdf.extract')
     def extract_text_from_pdf_bytes(pdf_bytes: bytes) -> Optional[str]:
         """
         Extract text from PDF bytes
@@ -59,6 +64,7 @@ class PDFReader:
                 page = pdf_reader.pages[page_num]
                 text += page.extract_text() + "\n"
             
+            tracer.current().set(pages=len(pdf_reader.pages), chars=len(text))
             return text.strip()
             
         except Exception as e:
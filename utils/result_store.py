@@ -0,0 +1,281 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from utils.metrics import metrics
+from utils.structured_output import ATSEvaluation, result_from_record, result_to_record
+
+# Default location of the analysis result database
+RESULT_STORE_PATH = os.getenv("RESULT_STORE_PATH", "data/results.db")
+
+# Retention: least recently used analyses beyond the cap, and any older than the age limit, are deleted
+RESULT_STORE_MAX_ENTRIES = int(os.getenv("RESULT_STORE_MAX_ENTRIES", "200"))
+RESULT_STORE_MAX_AGE_DAYS = float(os.getenv("RESULT_STORE_MAX_AGE_DAYS", "90"))
+
+
+def text_hash(text: str) -> str:
+    """Hash of a text that ignores whitespace differences (case still matters)"""
+    normalized = re.sub(r'\s+', ' ', text or '').strip()
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def _first_line(text: str, limit: int = 40) -> str:
+    line = next((line.strip() for line in (text or '').splitlines() if line.strip()), '')
+    return line if len(line) <= limit else line[:limit - 1] + '…'
+
+
+@dataclass
+class StoredAnalysis:
+    """A stored analysis: per-step results plus how they were produced"""
+    key: str
+    title: str
+    model: str
+    prompt_version: str
+    created: float
+    results: Dict[str, Any] = field(default_factory=dict)
+    metrics: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    score: Optional[int] = None
+
+
+class AnalysisResultStore:
+    """
+    Persistent store of analysis results
+
+    Results are cached per step (and per section-scoped part of a step)
+    under keys built from only the inputs they depend on, so an edited CV
+    or a new job description reruns only the work whose inputs changed and
+    any prompt or model change invalidates old results. This step cache is
+    the only result cache.
+
+    Finished analyses are also kept as history entries for the "Previous
+    Analyses" list, keyed by the hashes of the CV and job description plus
+    the model setup and prompt version. Each entry holds every finished
+    agent step's result with its timing and token counts as zlib-compressed
+    JSON. Entries are shared, but the owners (browser sessions) that
+    requested each one are recorded so listings only show a session its own
+    analyses.
+    """
+
+    # Cached steps kept per stored analysis (whole steps plus per-section parts)
+    CACHED_STEPS_PER_ANALYSIS = 12
+
+    def __init__(self, path: str = RESULT_STORE_PATH, max_entries: int = RESULT_STORE_MAX_ENTRIES,
+                 max_age_days: float = RESULT_STORE_MAX_AGE_DAYS):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._create_schema()
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread; SQLite connections are not shareable"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10)
+            connection.row_factory = sqlite3.Row
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+    def _create_schema(self):
+        connection = self._connection()
+        with connection:
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS analysis_results (
+                    key TEXT PRIMARY KEY,
+                    cv_hash TEXT,
+                    jd_hash TEXT,
+                    model TEXT,
+                    prompt_version TEXT,
+                    title TEXT,
+                    score INTEGER,
+                    steps INTEGER DEFAULT 0,
+                    created REAL,
+                    last_used REAL,
+                    hits INTEGER DEFAULT 0,
+                    payload BLOB
+                )
+            """)
+            connection.execute("CREATE INDEX IF NOT EXISTS analysis_results_last_used ON analysis_results(last_used)")
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS cached_steps (
+                    key TEXT PRIMARY KEY,
+                    kind TEXT,
+                    created REAL,
+                    last_used REAL,
+                    payload BLOB
+                )
+            """)
+            connection.execute("CREATE INDEX IF NOT EXISTS cached_steps_last_used ON cached_steps(last_used)")
+            connection.execute("""
+                CREATE TABLE IF NOT EXISTS analysis_owners (
+                    owner TEXT,
+                    key TEXT,
+                    created REAL,
+                    PRIMARY KEY (owner, key)
+                )
+            """)
+
+    @staticmethod
+    def key(cv_text: str, job_description: str, model: str, prompt_version: str) -> str:
+        """Store key for an analysis"""
+        parts = [text_hash(cv_text), text_hash(job_description), model, prompt_version]
+        return hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()[:32]
+
+    @staticmethod
+    def _pack(payload: Dict[str, Any]) -> bytes:
+        return zlib.compress(json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8'), 6)
+
+    @staticmethod
+    def _unpack(blob: Optional[bytes]) -> Dict[str, Any]:
+        if not blob:
+            return {'results': {}, 'metrics': {}}
+        return json.loads(zlib.decompress(blob).decode('utf-8'))
+
+    def create(self, key: str, cv_text: str, job_description: str, model: str, prompt_version: str,
+               owner: Optional[str] = None):
+        """Register an analysis before its first step is saved (no-op if it exists) and record its owner"""
+        now = time.time()
+        title = f"{_first_line(cv_text)} → {_first_line(job_description)}"
+        connection = self._connection()
+        with self._write_lock, connection:
+            connection.execute(
+                "INSERT OR IGNORE INTO analysis_results (key, cv_hash, jd_hash, model, prompt_version, title, "
+                "created, last_used, payload) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, text_hash(cv_text), text_hash(job_description), model, prompt_version, title, now, now,
+                 self._pack({'results': {}, 'metrics': {}}))
+            )
+            if owner:
+                connection.execute("INSERT OR IGNORE INTO analysis_owners (owner, key, created) VALUES (?, ?, ?)",
+                                   (owner, key, now))
+
+    def is_owner(self, key: str, owner: Optional[str]) -> bool:
+        """Whether an owner requested the analysis stored under key"""
+        row = self._connection().execute("SELECT 1 FROM analysis_owners WHERE owner = ? AND key = ?",
+                                         (owner, key)).fetchone()
+        return row is not None
+
+    def save_step(self, key: str, step: str, result: Any, metrics: Optional[Dict[str, Any]] = None):
+        """Add one finished agent step to a registered analysis"""
+        connection = self._connection()
+        with self._write_lock, connection:
+            row = connection.execute("SELECT payload, score FROM analysis_results WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return
+            payload = self._unpack(row['payload'])
+            payload['results'][step] = result_to_record(result)
+            payload['metrics'][step] = metrics or {}
+            score = result.score if isinstance(result, ATSEvaluation) else row['score']
+            connection.execute(
+                "UPDATE analysis_results SET payload = ?, steps = ?, score = ?, last_used = ? WHERE key = ?",
+                (self._pack(payload), len(payload['results']), score, time.time(), key)
+            )
+        self.prune()
+
+    def get(self, key: str) -> Optional[StoredAnalysis]:
+        """Stored analysis with any finished steps, or None"""
+        connection = self._connection()
+        row = connection.execute("SELECT * FROM analysis_results WHERE key = ?", (key,)).fetchone()
+        if row is None or not row['steps']:
+            return None
+        with self._write_lock, connection:
+            connection.execute("UPDATE analysis_results SET last_used = ?, hits = hits + 1 WHERE key = ?",
+                               (time.time(), key))
+        payload = self._unpack(row['payload'])
+        return StoredAnalysis(
+            key=row['key'],
+            title=row['title'] or '',
+            model=row['model'] or '',
+            prompt_version=row['prompt_version'] or '',
+            created=row['created'],
+            results={step: result_from_record(record) for step, record in payload['results'].items()},
+            metrics=payload.get('metrics', {}),
+            score=row['score']
+        )
+
+    def get_cached(self, key: str) -> Optional[Dict[str, Any]]:
+        """Payload of a cached step, or None"""
+        connection = self._connection()
+        row = connection.execute("SELECT payload FROM cached_steps WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        with self._write_lock, connection:
+            connection.execute("UPDATE cached_steps SET last_used = ? WHERE key = ?", (time.time(), key))
+        return self._unpack(row['payload'])
+
+    def put_cached(self, key: str, kind: str, payload: Dict[str, Any]):
+        """Cache a step's JSON-serializable payload under its input key"""
+        now = time.time()
+        connection = self._connection()
+        with self._write_lock, connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO cached_steps (key, kind, created, last_used, payload) VALUES (?, ?, ?, ?, ?)",
+                (key, kind, now, now, self._pack(payload))
+            )
+
+    def recent(self, limit: int = 10, owner: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Latest analyses with at least one finished step (no payloads, so listing is cheap)
+
+        Args:
+            limit: Maximum number of analyses
+            owner: Only list analyses this owner requested (None lists all, for admin tools)
+        """
+        if owner is None:
+            rows = self._connection().execute(
+                "SELECT key, title, score, steps, model, created, hits FROM analysis_results "
+                "WHERE steps > 0 ORDER BY created DESC LIMIT ?", (limit,)
+            ).fetchall()
+        else:
+            rows = self._connection().execute(
+                "SELECT r.key, r.title, r.score, r.steps, r.model, o.created, r.hits FROM analysis_owners o "
+                "JOIN analysis_results r ON r.key = o.key WHERE o.owner = ? AND r.steps > 0 "
+                "ORDER BY o.created DESC LIMIT ?", (owner, limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def prune(self) -> int:
+        """Enforce the retention limits; returns the number of deleted analyses"""
+        connection = self._connection()
+        with self._write_lock, connection:
+            deleted = connection.execute("DELETE FROM analysis_results WHERE created < ?",
+                                         (time.time() - self.max_age_days * 86400,)).rowcount
+            deleted += connection.execute(
+                "DELETE FROM analysis_results WHERE key NOT IN "
+                "(SELECT key FROM analysis_results ORDER BY last_used DESC LIMIT ?)", (self.max_entries,)
+            ).rowcount
+            connection.execute("DELETE FROM analysis_owners WHERE key NOT IN (SELECT key FROM analysis_results)")
+            connection.execute("DELETE FROM cached_steps WHERE created < ?",
+                               (time.time() - self.max_age_days * 86400,))
+            connection.execute(
+                "DELETE FROM cached_steps WHERE key NOT IN "
+                "(SELECT key FROM cached_steps ORDER BY last_used DESC LIMIT ?)",
+                (self.max_entries * self.CACHED_STEPS_PER_ANALYSIS,)
+            )
+        return deleted
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Entry counts and on-disk payload size"""
+        row = self._connection().execute(
+            "SELECT COUNT(*) AS entries, COALESCE(SUM(LENGTH(payload)), 0) AS payload_bytes, "
+            "COALESCE(SUM(hits), 0) AS hits FROM analysis_results"
+        ).fetchone()
+        stats = dict(row)
+        stats['cached_steps'] = self._connection().execute("SELECT COUNT(*) FROM cached_steps").fetchone()[0]
+        return stats
+
+
+# Global result store shared by all sessions
+result_store = AnalysisResultStore()
+metrics.register_collector('result_store', result_store.get_stats)
@@ -0,0 +1,382 @@
+import json
+import re
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Type, TypeVar
+
+from utils.llm_scheduler import RequestCancelled
+from utils.text_cleaner import TextCleaner
+from utils.tracing import tracer
+
+T = TypeVar('T', bound='StructuredResult')
+
+
+def _string_list(value: Any) -> List[str]:
+    """Coerce a model-produced value into a list of non-empty strings"""
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list):
+        return []
+    return [str(item).strip() for item in value if str(item).strip()]
+
+
+def _score(value: Any) -> int:
+    """Coerce a model-produced score into an int in 0-100"""
+    try:
+        return max(0, min(100, int(round(float(str(value).split('/')[0])))))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _array(items: Dict[str, Any]) -> Dict[str, Any]:
+    return {"type": "array", "items": items}
+
+
+_STRINGS = _array({"type": "string"})
+_SCORE = {"type": "integer", "minimum": 0, "maximum": 100}
+
+
+class StructuredResult(ABC):
+    """Base class for typed agent results parsed from JSON model output"""
+
+    SCHEMA: Dict[str, Any] = {}
+
+    @classmethod
+    @abstractmethod
+    def from_dict(cls: Type[T], data: Dict[str, Any]) -> T:
+        """Build a result from (possibly malformed) parsed model output"""
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @abstractmethod
+    def to_markdown(self) -> str:
+        """Render the result for the report"""
+
+    def __str__(self) -> str:
+        return self.to_markdown()
+
+
+@dataclass
+class ATSEvaluation(StructuredResult):
+    """CV Evaluator output"""
+    score: int = 0
+    sub_scores: Dict[str, int] = field(default_factory=dict)
+    summary: str = ''
+    strengths: List[str] = field(default_factory=list)
+    issues: List[str] = field(default_factory=list)
+    missing_elements: List[str] = field(default_factory=list)
+    recommendations: List[str] = field(default_factory=list)
+
+    SUB_SCORES = ('formatting', 'keywords', 'completeness', 'content')
+    SCHEMA = {
+        "type": "object",
+        "properties": {
+            "score": _SCORE,
+            "sub_scores": {"type": "object", "properties": {name: _SCORE for name in SUB_SCORES},
+                           "required": list(SUB_SCORES)},
+            "summary": {"type": "string"},
+            "strengths": _STRINGS,
+            "issues": _STRINGS,
+            "missing_elements": _STRINGS,
+            "recommendations": _STRINGS
+        },
+        "required": ["score", "sub_scores", "summary", "strengths", "issues", "recommendations"]
+    }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ATSEvaluation':
+        sub_scores = data.get('sub_scores') if isinstance(data.get('sub_scores'), dict) else {}
+        return cls(
+            score=_score(data.get('score')),
+            sub_scores={str(name): _score(value) for name, value in sub_scores.items()},
+            summary=str(data.get('summary') or ''),
+            strengths=_string_list(data.get('strengths')),
+            issues=_string_list(data.get('issues')),
+            missing_elements=_string_list(data.get('missing_elements')),
+            recommendations=_string_list(data.get('recommendations'))
+        )
+
+    def to_markdown(self) -> str:
+        lines = [f"## ATS Compatibility Score: {self.score}/100"]
+        if self.sub_scores:
+            lines += ["", "| Area | Score |", "|---|---|"]
+            lines += [f"| {name.replace('_', ' ').title()} | {value}/100 |" for name, value in self.sub_scores.items()]
+        if self.summary:
+            lines += ["", "### Overall Assessment:", self.summary]
+        lines += _section("**✅ Strengths:**", self.strengths)
+        lines += _section("**⚠️ Areas for Improvement:**", self.issues)
+        lines += _section("**🔍 Missing Elements:**", self.missing_elements)
+        lines += _section("### Recommendations:", self.recommendations)
+        return "\n".join(lines)
+
+
+@dataclass
+class Rewrite:
+    """A suggested rewrite of one CV passage"""
+    section: str = ''
+    original: str = ''
+    suggested: str = ''
+
+
+@dataclass
+class CVImprovement(StructuredResult):
+    """CV Improver output"""
+    match_score: int = 0
+    summary: str = ''
+    gaps: List[str] = field(default_factory=list)
+    keywords_to_add: List[str] = field(default_factory=list)
+    rewrites: List[Rewrite] = field(default_factory=list)
+
+    SCHEMA = {
+        "type": "object",
+        "properties": {
+            "match_score": _SCORE,
+            "summary": {"type": "string"},
+            "gaps": _STRINGS,
+            "keywords_to_add": _STRINGS,
+            "rewrites": _array({
+                "type": "object",
+                "properties": {"section": {"type": "string"}, "original": {"type": "string"},
+                               "suggested": {"type": "string"}},
+                "required": ["section", "suggested"]
+            })
+        },
+        "required": ["match_score", "summary", "gaps", "keywords_to_add", "rewrites"]
+    }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'CVImprovement':
+        rewrites = [
+            Rewrite(section=str(item.get('section') or ''), original=str(item.get('original') or ''),
+                    suggested=str(item.get('suggested') or ''))
+            for item in data.get('rewrites') or [] if isinstance(item, dict) and item.get('suggested')
+        ]
+        return cls(
+            match_score=_score(data.get('match_score')),
+            summary=str(data.get('summary') or ''),
+            gaps=_string_list(data.get('gaps')),
+            keywords_to_add=_string_list(data.get('keywords_to_add')),
+            rewrites=rewrites
+        )
+
+    def to_markdown(self) -> str:
+        lines = [f"## Job Match Score: {self.match_score}/100"]
+        if self.summary:
+            lines += ["", self.summary]
+        lines += _section("### Gaps to Address:", self.gaps)
+        lines += _section("### Keywords to Add:", self.keywords_to_add)
+        if self.rewrites:
+            lines += ["", "### Suggested Rewrites:"]
+            for rewrite in self.rewrites:
+                lines.append(f"\n**{rewrite.section or 'CV'}**")
+                if rewrite.original:
+                    lines.append(f"- Before: {rewrite.original}")
+                lines.append(f"- After: {rewrite.suggested}")
+        return "\n".join(lines)
+
+
+@dataclass
+class SkillGap:
+    """A missing skill and how to close it"""
+    skill: str = ''
+    priority: str = ''
+    reason: str = ''
+    resources: List[Dict[str, str]] = field(default_factory=list)
+
+
+@dataclass
+class SkillRecommendation(StructuredResult):
+    """Skill Recommender output"""
+    gaps: List[SkillGap] = field(default_factory=list)
+    learning_path: List[str] = field(default_factory=list)
+    supplement: str = ''
+
+    SCHEMA = {
+        "type": "object",
+        "properties": {
+            "gaps": _array({
+                "type": "object",
+                "properties": {"skill": {"type": "string"},
+                               "priority": {"type": "string", "enum": ["high", "medium", "low"]},
+                               "reason": {"type": "string"}},
+                "required": ["skill", "priority"]
+            }),
+            "learning_path": _STRINGS
+        },
+        "required": ["gaps", "learning_path"]
+    }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'SkillRecommendation':
+        gaps = [
+            SkillGap(skill=str(item['skill']), priority=str(item.get('priority') or '').lower(),
+                     reason=str(item.get('reason') or ''), resources=list(item.get('resources') or []))
+            for item in data.get('gaps') or [] if isinstance(item, dict) and item.get('skill')
+        ]
+        return cls(gaps=gaps, learning_path=_string_list(data.get('learning_path')),
+                   supplement=str(data.get('supplement') or ''))
+
+    def to_markdown(self) -> str:
+        lines = ["## Skill Gap Analysis"]
+        for gap in self.gaps:
+            priority = f" ({gap.priority} priority)" if gap.priority else ""
+            lines.append(f"- **{gap.skill}**{priority}" + (f": {gap.reason}" if gap.reason else ""))
+            for resource in gap.resources[:3]:
+                lines.append(f"  - [{resource.get('title') or resource['link']}]({resource['link']})")
+        lines += _section("### Learning Path:", self.learning_path, numbered=True)
+        if self.supplement:
+            lines += ["", self.supplement]
+        return "\n".join(lines)
+
+
+@dataclass
+class JobEntry:
+    """A job opportunity"""
+    title: str = ''
+    company: str = ''
+    location: str = ''
+    match_score: int = 0
+    reasons: List[str] = field(default_factory=list)
+    link: str = ''
+
+
+@dataclass
+class JobMatches(StructuredResult):
+    """Job Finder output"""
+    jobs: List[JobEntry] = field(default_factory=list)
+    search_tips: List[str] = field(default_factory=list)
+    supplement: str = ''
+
+    SCHEMA = {
+        "type": "object",
+        "properties": {
+            "jobs": _array({
+                "type": "object",
+                "properties": {"title": {"type": "string"}, "company": {"type": "string"},
+                               "location": {"type": "string"}, "match_score": _SCORE,
+                               "reasons": _STRINGS, "link": {"type": "string"}},
+                "required": ["title", "match_score"]
+            }),
+            "search_tips": _STRINGS
+        },
+        "required": ["jobs", "search_tips"]
+    }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'JobMatches':
+        jobs = [
+            JobEntry(title=str(item['title']), company=str(item.get('company') or ''),
+                     location=str(item.get('location') or ''), match_score=_score(item.get('match_score')),
+                     reasons=_string_list(item.get('reasons')), link=str(item.get('link') or ''))
+            for item in data.get('jobs') or [] if isinstance(item, dict) and item.get('title')
+        ]
+        return cls(jobs=jobs, search_tips=_string_list(data.get('search_tips')),
+                   supplement=str(data.get('supplement') or ''))
+
+    def to_markdown(self) -> str:
+        lines = ["## Recommended Opportunities"]
+        for job in self.jobs:
+            where = ", ".join(value for value in (job.company, job.location) if value)
+            lines.append(f"\n**{job.title}**" + (f" - {where}" if where else "") + f" (match {job.match_score}/100)")
+            lines += [f"- {reason}" for reason in job.reasons]
+            if job.link:
+                lines.append(f"- Link: {job.link}")
+        lines += _section("### Search Tips:", self.search_tips)
+        if self.supplement:
+            lines += ["", self.supplement]
+        return "\n".join(lines)
+
+
+# Result types by name, for restoring stored results
+RESULT_TYPES = {result_type.__name__: result_type
+                for result_type in (ATSEvaluation, CVImprovement, SkillRecommendation, JobMatches)}
+
+
+class AgentFailure(str):
+    """
+    Message an agent returns instead of a result when its stage failed
+
+    Still text, so it displays like any free-form result, but the pipeline
+    can tell it apart from a real analysis and never caches it.
+    """
+
+
+def result_to_record(value: Any) -> Dict[str, Any]:
+    """Serializable form of an agent result (typed or free-form text)"""
+    if isinstance(value, StructuredResult):
+        return {'type': type(value).__name__, 'data': value.to_dict()}
+    return {'type': 'text', 'data': str(value)}
+
+
+def result_from_record(record: Dict[str, Any]) -> Any:
+    """Restore an agent result stored with result_to_record"""
+    result_type = RESULT_TYPES.get(record.get('type'))
+    if result_type is None:
+        return record.get('data', '')
+    return result_type.from_dict(record.get('data') or {})
+
+
+def _section(heading: str, items: List[str], numbered: bool = False) -> List[str]:
+    if not items:
+        return []
+    return ["", heading] + [f"{index}. {item}" if numbered else f"- {item}" for index, item in enumerate(items, 1)]
+
+
+def json_instruction(result_type: Type[StructuredResult]) -> str:
+    """Prompt suffix asking for JSON that follows the result type's schema"""
+    return (
+        "\n\nIgnore any markdown output format described above. Respond with a single JSON object "
+        "that matches this JSON schema, with no text before or after it:\n"
+        f"{json.dumps(result_type.SCHEMA)}"
+    )
+
+
+def parse_structured(text: str, result_type: Type[T]) -> Optional[T]:
+    """
+    Parse model output into a typed result
+
+    Args:
+        text: Raw model output (think tags and code fences are tolerated)
+        result_type: StructuredResult subclass to build
+
+    Returns:
+        The typed result, or None if the output holds no JSON object
+    """
+    text = TextCleaner.clean_agent_output(text)
+    start, end = text.find('{'), text.rfind('}')
+    if start < 0 or end <= start:
+        return None
+    try:
+        data = json.loads(text[start:end + 1])
+    except ValueError:
+        # Small models sometimes leave trailing commas
+        try:
+            data = json.loads(re.sub(r',\s*([}\]])', r'\1', text[start:end + 1]))
+        except ValueError:
+            return None
+    return result_type.from_dict(data) if isinstance(data, dict) else None
+
+
+def generate_structured(llm, prompt: str, result_type: Type[T]) -> Optional[T]:
+    """
+    Generate and parse a typed result
+
+    Args:
+        llm: LLM created with CrewConfig.get_llm(output_schema=result_type.SCHEMA)
+        prompt: The agent's formatted prompt (the schema instruction is appended)
+        result_type: StructuredResult subclass to build
+
+    Returns:
+        The typed result, or None if generation or parsing failed
+    """
+    try:
+        output = llm.invoke(prompt + json_instruction(result_type))
+    except RequestCancelled:
+        raise
+    except Exception:
+        return None
+    with tracer.span('output.parse', result_type=result_type.__name__) as span:
+        result = parse_structured(output, result_type)
+        span.set(parsed=result is not None)
+    return result
@@ -1,10 +1,62 @@
 import re
-from typing import List, Dict
+from typing import List, Dict, Union
+
+from utils.cv_parser import CVDocument, parse_cv
+from utils.tracing import tracer
+
+# Extractor patterns, compiled once
+_SKILL_PATTERN = re.compile(
+    r'\b(?:'
+    # Programming languages
+    r'Python|Java|JavaScript|TypeScript|C\+\+|C#|Go|Rust|Swift|Kotlin|PHP|Ruby|Scala|R|MATLAB|'
+    # Web technologies
+    r'React|Angular|Vue|HTML|CSS|Node\.js|Express|Django|Flask|Spring|Laravel|'
+    # Databases
+    r'MySQL|PostgreSQL|MongoDB|Redis|Elasticsearch|Oracle|SQL Server|SQLite|'
+    # Cloud platforms
+    r'AWS|Azure|Google Cloud|GCP|Docker|Kubernetes|Terraform|Jenkins|'
+    # Tools and frameworks
+    r'Git|GitHub|GitLab|Jira|Confluence|Slack|Figma|Photoshop|Excel'
+    r')\b',
+    re.IGNORECASE
+)
+
+_TITLE_PATTERN = re.compile(
+    r'\b(?:(Senior|Sr\.|Junior|Jr\.|Lead|Principal|Staff)\s+)?'
+    r'(Full[ -]?Stack|Front[ -]?End|Back[ -]?End|Software|Data|Machine Learning|ML|AI|'
+    r'DevOps|Cloud|Web|Mobile|QA|Platform|Site Reliability|Security|Python|Java|JavaScript|'
+    r'React|Node\.js|iOS|Android)\s+'
+    r'(Engineer|Developer|Scientist|Analyst|Architect|Programmer)s?\b',
+    re.IGNORECASE
+)
+
+_EXPERIENCE_PATTERNS = [re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'(\d+)\+?\s*years?\s*(?:of\s*)?experience',
+    r'(\d+)\+?\s*yrs?\s*(?:of\s*)?experience',
+    r'experience\s*(?:of\s*)?(\d+)\+?\s*years?',
+    r'(\d+)\+?\s*years?\s*in\s*\w+'
+)]
+
+_EMAIL_PATTERN = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
+_PHONE_PATTERNS = [re.compile(pattern) for pattern in (
+    r'\+?\d{1,3}[-.\s]?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}',
+    r'\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}',
+    r'\+?\d{10,15}'
+)]
+_LINKEDIN_PATTERN = re.compile(r'(?:linkedin\.com/in/|linkedin\.com/profile/view\?id=)([A-Za-z0-9\-]+)', re.IGNORECASE)
+_GITHUB_PATTERN = re.compile(r'(?:github\.com/)([A-Za-z0-9\-]+)', re.IGNORECASE)
+
+_EDUCATION_KEYWORDS = [
+    'bachelor', 'master', 'phd', 'doctorate', 'degree',
+    'university', 'college', 'institute', 'school',
+    'b.s.', 'm.s.', 'b.a.', 'm.a.', 'mba', 'certification'
+]
 
 class TextCleaner:
     """Utility class for cleaning and processing text data"""
     
     @staticmethod
+    @tracer.traced('text.clean', kind='cv')
     def clean_cv_text(text: str) -> str:
         """
         Clean CV text by removing extra whitespace, formatting artifacts
@@ -38,6 +90,7 @@ class TextCleaner:
         return text.strip()
     
     @staticmethod
+    @tracer.traced('text.clean', kind='job_description')
     def clean_job_description(text: str) -> str:
         """
         Clean job description text
@@ -66,139 +119,133 @@ class TextCleaner:
         return text.strip()
     
     @staticmethod
-    def extract_skills_from_text(text: str) -> List[str]:
+    def _document(text: Union[str, CVDocument]) -> CVDocument:
+        return text if isinstance(text, CVDocument) else parse_cv(text or '')
+    
+    @staticmethod
+    def extract_skills_from_text(text: Union[str, CVDocument]) -> List[str]:
         """
         Extract potential skills from text using pattern matching
         
         Args:
-            text: Text to extract skills from
+            text: Text (or a parsed CV) to extract skills from
             
         Returns:
-            List of potential skills
+            List of potential skills in order of first appearance
         """
-        # Common skill patterns
-        skill_patterns = [
-            # Programming languages
-            r'\b(?:Python|Java|JavaScript|TypeScript|C\+\+|C#|Go|Rust|Swift|Kotlin|PHP|Ruby|Scala|R|MATLAB)\b',
-            # Web technologies
-            r'\b(?:React|Angular|Vue|HTML|CSS|Node\.js|Express|Django|Flask|Spring|Laravel)\b',
-            # Databases
-            r'\b(?:MySQL|PostgreSQL|MongoDB|Redis|Elasticsearch|Oracle|SQL Server|SQLite)\b',
-            # Cloud platforms
-            r'\b(?:AWS|Azure|Google Cloud|GCP|Docker|Kubernetes|Terraform|Jenkins)\b',
-            # Tools and frameworks
-            r'\b(?:Git|GitHub|GitLab|Jira|Confluence|Slack|Figma|Photoshop|Excel)\b'
-        ]
-        
         skills = []
-        for pattern in skill_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            skills.extend(matches)
-        
-        # Remove duplicates and convert to proper case
-        skills = list(set([skill.title() for skill in skills]))
+        seen = set()
+        for match in _SKILL_PATTERN.finditer(TextCleaner._document(text).text):
+            skill = match.group().title()
+            if skill not in seen:
+                seen.add(skill)
+                skills.append(skill)
         
         return skills
     
     @staticmethod
-    def extract_experience_years(text: str) -> int:
+    def extract_job_titles(text: Union[str, CVDocument]) -> List[str]:
+        """
+        Extract likely job titles from text using pattern matching
+        
+        Args:
+            text: Text (or a parsed CV) to extract job titles from
+            
+        Returns:
+            List of job titles as written (first spelling wins), in order of first appearance
+        """
+        titles = []
+        seen = set()
+        for match in _TITLE_PATTERN.finditer(TextCleaner._document(text).text):
+            # Keep the original casing ("iOS Developer", "QA Engineer"); only the dedup key ignores it
+            title = ' '.join(part for part in match.groups() if part)
+            key = title.lower()
+            if key not in seen:
+                seen.add(key)
+                titles.append(title)
+        
+        return titles
+    
+    @staticmethod
+    def extract_experience_years(text: Union[str, CVDocument]) -> int:
         """
         Extract years of experience from text
         
         Args:
-            text: Text to extract experience from
+            text: Text (or a parsed CV) to extract experience from
             
         Returns:
             Number of years of experience (0 if not found)
         """
-        # Patterns for extracting years of experience
-        patterns = [
-            r'(\d+)\+?\s*years?\s*(?:of\s*)?experience',
-            r'(\d+)\+?\s*yrs?\s*(?:of\s*)?experience',
-            r'experience\s*(?:of\s*)?(\d+)\+?\s*years?',
-            r'(\d+)\+?\s*years?\s*in\s*\w+'
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        document = TextCleaner._document(text)
+        for pattern in _EXPERIENCE_PATTERNS:
+            # Summary and experience sections state it most reliably; then anywhere
+            match = document.search(pattern, 'summary', 'experience')
             if match:
                 return int(match.group(1))
         
         return 0
     
     @staticmethod
-    def extract_contact_info(text: str) -> Dict[str, str]:
+    def extract_contact_info(text: Union[str, CVDocument]) -> Dict[str, str]:
         """
         Extract contact information from CV text
         
         Args:
-            text: CV text
+            text: CV text or a parsed CV
             
         Returns:
             Dictionary with contact information
         """
+        document = TextCleaner._document(text)
+        
+        def first(pattern):
+            # Contact details sit in the header or contact section; fall back to the whole CV
+            return document.search(pattern, 'header', 'contact')
+        
         contact_info = {}
         
-        # Email pattern
-        email_pattern = r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b'
-        email_match = re.search(email_pattern, text)
+        email_match = first(_EMAIL_PATTERN)
         if email_match:
             contact_info['email'] = email_match.group()
         
-        # Phone pattern (various formats)
-        phone_patterns = [
-            r'\+?\d{1,3}[-.\s]?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}',
-            r'\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}',
-            r'\+?\d{10,15}'
-        ]
-        
-        for pattern in phone_patterns:
-            phone_match = re.search(pattern, text)
+        for pattern in _PHONE_PATTERNS:
+            phone_match = first(pattern)
             if phone_match:
                 contact_info['phone'] = phone_match.group()
                 break
         
-        # LinkedIn profile
-        linkedin_pattern = r'(?:linkedin\.com/in/|linkedin\.com/profile/view\?id=)([A-Za-z0-9\-]+)'
-        linkedin_match = re.search(linkedin_pattern, text, re.IGNORECASE)
+        linkedin_match = first(_LINKEDIN_PATTERN)
         if linkedin_match:
             contact_info['linkedin'] = f"linkedin.com/in/{linkedin_match.group(1)}"
         
-        # GitHub profile
-        github_pattern = r'(?:github\.com/)([A-Za-z0-9\-]+)'
-        github_match = re.search(github_pattern, text, re.IGNORECASE)
+        github_match = first(_GITHUB_PATTERN)
         if github_match:
             contact_info['github'] = f"github.com/{github_match.group(1)}"
         
         return contact_info
     
     @staticmethod
-    def extract_education(text: str) -> List[str]:
+    def extract_education(text: Union[str, CVDocument]) -> List[str]:
         """
         Extract education information from CV text
         
         Args:
-            text: CV text
+            text: CV text or a parsed CV
             
         Returns:
             List of education entries
         """
-        education_keywords = [
-            'bachelor', 'master', 'phd', 'doctorate', 'degree',
-            'university', 'college', 'institute', 'school',
-            'b.s.', 'm.s.', 'b.a.', 'm.a.', 'mba', 'certification'
-        ]
+        document = TextCleaner._document(text)
+        # Prefer the education section; without one, scan every line
+        lines = document.section_lines('education') or [line for line in document.lines if not line.is_heading]
         
         education_entries = []
-        
-        # Split text into lines and look for education-related content
-        lines = text.split('\n')
-        
         for i, line in enumerate(lines):
-            line_lower = line.lower()
-            if any(keyword in line_lower for keyword in education_keywords):
-                # Try to get context (current line + next 1-2 lines)
-                context_lines = lines[i:i+3]
+            line_lower = line.text.lower()
+            if any(keyword in line_lower for keyword in _EDUCATION_KEYWORDS):
+                # Context: this line plus up to two following lines of the same section
+                context_lines = [other.text for other in lines[i:i+3] if other.section == line.section]
                 education_entry = ' '.join(context_lines).strip()
                 if len(education_entry) > 10:  # Filter out very short entries
                     education_entries.append(education_entry[:200])  # Limit length
@@ -244,6 +291,7 @@ class TextCleaner:
         return text
     
     @staticmethod
+    @tracer.traced('text.clean', kind='agent_output')
     def clean_agent_output(text: str) -> str:
         """
         Clean agent output by removing unwanted tags and formatting
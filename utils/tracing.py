@@ -0,0 +1,194 @@
+import atexit
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional
+
+# Default location of the exported spans (JSON lines)
+TRACE_PATH = os.getenv("TRACE_PATH", "data/traces.jsonl")
+
+# Set TRACING_ENABLED=false to stop exporting spans (durations are still measured)
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+
+# The export file is moved to <path>.1 once it grows past this size
+TRACE_MAX_BYTES = int(os.getenv("TRACE_MAX_BYTES", str(20 * 1024 * 1024)))
+
+
+@dataclass
+class Span:
+    """One timed operation, nested under the span that was active when it started"""
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start: float
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    duration: Optional[float] = None
+    status: str = 'ok'
+    error: str = ''
+    _started: float = field(default_factory=time.perf_counter, repr=False)
+
+    def set(self, **attributes):
+        """Add attributes (token counts, cache hits, sizes, ...)"""
+        self.attributes.update(attributes)
+
+    def elapsed(self) -> float:
+        """Seconds since the span started (its duration once finished)"""
+        return self.duration if self.duration is not None else time.perf_counter() - self._started
+
+    def to_record(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'start': round(self.start, 6),
+            'duration': round(self.elapsed(), 6),
+            'status': self.status,
+            'error': self.error,
+            'attributes': self.attributes
+        }
+
+
+class Tracer:
+    """
+    Nested timing spans exported as JSON lines
+
+    Spans started inside another span (in the same thread or task) become
+    its children and share its trace id, so one analysis yields a tree:
+    pipeline step → agent → prompt formatting / LLM request / searches.
+    Finished spans are buffered and appended to the export file when a
+    trace's root span ends (at most once per FLUSH_INTERVAL) or the buffer
+    fills up; the most recent ones are also kept in memory.
+    """
+
+    BUFFER_SIZE = 200
+    FLUSH_INTERVAL = 1.0
+    RECENT_SPANS = 1000
+
+    def __init__(self, path: Optional[str] = TRACE_PATH, enabled: bool = TRACING_ENABLED,
+                 max_bytes: int = TRACE_MAX_BYTES):
+        self.path = path
+        self.enabled = enabled
+        self.max_bytes = max_bytes
+        self._current: contextvars.ContextVar = contextvars.ContextVar('current_span', default=None)
+        self._buffer: List[Dict[str, Any]] = []
+        self._recent: Deque[Dict[str, Any]] = deque(maxlen=self.RECENT_SPANS)
+        self._lock = threading.Lock()
+        self._last_flush = 0.0
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+        atexit.register(self.flush)
+
+    def current(self) -> Optional[Span]:
+        """The innermost active span, if any"""
+        return self._current.get()
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Span]:
+        """
+        Time a block as a span
+
+        Args:
+            name: Operation name, dotted by component (e.g. 'llm.request')
+            **attributes: Initial attributes; more can be added with span.set
+
+        Yields:
+            The span; exceptions mark it as failed and propagate
+        """
+        parent = self._current.get()
+        span = Span(
+            name=name,
+            trace_id=parent.trace_id if parent else uuid.uuid4().hex,
+            span_id=uuid.uuid4().hex[:16],
+            parent_id=parent.span_id if parent else None,
+            start=time.time(),
+            attributes=attributes
+        )
+        token = self._current.set(span)
+        try:
+            yield span
+        except Exception as e:
+            span.status = 'error'
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.duration = time.perf_counter() - span._started
+            self._current.reset(token)
+            self._finish(span)
+
+    def traced(self, name: Optional[str] = None, **attributes) -> Callable:
+        """Decorator that runs each call of a function in a span (named after the function by default)"""
+        def decorator(function: Callable) -> Callable:
+            span_name = name or function.__qualname__
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name, **attributes):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def wrap(self, function: Callable) -> Callable:
+        """Bind a callable to the current context so spans it opens in another thread nest here"""
+        context = contextvars.copy_context()
+        return functools.partial(context.run, function)
+
+    def add_listener(self, listener: Callable[[Dict[str, Any]], None]):
+        """Call listener with every finished span's record, even when export is disabled"""
+        self._listeners.append(listener)
+
+    def recent(self, limit: int = 100, name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Latest finished spans, newest first, optionally only those with a name prefix"""
+        with self._lock:
+            spans = list(self._recent)
+        if name:
+            spans = [span for span in spans if span['name'].startswith(name)]
+        return spans[::-1][:limit]
+
+    def _finish(self, span: Span):
+        record = span.to_record()
+        for listener in self._listeners:
+            try:
+                listener(record)
+            except Exception:
+                pass  # Listeners must not break the traced code
+        if not self.enabled:
+            return
+        with self._lock:
+            self._recent.append(record)
+            self._buffer.append(record)
+            should_flush = len(self._buffer) >= self.BUFFER_SIZE or (
+                span.parent_id is None and time.monotonic() - self._last_flush >= self.FLUSH_INTERVAL)
+        if should_flush:
+            self.flush()
+
+    def flush(self):
+        """Append the buffered spans to the export file"""
+        if not self.path:
+            return
+        with self._lock:
+            records, self._buffer = self._buffer, []
+            self._last_flush = time.monotonic()
+            if not records:
+                return
+            try:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                if os.path.exists(self.path) and os.path.getsize(self.path) > self.max_bytes:
+                    os.replace(self.path, f"{self.path}.1")
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.writelines(json.dumps(record, default=str) + '\n' for record in records)
+            except OSError:
+                pass  # Export is best effort
+
+
+# Global tracer shared by all components
+tracer = Tracer()
@@ -0,0 +1,256 @@
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class VectorIndex:
+    """
+    Compact float32 vector index persisted as memory-mapped files
+
+    Vectors are L2-normalised so cosine similarity is a dot product. Search
+    is brute force with NumPy for small corpora; larger corpora also get an
+    inverted-file (IVF) index whose coarse centroids limit the scan to the
+    nprobe closest clusters. Rows added after the IVF was built are scanned
+    exactly until they exceed IVF_REBUILD_RATIO of the index, and only then
+    is the IVF rebuilt.
+
+    Saving appends the new rows and ids; the small meta file is replaced last
+    and is the commit point, so rows of an interrupted save are ignored on
+    load and overwritten by the next save.
+
+    Files written for a path prefix P:
+        P.vectors.f32   N x D float32 rows, appended (memory-mapped on load)
+        P.ids.txt       one id per line, appended
+        P.meta.json     row count, dimension, size of the ids file and the embedder tag
+        P.ivf.npz       centroids, cluster offsets and row order of the clustered rows (optional)
+    """
+
+    APPROXIMATE_THRESHOLD = 20000
+    IVF_REBUILD_RATIO = 0.2
+    KMEANS_ITERATIONS = 10
+    KMEANS_SAMPLE = 50000
+
+    def __init__(self, path: str, model: str = ''):
+        """
+        Args:
+            path: Path prefix of the index files
+            model: Tag of the embedder that produced the vectors; an index
+                built by a different embedder is discarded on load
+        """
+        self.path = path
+        self.model = model
+        self._ids: List[str] = []
+        self._ids_size = 0
+        self._positions: Dict[str, int] = {}
+        self._vectors: Optional[np.ndarray] = None
+        self._pending_ids: List[str] = []
+        self._pending: List[np.ndarray] = []
+        self._ivf: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+        self._lock = threading.Lock()
+        self.load()
+
+    @property
+    def _vectors_path(self) -> str:
+        return f"{self.path}.vectors.f32"
+
+    @property
+    def _ids_path(self) -> str:
+        return f"{self.path}.ids.txt"
+
+    @property
+    def _meta_path(self) -> str:
+        return f"{self.path}.meta.json"
+
+    @property
+    def _ivf_path(self) -> str:
+        return f"{self.path}.ivf.npz"
+
+    def load(self):
+        """Memory-map the persisted index (instant, regardless of size)"""
+        try:
+            with open(self._meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('model') != self.model:
+                return  # Vectors from another embedder are not comparable
+            count, dimension, ids_size = meta['count'], meta['dimension'], meta['ids_size']
+            with open(self._ids_path, 'rb') as f:
+                ids = f.read(ids_size).decode('utf-8').split('\n')[:-1]
+            if len(ids) != count:
+                return
+            vectors = (np.memmap(self._vectors_path, dtype=np.float32, mode='r', shape=(count, dimension))
+                       if count else None)
+        except (OSError, ValueError, KeyError):
+            return
+
+        self._ids, self._ids_size = ids, ids_size
+        self._positions = {vector_id: row for row, vector_id in enumerate(ids)}
+        self._vectors = vectors
+        if os.path.exists(self._ivf_path):
+            with np.load(self._ivf_path) as ivf:
+                # An IVF written by an interrupted save may cover uncommitted rows
+                if len(ivf['order']) <= count:
+                    self._ivf = (ivf['centroids'], ivf['offsets'], ivf['order'])
+
+    @staticmethod
+    def normalise(vectors: np.ndarray) -> np.ndarray:
+        """L2-normalise the rows of a vector or matrix as float32 (zero rows are left as they are)"""
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def add(self, ids: Sequence[str], vectors: np.ndarray):
+        """
+        Queue vectors for the index; ids already present are skipped
+
+        Args:
+            ids: One id per row
+            vectors: Matrix of shape (len(ids), D)
+        """
+        vectors = self.normalise(vectors)
+        with self._lock:
+            if self.dimension and vectors.shape[1] != self.dimension:
+                raise ValueError(f"Vector dimension {vectors.shape[1]} does not match index dimension {self.dimension}")
+            for vector_id, vector in zip(ids, vectors):
+                if vector_id not in self._positions:
+                    self._positions[vector_id] = len(self._ids) + len(self._pending_ids)
+                    self._pending_ids.append(vector_id)
+                    self._pending.append(vector)
+
+    @staticmethod
+    def _append(path: str, committed_size: int, data: bytes) -> int:
+        """Write data after the committed part of a file, dropping anything past it; returns the new size"""
+        with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+            f.truncate(committed_size)
+            f.seek(committed_size)
+            f.write(data)
+        return committed_size + len(data)
+
+    def save(self):
+        """Append queued vectors to disk and rebuild the IVF index if too many rows are unclustered"""
+        with self._lock:
+            if not self._pending:
+                return
+            pending = np.ascontiguousarray(np.vstack(self._pending), dtype=np.float32)
+            dimension = int(pending.shape[1])
+            ids = self._ids + self._pending_ids
+
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            # Release the mapping first: Windows can't resize a mapped file
+            self._vectors = None
+            self._append(self._vectors_path, len(self._ids) * dimension * pending.itemsize, pending.tobytes())
+            ids_size = self._append(self._ids_path, self._ids_size,
+                                    ''.join(f"{vector_id}\n" for vector_id in self._pending_ids).encode('utf-8'))
+            vectors = np.memmap(self._vectors_path, dtype=np.float32, mode='r', shape=(len(ids), dimension))
+
+            clustered = len(self._ivf[2]) if self._ivf is not None else 0
+            if len(ids) >= self.APPROXIMATE_THRESHOLD and len(ids) - clustered > self.IVF_REBUILD_RATIO * len(ids):
+                centroids, offsets, order = self._build_ivf(vectors)
+                temp_ivf = f"{self._ivf_path}.tmp.npz"
+                np.savez(temp_ivf, centroids=centroids, offsets=offsets, order=order)
+                os.replace(temp_ivf, self._ivf_path)
+                self._ivf = (centroids, offsets, order)
+            elif len(ids) < self.APPROXIMATE_THRESHOLD and os.path.exists(self._ivf_path):
+                os.remove(self._ivf_path)
+                self._ivf = None
+
+            # Replacing the meta file commits the appended rows
+            temp_meta = f"{self._meta_path}.tmp"
+            with open(temp_meta, 'w', encoding='utf-8') as f:
+                json.dump({'model': self.model, 'dimension': dimension, 'count': len(ids), 'ids_size': ids_size}, f)
+            os.replace(temp_meta, self._meta_path)
+
+            self._ids, self._ids_size = ids, ids_size
+            self._pending_ids, self._pending = [], []
+            self._vectors = vectors
+
+    def _build_ivf(self, matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Spherical k-means coarse quantiser over the index"""
+        rng = np.random.default_rng(0)
+        nlist = max(1, int(np.sqrt(len(matrix))))
+        sample = matrix[rng.choice(len(matrix), min(len(matrix), self.KMEANS_SAMPLE), replace=False)]
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+
+        for _ in range(self.KMEANS_ITERATIONS):
+            assignments = np.argmax(sample @ centroids.T, axis=1)
+            for cluster in range(nlist):
+                members = sample[assignments == cluster]
+                if len(members):
+                    centroids[cluster] = members.mean(axis=0)
+            centroids = self.normalise(centroids)
+
+        # Assign every vector in chunks to bound memory
+        assignments = np.concatenate([
+            np.argmax(matrix[start:start + 8192] @ centroids.T, axis=1)
+            for start in range(0, len(matrix), 8192)
+        ])
+        order = np.argsort(assignments, kind='stable').astype(np.int64)
+        offsets = np.searchsorted(assignments[order], np.arange(nlist + 1)).astype(np.int64)
+        return centroids.astype(np.float32), offsets, order
+
+    def search(self, query: np.ndarray, k: int = 10, mode: str = 'auto', nprobe: int = 8) -> List[Tuple[str, float]]:
+        """
+        Nearest neighbours by cosine similarity
+
+        Args:
+            query: Query vector of shape (D,)
+            k: Number of results
+            mode: 'exact', 'approximate' or 'auto' (approximate when an IVF index exists)
+            nprobe: Clusters scanned in approximate mode (plus any rows added since the IVF was built)
+
+        Returns:
+            (id, similarity) pairs, most similar first
+        """
+        if self._pending:
+            self.save()
+        if self._vectors is None or not self._ids:
+            return []
+
+        query = self.normalise(query)[0]
+        use_ivf = self._ivf is not None and mode in ('auto', 'approximate')
+
+        if use_ivf:
+            centroids, offsets, order = self._ivf
+            probes = np.argsort(-(centroids @ query))[:nprobe]
+            # Rows added since the IVF was built are always scanned
+            unclustered = np.arange(len(order), len(self._ids), dtype=np.int64)
+            rows = np.concatenate([order[offsets[c]:offsets[c + 1]] for c in probes] + [unclustered])
+            rows.sort()  # Sequential access is friendlier to the memory map
+            scores = self._vectors[rows] @ query
+        else:
+            rows = None
+            scores = self._vectors @ query
+
+        k = min(k, len(scores))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        positions = rows[top] if rows is not None else top
+        return [(self._ids[int(position)], float(scores[i])) for i, position in zip(top, positions)]
+
+    def vectors_for(self, ids: Sequence[str]) -> np.ndarray:
+        """Stored (normalised) vectors for the given ids"""
+        if self._pending:
+            self.save()
+        return np.asarray(self._vectors[[self._positions[vector_id] for vector_id in ids]])
+
+    @property
+    def dimension(self) -> int:
+        if self._vectors is not None:
+            return int(self._vectors.shape[1])
+        if self._pending:
+            return int(self._pending[0].shape[0])
+        return 0
+
+    def __contains__(self, vector_id: str) -> bool:
+        return vector_id in self._positions
+
+    def __len__(self) -> int:
+        return len(self._ids) + len(self._pending_ids)